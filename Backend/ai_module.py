@@ -4,9 +4,19 @@ import json
 import uuid
 import logging
 import asyncio
-from typing import Dict, Any, List
-from groq import Groq
+import importlib.util
+from typing import Dict, Any, List, AsyncIterator, Optional
+from groq import AsyncGroq, DefaultAsyncHttpxClient, RateLimitError
+import httpx
 from dotenv import load_dotenv
+from response_cache import cache_from_env, make_cache_key
+from stream_parser import IncrementalJSONParser
+from context_budget import budget_from_env, estimate_tokens
+from rate_limiter import scheduler_from_env, current_priority, TicketPriority
+from single_flight import single_flight_from_env
+from similar_index import index_from_env
+from intent_classifier import Intent, classifier_from_env, confidence_score
+from database import get_tickets_by_ids
 
 # Load environment variables
 load_dotenv()
@@ -14,43 +24,151 @@ load_dotenv()
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s [%(levelname)s] %(message)s")
 
+# Per-agent timeout (seconds) for a single completion call
+AGENT_TIMEOUT = float(os.getenv("AGENT_TIMEOUT", "30"))
+
+# Extra attempts after a 429, each waiting for the scheduler's backoff
+RATE_LIMIT_RETRIES = int(os.getenv("RATE_LIMIT_RETRIES", "2"))
+# Completion tokens assumed per call when reserving token budget
+EXPECTED_COMPLETION_TOKENS = int(os.getenv("EXPECTED_COMPLETION_TOKENS", "400"))
+
+# Shared pacing of all outbound Groq calls
+scheduler = scheduler_from_env()
+
+# "multi" runs the summarizer, action extractor and resolver separately;
+# "fused" asks one agent for the merged response and falls back to "multi"
+AGENT_MODE = os.getenv("AGENT_MODE", "multi").lower()
+
+# Keep-alive connection pool shared by every agent's client
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "20"))
+GROQ_MAX_KEEPALIVE = int(os.getenv("GROQ_MAX_KEEPALIVE", "10"))
+GROQ_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "60"))
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+GROQ_HTTP2 = (os.getenv("GROQ_HTTP2", "true").lower() in ("1", "true", "yes")
+              and importlib.util.find_spec("h2") is not None)
+# Connections opened at startup so the first tickets skip TCP/TLS setup
+GROQ_WARMUP_CONNECTIONS = int(os.getenv("GROQ_WARMUP_CONNECTIONS", "3"))
+GROQ_WARMUP_TIMEOUT = float(os.getenv("GROQ_WARMUP_TIMEOUT", "10"))
+
+_shared_client: Optional[AsyncGroq] = None
+
+def shared_client(api_key: str) -> AsyncGroq:
+    """One AsyncGroq client, and so one bounded connection pool, for all agents."""
+    global _shared_client
+    if _shared_client is None:
+        _shared_client = AsyncGroq(api_key=api_key, http_client=DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_connections=GROQ_MAX_CONNECTIONS, max_keepalive_connections=GROQ_MAX_KEEPALIVE,
+                                keepalive_expiry=GROQ_KEEPALIVE_EXPIRY),
+            http2=GROQ_HTTP2
+        ))
+    return _shared_client
+
 class AIAgent:
     def __init__(self, name: str, prompt_template: str, model: str = "llama-3.3-70b-versatile"):
         self.name = name
         self.api_key = os.getenv("GROQ_API_KEY")
         if not self.api_key:
             raise ValueError("GROQ_API_KEY environment variable not set")
-        self.client = Groq(api_key=self.api_key)
+        # Built on first use: creating the client (TLS context, CA bundle) is a
+        # large part of a cold start
+        self._client = None
         self.model = model
         self.prompt_template = prompt_template
+        # Token usage reported by the API, accumulated across calls
+        self.usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    @property
+    def client(self) -> AsyncGroq:
+        if self._client is None:
+            self._client = shared_client(self.api_key)
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def record_usage(self, usage):
+        self.usage["calls"] += 1
+        if usage is not None:
+            self.usage["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            self.usage["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+    def build_messages(self, content: str, context: str = "") -> List[Dict[str, str]]:
+        """Format messages for chat completion."""
+        return [
+            {
+                "role": "system",
+                "content": self.prompt_template + "\nImportant: Always respond with valid JSON format and provide contextually relevant responses."
+            },
+            {
+                "role": "user",
+                "content": f"Content: {content}\nContext: {context}"
+            }
+        ]
+
+    async def create_completion(self, messages: List[Dict[str, str]], stream: bool = False):
+        """
+        Make the API call without blocking the event loop, paced by the shared
+        scheduler. A 429 pauses the scheduler and the call is retried.
+        """
+        reserve = estimate_tokens(messages[0]["content"]) + estimate_tokens(messages[1]["content"]) + EXPECTED_COMPLETION_TOKENS
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await scheduler.acquire(reserve)
+            try:
+                raw = await asyncio.wait_for(
+                    self.client.chat.completions.with_raw_response.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=0.7,  # Adjusted for more creative responses
+                        max_tokens=2048,
+                        top_p=0.9,
+                        stream=stream
+                    ),
+                    timeout=AGENT_TIMEOUT
+                )
+                break
+            except RateLimitError as e:
+                # Rejected calls use no tokens
+                scheduler.settle(reserve, 0)
+                scheduler.on_rate_limited(getattr(e.response, "headers", None))
+                if attempt == RATE_LIMIT_RETRIES:
+                    raise
+                logging.warning("%s rate limited, retrying (%d/%d)", self.name, attempt + 1, RATE_LIMIT_RETRIES)
+            except asyncio.TimeoutError:
+                scheduler.settle(reserve)
+                logging.error("Agent %s timed out after %ss", self.name, AGENT_TIMEOUT)
+                raise
+            except BaseException:
+                scheduler.settle(reserve)
+                raise
+
+        # Log rate-limit and response headers, and re-sync the scheduler from them
+        logging.debug("API Response Headers: %s", raw.headers)
+        completion = raw.parse()
+        # Streams report usage only at the end, so their reservation stands
+        # until the headers below re-sync the budget
+        usage = None if stream else getattr(completion, "usage", None)
+        scheduler.settle(reserve, getattr(usage, "total_tokens", None))
+        scheduler.observe(raw.headers)
+        return completion
+
+    async def open_stream(self, content: str, context: str = "") -> AsyncIterator[str]:
+        """
+        Start a streamed completion, paced like process(), and return an
+        iterator over the response text deltas as the API sends them.
+        """
+        completion = await self.create_completion(self.build_messages(content, context), stream=True)
+
+        async def deltas():
+            async for chunk in completion:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        return deltas()
 
     async def process(self, content: str, context: str = "") -> Dict[str, Any]:
         try:
-            # Format messages for chat completion
-            messages = [
-                {
-                    "role": "system",
-                    "content": self.prompt_template + "\nImportant: Always respond with valid JSON format and provide contextually relevant responses."
-                },
-                {
-                    "role": "user",
-                    "content": f"Content: {content}\nContext: {context}"
-                }
-            ]
-
-            # Make the API call
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.7,  # Adjusted for more creative responses
-                max_tokens=2048,
-                top_p=0.9,
-                stream=False
-            )
-
-            # Log rate-limit and response headers (if available)
-            headers = getattr(completion, "headers", {})
-            logging.debug("API Response Headers: %s", headers)
+            completion = await self.create_completion(self.build_messages(content, context))
+            self.record_usage(getattr(completion, "usage", None))
 
             if not completion.choices:
                 raise ValueError("No response from AI API")
@@ -120,8 +238,36 @@ If the message contains any problem description, it should not be categorized as
         "confidence": "Confidence level",
         "steps": ["Step-by-step resolution steps"],
         "resources": ["Relevant documentation/guides"]
+    }
+}"""
+            ),
+            "fused": AIAgent(
+                "Fused Support Agent",
+                prompt_template="""Analyze the customer support message, identify the actions needed and recommend a resolution. Return a single JSON object.
+Check for specific issues like login problems, technical issues, or account-related problems before categorizing as a greeting.
+If the message contains any problem description, it should not be categorized as a greeting.
+
+{
+    "summary": "Brief description of the specific issue",
+    "metadata": {
+        "sentiment": "Analyze user sentiment (positive/negative/neutral)",
+        "priority": "Determine priority based on issue severity (high/medium/low)",
+        "category": "Categorize issue (login issue/technical/account/etc.)",
+        "conversation_id": "Generate unique ID"
     },
-    "similar_cases": ["Related ticket IDs"]
+    "actions": [
+        {
+            "type": "Action type (Authentication/Password Reset/Account Recovery/Technical Fix)",
+            "description": "Detailed steps to resolve the specific issue",
+            "priority": "Priority level (Critical/High/Medium/Low)"
+        }
+    ],
+    "recommendation": {
+        "solution": "Specific solution to the identified problem",
+        "confidence": "Confidence level",
+        "steps": ["Step-by-step resolution steps"],
+        "resources": ["Relevant documentation/guides"]
+    }
 }"""
             ),
         }
@@ -136,6 +282,59 @@ If the message contains any problem description, it should not be categorized as
 # Initialize the multi-agent system
 agent_system = MultiAgentSystem()
 
+async def warm_up_connections(connections: int = GROQ_WARMUP_CONNECTIONS) -> int:
+    """
+    Open up to ``connections`` pooled connections with concurrent model-list
+    requests (no tokens used). Returns how many succeeded; failures are only
+    logged, the first tickets then pay the connection setup instead.
+    """
+    clients = {id(agent.client): agent.client for agent in agent_system.agents.values()}
+    requests = [client.models.list() for client in clients.values() if hasattr(client, "models")
+                for _ in range(connections)]
+    if not requests:
+        return 0
+    try:
+        results = await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), GROQ_WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        logging.warning("Groq connection warm-up timed out after %ss", GROQ_WARMUP_TIMEOUT)
+        return 0
+    opened = sum(not isinstance(result, BaseException) for result in results)
+    if opened < len(results):
+        logging.warning("Groq connection warm-up: %s of %s requests failed", len(results) - opened, len(results))
+    return opened
+
+async def close_clients():
+    """Close the agents' clients and forget them, so a later lifespan builds a fresh pool."""
+    global _shared_client
+    clients = {id(agent._client): agent._client for agent in agent_system.agents.values()}
+    if _shared_client is not None:
+        clients[id(_shared_client)] = _shared_client
+    _shared_client = None
+    for agent in agent_system.agents.values():
+        agent.client = None
+    for client in clients.values():
+        if client is not None and hasattr(client, "close"):
+            await client.close()
+
+# Per-agent response cache (None when disabled via RESPONSE_CACHE_ENABLED)
+response_cache = cache_from_env()
+
+# Per-agent input token budgets and tokens-saved counters
+context_budget = budget_from_env()
+
+# Shares one in-flight agent call between identical concurrent requests
+single_flight = single_flight_from_env()
+
+# Local index of past tickets that fills similar_cases (None when disabled)
+similar_index = index_from_env()
+SIMILAR_TOP_K = int(os.getenv("SIMILAR_TOP_K", "3"))
+SIMILAR_MIN_SCORE = float(os.getenv("SIMILAR_MIN_SCORE", "0.3"))
+# Also hand the resolver the resolutions of those tickets as context
+SIMILAR_CONTEXT = os.getenv("SIMILAR_CONTEXT", "false").lower() in ("1", "true", "yes")
+
+# Local fast path for trivial tickets (None when disabled)
+intent_classifier = classifier_from_env()
+
 import json
 import uuid
 import logging
@@ -157,113 +356,372 @@ def safe_get(data, key, default=None):
     """Safely get a value from a dictionary."""
     return data.get(key, default) if isinstance(data, dict) else default
 
-async def handle_ticket(issue_text: str, context: list = None) -> dict:
+def with_fresh_conversation_id(output):
     """
-    Process a ticket using the multi-agent system with enhanced error handling.
-    Ensures the final "summary" field is always a dictionary with a "text" key.
+    Copy of an agent output with a newly generated metadata.conversation_id.
+    Cached and coalesced outputs are shared between customers, so the id
+    the model generated must not be handed out again.
+    """
+    metadata = safe_get(output, "metadata")
+    if not isinstance(metadata, dict) or "conversation_id" not in metadata:
+        return output
+    return {**output, "metadata": {**metadata, "conversation_id": f"conv_{uuid.uuid4().hex[:8]}"}}
+
+def update_ticket_severity(output):
+    """
+    Re-rank this ticket's queued calls once the summarizer reports its
+    priority. Calls already dispatched keep their place; see TicketPriority.
+    """
+    priority = current_priority.get()
+    severity = safe_get(safe_get(output, "metadata"), "priority")
+    if priority is not None and severity:
+        priority.severity = severity
+
+def cacheable(parsed, validate=None) -> bool:
+    """Never cache error payloads, so a transient failure is retried next time."""
+    return isinstance(parsed, dict) and "error" not in parsed and (validate is None or validate(parsed))
+
+async def run_agent(name: str, issue_text: str, context, default: dict, validate=None):
     """
-    # Default response structure.
-    ai_response = {
-        "summary": {"text": "", "category": "general"},
-        "metadata": {"sentiment": "neutral", "priority": "low", "category": "general inquiry", "conversation_id": None},
-        "actions": [],
-        "recommendation": {"solution": "", "confidence": 0},
+    Run a single agent, falling back to ``default`` if it returns nothing usable.
+    Successful outputs are cached per agent, keyed on the normalized input;
+    if ``validate`` is given, only outputs it accepts are cached. Concurrent
+    calls with the same key share a single API call.
+    """
+    agent = agent_system.agents[name]
+    cache_key = make_cache_key(agent.name, agent.model, agent.prompt_template, issue_text, context)
+    if response_cache is not None:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            logging.debug("Cache hit for %s", name)
+            return with_fresh_conversation_id(cached)
+
+    async def call():
+        content, agent_context = context_budget.prepare(name, issue_text, context)
+        # process() enforces AGENT_TIMEOUT per API call, so time spent queued
+        # behind the rate limiter doesn't count against it
+        result = await agent.process(content, agent_context)
+
+        parsed = safe_parse(result or {}, default)
+        update_ticket_severity(parsed)
+        if response_cache is not None and cacheable(parsed, validate):
+            response_cache.set(cache_key, parsed)
+        return parsed
+
+    return with_fresh_conversation_id(await single_flight.do(cache_key, call))
+
+# Fallback payload for each agent when it fails, times out or returns garbage.
+AGENT_DEFAULTS = {
+    "summarizer": {"summary": "", "metadata": {}},
+    "action_extractor": {"actions": []},
+    "resolver": {"recommendation": {}, "similar_cases": []},
+}
+
+# (summary, action type, action description, solution, steps) per local intent
+LOCAL_REPLIES = {
+    "greeting": ("Customer greeting received", "GreetingResponse", "Provide welcome message",
+                 "Welcome to support! How can I help you today?", ["Ask user to describe their issue"]),
+    "thanks": ("Customer thanked support", "ClosingResponse", "Acknowledge thanks",
+               "You're welcome! Let us know if there is anything else we can help with.",
+               ["Close the conversation unless the customer raises a new issue"]),
+    "status_check": ("Customer asked for a ticket status update", "StatusLookup", "Share ticket status",
+                     "Tickets are processed in the background; you can follow progress on the ticket's status page.",
+                     ["Look up the ticket with GET /tickets/{ticket_id}/status", "Ask for the ticket number if it is missing"]),
+}
+
+def local_response(intent: Intent) -> dict:
+    """Response in the handle_ticket shape for a ticket the intent classifier answered."""
+    if intent.name == "faq":
+        summary, action_type, description = f"Common {intent.category} question", "FAQResponse", "Send the standard answer"
+        solution, steps, resources = intent.answer["solution"], intent.answer["steps"], intent.answer["resources"]
+        category, priority = intent.category, "medium"
+    else:
+        summary, action_type, description, solution, steps = LOCAL_REPLIES[intent.name]
+        resources, category, priority = [], intent.name.replace("_", " "), "low"
+        if intent.ticket_id is not None:
+            steps = [step.replace("{ticket_id}", str(intent.ticket_id)) for step in steps]
+    return {
+        "summary": {"text": summary},
+        "metadata": {
+            "sentiment": "positive" if intent.name in ("greeting", "thanks") else "neutral",
+            "priority": priority,
+            "category": category,
+            "conversation_id": f"conv_{uuid.uuid4().hex[:8]}",
+            "served_locally": True
+        },
+        "actions": [{
+            "type": action_type,
+            "description": description,
+            "priority": "high"
+        }],
+        "recommendation": {
+            "solution": solution,
+            "confidence": round(intent.confidence * 100),
+            "steps": steps,
+            "resources": resources
+        },
         "similar_cases": []
     }
 
-    # Simple greeting shortcut.
-    if "hello" in issue_text.lower() or "hi" in issue_text.lower():
-        return {
-            "summary": {"text": "Customer greeting received"},
-            "metadata": {
-                "sentiment": "positive",
-                "priority": "low",
-                "category": "greeting",
-                "conversation_id": f"conv_{uuid.uuid4().hex[:8]}"
-            },
-            "actions": [{
-                "type": "GreetingResponse",
-                "description": "Provide welcome message",
-                "priority": "high"
-            }],
-            "recommendation": {
-                "solution": "Welcome to support! How can I help you today?",
-                "confidence": 95,
-                "steps": ["Ask user to describe their issue"],
-                "resources": []
-            },
-            "similar_cases": []
-        }
+def classify_locally(issue_text: str) -> Optional[Intent]:
+    return intent_classifier.classify(issue_text) if intent_classifier is not None else None
+
+def build_response(summary, actions, resolution) -> dict:
+    """Merge the three agents' outputs into the final ticket response shape."""
+    logging.debug("Raw summary response: %s", summary)
+    logging.debug("Raw actions response: %s", actions)
+    logging.debug("Raw resolution response: %s", resolution)
+
+    # Ensure responses are dictionaries.
+    if not isinstance(summary, dict):
+        summary = {"summary": str(summary), "metadata": {}}
+    if not isinstance(actions, dict):
+        actions = {"actions": []}
+    if not isinstance(resolution, dict):
+        resolution = {"recommendation": {}, "similar_cases": []}
+
+    # Process recommendation.
+    raw_reco = safe_parse(resolution.get("recommendation", {}), {"solution": "", "confidence": "0"})
+    safe_reco = {
+        "solution": raw_reco.get("solution", "Default solution"),
+        "confidence": confidence_score(raw_reco.get("confidence", "0")),
+        "steps": raw_reco.get("steps", []),
+        "resources": raw_reco.get("resources", [])
+    }
 
+    # Build final response.
+    final_response = {
+        "summary": summary.get("summary", "Issue processed"),
+        "metadata": summary.get("metadata", {}),
+        "actions": actions.get("actions", []),
+        "recommendation": safe_reco,
+        "similar_cases": resolution.get("similar_cases", [])
+    }
+    logging.debug("Intermediate final response: %s", final_response)
+
+    # Ensure "summary" is always a dictionary with a "text" key.
+    if not isinstance(final_response.get("summary"), dict):
+        final_response["summary"] = {"text": str(final_response["summary"])}
+    # Ensure "recommendation" is always a dictionary
+    if not isinstance(final_response.get("recommendation"), dict):
+        final_response["recommendation"] = {"solution": str(final_response["recommendation"])}
+    logging.debug("Final response: %s", final_response)
+    return final_response
+
+def agent_errors(outputs) -> List[str]:
+    """"name: error (details)" for each (name, output) pair where the agent call failed."""
+    return [
+        f"{name}: {output['error']} ({output.get('details', '')})"
+        for name, output in outputs if isinstance(output, dict) and "error" in output
+    ]
+
+def failure_response(e: Exception) -> dict:
+    return {
+        "error": "System failure",
+        "details": str(e),
+        "response": "I'm experiencing technical difficulties. Your issue has been logged and our team will investigate."
+    }
+
+def split_fused_response(data) -> Optional[tuple]:
+    """
+    Validate the fused agent's output and split it into the (summary, actions,
+    resolution) dicts the three separate agents would have produced.
+    Returns None if the output doesn't match the merged schema.
+    """
+    if not isinstance(data, dict) or "error" in data:
+        return None
+    if not data.get("summary") or not isinstance(data.get("actions"), list):
+        return None
+    recommendation = safe_parse(data.get("recommendation"), None)
+    if not isinstance(recommendation, dict) or not recommendation.get("solution"):
+        return None
+    metadata = data.get("metadata")
+    return (
+        {"summary": data["summary"], "metadata": metadata if isinstance(metadata, dict) else {}},
+        {"actions": data["actions"]},
+        {"recommendation": recommendation, "similar_cases": data.get("similar_cases") or []}
+    )
+
+async def run_fused(issue_text: str, context) -> Optional[tuple]:
+    fused = await run_agent("fused", issue_text, context, {}, validate=split_fused_response)
+    parts = split_fused_response(fused)
+    if parts is None:
+        logging.warning("Fused agent returned an invalid response, falling back to separate agents: %s", fused)
+    return parts
+
+async def find_similar_cases(issue_text: str, exclude_id: int = None) -> Optional[list]:
+    """
+    Nearest past tickets from the local index, with their stored resolutions.
+    Returns None when the index is disabled, leaving the model's similar_cases.
+    """
+    if similar_index is None:
+        return None
     try:
-        logging.debug("Calling summarizer agent")
-        summary = safe_parse(await agent_system.agents["summarizer"].process(issue_text, context) or {}, {"summary": "", "metadata": {}})
-
-        logging.debug("Calling action_extractor agent")
-        actions = safe_parse(await agent_system.agents["action_extractor"].process(issue_text, context) or {}, {"actions": []})
-
-        logging.debug("Calling resolver agent")
-        resolution = safe_parse(await agent_system.agents["resolver"].process(issue_text, context) or {}, {"recommendation": {}, "similar_cases": []})
-
-        logging.debug("Raw summary response: %s", summary)
-        logging.debug("Raw actions response: %s", actions)
-        logging.debug("Raw resolution response: %s", resolution)
-
-        # Ensure responses are dictionaries.
-        if not isinstance(summary, dict):
-            summary = {"summary": str(summary), "metadata": {}}
-        if not isinstance(actions, dict):
-            actions = {"actions": []}
-        if not isinstance(resolution, dict):
-            resolution = {"recommendation": {}, "similar_cases": []}
-
-        # Process recommendation.
-        raw_reco = safe_parse(resolution.get("recommendation", {}), {"solution": "", "confidence": "0"})
-        confidence_value = raw_reco.get("confidence", "0")
-        try:
-            if isinstance(confidence_value, str):
-                if confidence_value.lower() in ["high", "medium", "low"]:
-                    confidence_numeric = {"high": 80, "medium": 50, "low": 20}.get(confidence_value.lower(), 50)
-                else:
-                    confidence_numeric = int(confidence_value)
-            else:
-                confidence_numeric = int(confidence_value)
-        except (ValueError, TypeError):
-            confidence_numeric = 50
-
-        safe_reco = {
-            "solution": raw_reco.get("solution", "Default solution"),
-            "confidence": confidence_numeric,
-            "steps": raw_reco.get("steps", []),
-            "resources": raw_reco.get("resources", [])
-        }
+        exclude = (exclude_id,) if exclude_id is not None else ()
+        matches = await asyncio.to_thread(similar_index.search, issue_text, SIMILAR_TOP_K, exclude, SIMILAR_MIN_SCORE)
+        details = await asyncio.to_thread(get_tickets_by_ids, [ticket_id for ticket_id, _ in matches], ('id', 'status', 'resolution'))
+    except Exception:
+        logging.exception("Similar ticket lookup failed:")
+        return None
+    return [
+        {"ticket_id": ticket_id, "similarity": score, "status": details[ticket_id]["status"], "resolution": details[ticket_id]["resolution"]}
+        for ticket_id, score in matches if ticket_id in details
+    ]
 
-        # Build final response.
-        final_response = {
-            "summary": summary.get("summary", "Issue processed"),
-            "metadata": summary.get("metadata", {}),
-            "actions": actions.get("actions", []),
-            "recommendation": safe_reco,
-            "similar_cases": resolution.get("similar_cases", [])
-        }
-        logging.debug("Intermediate final response: %s", final_response)
+def similar_context(context, similar_cases):
+    """Prepend similar tickets' resolutions to the context, when SIMILAR_CONTEXT is on."""
+    resolutions = [
+        f"- Ticket #{case['ticket_id']}: {case['resolution'][:300]}"
+        for case in similar_cases or [] if case.get("resolution")
+    ]
+    if not SIMILAR_CONTEXT or not resolutions:
+        return context
+    history = context_budget.history_window(context) if isinstance(context, (list, tuple)) else (context or "")
+    # Most similar first, so the least similar resolutions are the first to go
+    return context_budget.with_preface("Resolutions of similar past tickets:", resolutions, history)
 
-        # Ensure "summary" is always a dictionary with a "text" key.
-        if not isinstance(final_response.get("summary"), dict):
-            final_response["summary"] = {"text": str(final_response["summary"])}
-        # Ensure "recommendation" is always a dictionary
-        if not isinstance(final_response.get("recommendation"), dict):
-            final_response["recommendation"] = {"solution": str(final_response["recommendation"])}
-        logging.debug("Final response: %s", final_response)
-        return final_response
+def with_similar_cases(response: dict, similar_cases) -> dict:
+    if similar_cases is not None:
+        response["similar_cases"] = similar_cases
+    return response
+
+async def handle_ticket(issue_text: str, context: list = None, lane: str = "standard", ticket_id: int = None) -> dict:
+    """
+    Process a ticket using the multi-agent system with enhanced error handling.
+    Ensures the final "summary" field is always a dictionary with a "text" key.
+    ``lane`` ("interactive", "standard" or "batch") orders its API calls in the
+    outbound scheduler; ``ticket_id`` keeps an already stored ticket out of
+    its own similar_cases.
+    """
+    # Greetings, thanks, status checks and confident FAQ answers skip the agents
+    intent = classify_locally(issue_text)
+    if intent is not None:
+        return local_response(intent)
+
+    priority_token = current_priority.set(TicketPriority(lane))
+    try:
+        similar_cases = await find_similar_cases(issue_text, ticket_id)
+        resolver_context = similar_context(context, similar_cases)
+
+        if AGENT_MODE == "fused":
+            parts = await run_fused(issue_text, resolver_context)
+            if parts is not None:
+                return with_similar_cases(build_response(*parts), similar_cases)
+
+        # The agents are independent, so run them concurrently. All three are
+        # queued at the ticket's lane before the summarizer reports a severity,
+        # which then only re-ranks their 429 retries.
+        logging.debug("Calling summarizer, action_extractor and resolver agents")
+        summary, actions, resolution = await asyncio.gather(
+            *(run_agent(name, issue_text, resolver_context if name == "resolver" else context, default)
+              for name, default in AGENT_DEFAULTS.items())
+        )
+        response = with_similar_cases(build_response(summary, actions, resolution), similar_cases)
+        # build_response fills failed agents' fields with placeholders; flag
+        # them so background jobs retry instead of storing the placeholders
+        errors = agent_errors(zip(AGENT_DEFAULTS, (summary, actions, resolution)))
+        if errors:
+            response["agent_errors"] = errors
+        return response
 
     except Exception as e:
         logging.exception("Critical error in handle_ticket:")
-        return {
-            "error": "System failure",
-            "details": str(e),
-            "response": "I'm experiencing technical difficulties. Your issue has been logged and our team will investigate."
-        }
+        return failure_response(e)
+    finally:
+        current_priority.reset(priority_token)
+
+# SSE event name emitted for each agent's partial output
+STREAM_EVENTS = {"summarizer": "summary", "action_extractor": "actions", "resolver": "recommendation"}
+
+async def stream_agent(name: str, issue_text: str, context, events: asyncio.Queue, priority: TicketPriority = None) -> dict:
+    """
+    Stream a single agent's completion, pushing (event, partial_object) pairs
+    onto ``events`` as the JSON fills in. Returns the final parsed output.
+    """
+    agent = agent_system.agents[name]
+    default = AGENT_DEFAULTS[name]
+    event = STREAM_EVENTS[name]
+    # Runs as its own task, so this only affects this agent's calls
+    current_priority.set(priority or TicketPriority("interactive"))
+    cache_key = None
+    if response_cache is not None:
+        cache_key = make_cache_key(agent.name, agent.model, agent.prompt_template, issue_text, context)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            cached = with_fresh_conversation_id(cached)
+            await events.put((event, cached))
+            return cached
+
+    parser = IncrementalJSONParser()
+    content, agent_context = context_budget.prepare(name, issue_text, context)
+
+    async def consume(deltas):
+        async for delta in deltas:
+            partial = parser.feed(delta)
+            if partial:
+                update_ticket_severity(partial)
+                await events.put((event, partial))
+
+    try:
+        # Time spent queued behind the rate limiter doesn't count against
+        # AGENT_TIMEOUT: create_completion times the request itself, and the
+        # timeout below only starts once the stream is open
+        deltas = await agent.open_stream(content, agent_context)
+        await asyncio.wait_for(consume(deltas), timeout=AGENT_TIMEOUT)
+    except asyncio.TimeoutError:
+        logging.error("Agent %s timed out after %ss", name, AGENT_TIMEOUT)
+        return default
+    except Exception:
+        logging.exception("Error streaming %s:", agent.name)
+        return default
+
+    parsed = parser.result()
+    if not isinstance(parsed, dict):
+        logging.error("Could not parse streamed response from %s: %s", agent.name, parser.text)
+        return default
+    if cache_key and cacheable(parsed):
+        response_cache.set(cache_key, parsed)
+    return parsed
+
+async def handle_ticket_stream(issue_text: str, context: list = None, lane: str = "interactive") -> AsyncIterator[tuple]:
+    """
+    Streaming counterpart of handle_ticket. Yields (event, data) pairs: partial
+    "summary", "actions" and "recommendation" objects as tokens arrive, then a
+    single "done" event carrying the same payload handle_ticket would return.
+    """
+    intent = classify_locally(issue_text)
+    if intent is not None:
+        yield "done", local_response(intent)
+        return
+
+    events: asyncio.Queue = asyncio.Queue()
+    priority = TicketPriority(lane)
+    similar_cases = await find_similar_cases(issue_text)
+    resolver_context = similar_context(context, similar_cases)
+    tasks = [
+        asyncio.create_task(stream_agent(name, issue_text, resolver_context if name == "resolver" else context, events, priority))
+        for name in AGENT_DEFAULTS
+    ]
+    finished = asyncio.gather(*tasks)
+    try:
+        while True:
+            getter = asyncio.create_task(events.get())
+            done, _ = await asyncio.wait({getter, finished}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield getter.result()
+                continue
+            getter.cancel()
+            while not events.empty():
+                yield events.get_nowait()
+            break
+        summary, actions, resolution = finished.result()
+        yield "done", with_similar_cases(build_response(summary, actions, resolution), similar_cases)
+    except Exception as e:
+        logging.exception("Critical error in handle_ticket_stream:")
+        yield "error", failure_response(e)
+    finally:
+        for task in tasks:
+            task.cancel()
 
 def format_response(raw: dict) -> str:
     """
@@ -0,0 +1,82 @@
+# bench_agents.py
+"""
+Compare the three-agent and fused agent modes of handle_ticket for latency
+and tokens per ticket. Calls the live Groq API (GROQ_API_KEY must be set)
+unless --offline is given; the response cache is disabled so every ticket
+pays for its completions.
+
+    python bench_agents.py --runs 3
+    python bench_agents.py --offline --latency 0.4
+"""
+import json
+import time
+import asyncio
+import argparse
+import statistics
+
+import ai_module
+
+SAMPLE_ISSUES = [
+    "I can't log in to my account, it says my password is wrong even after resetting it",
+    "The mobile app crashes every time I open the payments screen",
+    "I was charged twice for my subscription this month",
+    "How do I change the email address on my account?",
+    "My order has been stuck in 'processing' for five days",
+]
+
+def usage_snapshot() -> dict:
+    totals = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    for agent in ai_module.agent_system.agents.values():
+        for key in totals:
+            totals[key] += agent.usage[key]
+    return totals
+
+async def bench_mode(mode: str, issues: list, runs: int) -> dict:
+    ai_module.AGENT_MODE = mode
+    latencies = []
+    fallbacks = 0
+    before = usage_snapshot()
+    for _ in range(runs):
+        for issue in issues:
+            calls_before = usage_snapshot()["calls"]
+            start = time.perf_counter()
+            await ai_module.handle_ticket(issue)
+            latencies.append(time.perf_counter() - start)
+            # A fused run that needed the three-agent fallback makes 4 calls
+            if mode == "fused" and usage_snapshot()["calls"] - calls_before > 1:
+                fallbacks += 1
+    after = usage_snapshot()
+    tickets = len(latencies)
+    return {
+        "mode": mode,
+        "tickets": tickets,
+        "latency_mean_s": round(statistics.mean(latencies), 3),
+        "latency_p95_s": round(sorted(latencies)[int(0.95 * (tickets - 1))], 3),
+        "calls_per_ticket": round((after["calls"] - before["calls"]) / tickets, 2),
+        "prompt_tokens_per_ticket": round((after["prompt_tokens"] - before["prompt_tokens"]) / tickets, 1),
+        "completion_tokens_per_ticket": round((after["completion_tokens"] - before["completion_tokens"]) / tickets, 1),
+        "fallbacks": fallbacks
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=1, help="Passes over the sample issues per mode")
+    parser.add_argument("--offline", action="store_true", help="Use fake_groq instead of the live API")
+    parser.add_argument("--latency", type=float, default=0.3, help="Simulated seconds per completion with --offline")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    if args.offline:
+        import fake_groq
+        fake_groq.install(ai_module.agent_system, latency=args.latency)
+        ai_module.scheduler.enabled = False
+    ai_module.response_cache = None
+    results = [await bench_mode(mode, SAMPLE_ISSUES, args.runs) for mode in ("multi", "fused")]
+    for result in results:
+        print(json.dumps(result))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+# bench_database.py
+"""
+Compare ticket insert/read throughput of a connect-per-call baseline against
+the pooled WAL connections and the group-commit writer.
+
+    python bench_database.py --tickets 2000 --threads 8
+"""
+import io
+import os
+import json
+import contextlib
+import time
+import sqlite3
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+
+AI_RESPONSE = {
+    "summary": {"text": "Customer cannot log in"},
+    "metadata": {"sentiment": "negative", "priority": "high", "category": "login issue"},
+    "actions": [{"type": "Password Reset", "description": "Send reset link", "priority": "High"}],
+    "recommendation": {"solution": "Reset the password", "confidence": 80, "steps": [], "resources": []},
+    "similar_cases": []
+}
+
+def baseline_insert(customer_name: str, issue_text: str, ai_response: dict):
+    """The original pattern: new connection, rollback journal, one commit per row."""
+    conn = sqlite3.connect(database.DB_NAME)
+    try:
+        cursor = conn.execute(database.INSERT_TICKET_SQL, database.ticket_row(customer_name, issue_text, ai_response))
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+def baseline_read():
+    conn = sqlite3.connect(database.DB_NAME)
+    try:
+        return conn.execute("SELECT * FROM tickets ORDER BY created_at DESC, id DESC LIMIT 50").fetchall()
+    finally:
+        conn.close()
+
+def pooled_read():
+    with database.get_pool().connection() as conn:
+        return conn.execute("SELECT * FROM tickets ORDER BY created_at DESC, id DESC LIMIT 50").fetchall()
+
+def fresh_db(tmp_dir: str, name: str, group_commit: bool):
+    os.environ["DB_GROUP_COMMIT"] = "true" if group_commit else "false"
+    database.close_pool()
+    database.DB_NAME = os.path.join(tmp_dir, f"{name}.db")
+    database.create_db()
+
+def run(label: str, fn, count: int, threads: int) -> dict:
+    start = time.perf_counter()
+    # insert_ticket prints a debug line per row; keep the report readable.
+    with ThreadPoolExecutor(max_workers=threads) as pool, contextlib.redirect_stdout(io.StringIO()):
+        list(pool.map(fn, range(count)))
+    elapsed = time.perf_counter() - start
+    result = {"label": label, "ops": count, "seconds": round(elapsed, 4), "ops_per_sec": round(count / elapsed, 1)}
+    print(f"{label:<28} {result['ops_per_sec']:>10.1f} ops/s  ({elapsed:.3f}s)")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=2000)
+    parser.add_argument("--reads", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        fresh_db(tmp_dir, "baseline", group_commit=False)
+        database.close_pool()
+        results.append(run("insert: connect-per-call", lambda i: baseline_insert("bench", f"issue {i}", AI_RESPONSE), args.tickets, args.threads))
+        results.append(run("read: connect-per-call", lambda i: baseline_read(), args.reads, args.threads))
+
+        fresh_db(tmp_dir, "pooled", group_commit=False)
+        results.append(run("insert: pooled WAL", lambda i: database.insert_ticket("bench", f"issue {i}", AI_RESPONSE), args.tickets, args.threads))
+        results.append(run("read: pooled WAL", lambda i: pooled_read(), args.reads, args.threads))
+
+        fresh_db(tmp_dir, "group_commit", group_commit=True)
+        results.append(run("insert: pooled + group commit", lambda i: database.insert_ticket("bench", f"issue {i}", AI_RESPONSE), args.tickets, args.threads))
+        database.close_pool()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
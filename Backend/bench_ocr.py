@@ -0,0 +1,106 @@
+# bench_ocr.py
+"""
+OCR time and accuracy with and without image preprocessing. The corpus is a
+directory of images with an optional same-named .txt holding the expected
+text; without --corpus, 4K light and dark mode screenshots with known text
+are generated. Accuracy is the character similarity between the expected
+and recognized text (difflib ratio, whitespace and case normalized).
+
+    python bench_ocr.py --samples 6
+    python bench_ocr.py --corpus ./screenshots
+"""
+import io
+import os
+import json
+import glob
+import time
+import random
+import shutil
+import difflib
+import argparse
+import statistics
+
+from PIL import Image, ImageDraw, ImageFont
+
+from media import TESSERACT_CMD, run_tesseract
+from image_preprocess import preprocess, to_pnm
+
+WORDS = ("account login password reset error payment card charged twice refund order shipping "
+         "invoice subscription screen crash update version settings email address support ticket").split()
+
+def synthetic_screenshot(rng: random.Random, dark: bool, size=(3840, 2160)):
+    """A phone/desktop-like capture: a title bar, a sidebar and paragraphs of text."""
+    background, ink = ((32, 33, 36), (232, 234, 237)) if dark else ((255, 255, 255), (32, 33, 36))
+    image = Image.new("RGB", size, background)
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, size[0], 140), fill=(26, 115, 232))
+    draw.rectangle((0, 140, 520, size[1]), fill=(60, 64, 67) if dark else (241, 243, 244))
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", 40)
+    except OSError:
+        font = ImageFont.load_default()
+    lines = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 10))) for _ in range(rng.randint(8, 14))]
+    for i, line in enumerate(lines):
+        draw.text((640, 260 + i * 90), line, fill=ink, font=font)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue(), "\n".join(lines)
+
+def load_corpus(path: str):
+    for image_path in sorted(glob.glob(os.path.join(path, "*"))):
+        if image_path.endswith(".txt"):
+            continue
+        with open(image_path, "rb") as f:
+            data = f.read()
+        text_path = os.path.splitext(image_path)[0] + ".txt"
+        expected = open(text_path, encoding="utf-8").read() if os.path.exists(text_path) else None
+        yield os.path.basename(image_path), data, expected
+
+def similarity(expected: str, actual: str) -> float:
+    normalize = lambda text: " ".join(text.lower().split())
+    return difflib.SequenceMatcher(None, normalize(expected), normalize(actual)).ratio()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory of images (and expected .txt files)")
+    parser.add_argument("--samples", type=int, default=6, help="generated screenshots when no corpus is given")
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = list(load_corpus(args.corpus))
+    else:
+        rng = random.Random(7)
+        corpus = [(f"synthetic_{i}.png", *synthetic_screenshot(rng, dark=i % 2 == 1)) for i in range(args.samples)]
+
+    ocr = shutil.which(TESSERACT_CMD) is not None
+    if not ocr:
+        print(f"{TESSERACT_CMD} not found: reporting preprocessing only")
+    rows = []
+    for name, data, expected in corpus:
+        row = {"image": name}
+        start = time.perf_counter()
+        image, dpi = preprocess(data)
+        pnm = to_pnm(image)
+        row["preprocess_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        original = Image.open(io.BytesIO(data)).size
+        row["pixels_before"], row["pixels_after"] = original[0] * original[1], image.width * image.height
+        if ocr:
+            start = time.perf_counter()
+            before = run_tesseract(data)
+            row["ocr_before_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            start = time.perf_counter()
+            after = run_tesseract(pnm, dpi)
+            row["ocr_after_ms"] = round((time.perf_counter() - start) * 1000 + row["preprocess_ms"], 1)
+            if expected is not None:
+                row["accuracy_before"] = round(similarity(expected, before), 4)
+                row["accuracy_after"] = round(similarity(expected, after), 4)
+        rows.append(row)
+
+    summary = {
+        key: round(statistics.median(row[key] for row in rows), 4)
+        for key in rows[0] if key != "image" and all(key in row for row in rows)
+    }
+    print(json.dumps({"images": rows, "median": summary}, indent=2))
+
+if __name__ == "__main__":
+    main()
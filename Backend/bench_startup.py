@@ -0,0 +1,64 @@
+# bench_startup.py
+"""
+Measure API cold start: each run spawns a fresh interpreter that imports
+main.py and runs its lifespan startup against a scratch database, the same
+work a new uvicorn worker does before it accepts requests.
+
+    python bench_startup.py --runs 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+# Runs in the child process; prints the app's startup profile as JSON
+CHILD = """
+import asyncio, json, logging, sys, time
+import main
+logging.disable(logging.CRITICAL)
+
+async def start():
+    async with main.app.router.lifespan_context(main.app):
+        profile = dict(main.startup_profile)
+        profile["loaded"] = sorted(name for name in ("speech_recognition", "PIL", "pyarrow")
+                                   if name in sys.modules)
+        return profile
+
+print(json.dumps(asyncio.run(start())))
+"""
+
+def run_once(backend_dir: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("GROQ_API_KEY", "offline-benchmark")
+    # Cold start only: no queue workers, no network warm-up, no index rebuild
+    env.update({"JOB_WORKERS": "0", "GROQ_WARMUP_CONNECTIONS": "0", "SIMILAR_INDEX_ENABLED": "false",
+                "PYTHONPATH": backend_dir})
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", CHILD], cwd=tmp_dir, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        wall_ms = (time.perf_counter() - start) * 1000
+    profile = json.loads(output.strip().splitlines()[-1])
+    profile["process_ms"] = round(wall_ms, 1)
+    return profile
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    runs = [run_once(backend_dir) for _ in range(args.runs)]
+    report = {
+        key: round(statistics.median(run[key] for run in runs), 1)
+        for key in runs[0] if key.endswith("_ms")
+    }
+    report["loaded_at_ready"] = runs[0]["loaded"]
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# bench_suite.py
+"""
+Offline micro-benchmarks for the ticket pipeline and database layer.
+
+Agents talk to fake_groq.FakeAsyncGroq (no network), and every database
+benchmark runs against a temporary SQLite file pre-filled to each size.
+Results are written as JSON; pass a previous run with --compare to flag
+regressions.
+
+    python bench_suite.py --sizes 1000,100000,1000000 --output bench.json
+    python bench_suite.py --sizes 1000 --compare bench.json --threshold 0.25
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import logging
+import argparse
+import platform
+import tempfile
+import contextlib
+import statistics
+from datetime import datetime
+
+# ai_module refuses to start without a key; the fake client never uses it
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+# Time the pipeline itself, not pacing against the live API's rate limits
+os.environ["GROQ_SCHEDULER_ENABLED"] = "false"
+# Don't write the similar-ticket index while populating benchmark databases
+os.environ["SIMILAR_INDEX_ENABLED"] = "false"
+# Every benchmark ticket should reach the agents
+os.environ["INTENT_CLASSIFIER_ENABLED"] = "false"
+
+import database
+import ai_module
+import fake_groq
+
+POPULATE_CHUNK = 10000
+
+def timed(name: str, size, fn, repeat: int) -> dict:
+    """Call ``fn`` ``repeat`` times and summarize per-call wall time in ms."""
+    samples = []
+    # database.py prints a debug line per write; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    result = {
+        "name": name,
+        "size": size,
+        "ops": repeat,
+        "mean_ms": round(statistics.mean(samples), 4),
+        "min_ms": round(samples[0], 4),
+        "p95_ms": round(samples[int(0.95 * (len(samples) - 1))], 4)
+    }
+    print(f"{name:<28} {str(size or '-'):>9} {result['mean_ms']:>12.4f} ms  (min {result['min_ms']:.4f}, p95 {result['p95_ms']:.4f}, n={repeat})")
+    return result
+
+def timed_bytes(name: str, size, fn, repeat: int) -> dict:
+    """Like timed(), for a serializer: also reports output size and throughput."""
+    result = timed(name, size, fn, repeat)
+    result["bytes"] = len(fn())
+    result["mb_per_s"] = round(result["bytes"] / result["mean_ms"] / 1000, 2) if result["mean_ms"] else None
+    print(f"{'':<28} {'':>9} {result['bytes']:>12} bytes  ({result['mb_per_s']} MB/s)")
+    return result
+
+def bench_serialization(repeat: int) -> list:
+    """Stdlib jsonable_encoder + json.dumps versus the fast_json paths for a 1000-ticket page."""
+    from fastapi.encoders import jsonable_encoder
+    import fast_json
+    decoded, _ = database.get_tickets_page(limit=1000)
+    raw, _ = database.get_tickets_page(limit=1000, decode=False)
+    return [
+        timed_bytes("serialize_page_stdlib", len(decoded),
+                    lambda: json.dumps(jsonable_encoder(decoded), ensure_ascii=False).encode("utf-8"), repeat),
+        timed_bytes("serialize_page_fast", len(decoded), lambda: fast_json.dumps(decoded), repeat),
+        timed_bytes("serialize_page_fast_raw", len(raw), lambda: fast_json.dumps_rows(raw, "ai_response"), repeat),
+    ]
+
+def bench_pipeline(repeat: int) -> list:
+    fake_groq.install(ai_module.agent_system)
+    ai_module.response_cache = None
+    agent_text = json.dumps(fake_groq.RESOLUTION)
+    parts = (dict(fake_groq.SUMMARY), dict(fake_groq.ACTIONS), dict(fake_groq.RESOLUTION))
+    loop = asyncio.new_event_loop()
+    try:
+        return [
+            timed("handle_ticket", None, lambda: loop.run_until_complete(
+                ai_module.handle_ticket("I can't log in to my account after resetting my password")), repeat),
+            timed("safe_parse", None, lambda: ai_module.safe_parse(agent_text, {}), repeat * 10),
+            timed("build_response", None, lambda: ai_module.build_response(*parts), repeat * 10),
+        ]
+    finally:
+        loop.close()
+
+def stored_response() -> dict:
+    """The ai_response shape handle_ticket stores for a typical ticket."""
+    return ai_module.build_response(dict(fake_groq.SUMMARY), dict(fake_groq.ACTIONS), dict(fake_groq.RESOLUTION))
+
+def populate(size: int):
+    """Fill the current database with ``size`` tickets using batched inserts."""
+    ai_response = stored_response()
+    rng = random.Random(size)
+    with contextlib.redirect_stdout(io.StringIO()):
+        for start in range(0, size, POPULATE_CHUNK):
+            count = min(POPULATE_CHUNK, size - start)
+            database.insert_tickets([
+                (f"customer_{rng.randrange(size // 10 + 1)}", f"Benchmark issue {start + i}: cannot log in", ai_response)
+                for i in range(count)
+            ])
+
+def bench_database(size: int, repeat: int, full_scan_limit: int, client) -> list:
+    results = []
+    ai_response = stored_response()
+    summary = {"severity": "high", "category": "login issue", "key_points": ["cannot log in"]}
+    actions = {"immediate_actions": ["reset password"], "escalation": {"required": False}}
+    resolution = {"steps": ["reset"], "resources": [], "total_estimated_time": "10m"}
+    rng = random.Random(0)
+
+    results.append(timed("insert_ticket", size, lambda: database.insert_ticket("bench", "new issue", ai_response), repeat))
+    results.append(timed("update_ticket", size, lambda: database.update_ticket(rng.randint(1, size), summary, actions, resolution), repeat))
+    results.append(timed("get_tickets_page", size, lambda: database.get_tickets_page(limit=100), repeat))
+    results.append(timed("get_tickets_page_priority", size, lambda: database.get_tickets_page(priority="high", limit=100), repeat))
+    results.append(timed("get_tickets_page_deep", size, lambda: database.get_tickets_page(after_id=size // 2, limit=100), repeat))
+
+    if size <= full_scan_limit:
+        full_repeat = max(1, min(repeat, 10_000_000 // (size * 100)))
+        results.append(timed("get_all_tickets", size, database.get_all_tickets, full_repeat))
+        results.append(timed("get_all_tickets_projected", size,
+                             lambda: database.get_all_tickets(columns=('id', 'status')), full_repeat))
+        tickets = database.get_all_tickets()
+        results.append(timed("serialize_all_tickets", size, lambda: json.dumps(tickets), full_repeat))
+        del tickets
+
+    if size >= 1000:
+        results.extend(bench_serialization(max(1, repeat // 10)))
+
+    if client is not None:
+        results.append(timed("GET /get_tickets/", size, lambda: client.get("/get_tickets/?limit=100"), repeat))
+        results.append(timed("GET /get_tickets/ (1000)", size, lambda: client.get("/get_tickets/?limit=1000"), max(1, repeat // 10)))
+    return results
+
+def compare(results: list, baseline_path: str, threshold: float) -> int:
+    with open(baseline_path) as f:
+        baseline = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    for result in results:
+        previous = baseline.get((result["name"], result["size"]))
+        if not previous or not previous["mean_ms"]:
+            continue
+        change = result["mean_ms"] / previous["mean_ms"] - 1
+        if change > threshold:
+            regressions += 1
+            print(f"REGRESSION {result['name']} @ {result['size']}: {previous['mean_ms']:.4f} -> {result['mean_ms']:.4f} ms ({change:+.0%})")
+    print(f"{regressions} regression(s) above {threshold:.0%}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Comma-separated ticket counts")
+    parser.add_argument("--repeat", type=int, default=200, help="Calls per benchmark")
+    parser.add_argument("--full-scan-limit", type=int, default=1000000,
+                        help="Skip get_all_tickets/serialization above this many tickets")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown before flagging (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+
+    results = bench_pipeline(args.repeat)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Keep the app off the real database; lifespan startup isn't run here
+        database.DB_NAME = os.path.join(tmp_dir, "bench_app.db")
+        try:
+            from fastapi.testclient import TestClient
+            import main as api
+            client = TestClient(api.app)
+        except ImportError as e:
+            print(f"Skipping endpoint benchmarks: {e}")
+            client = None
+
+        for size in sizes:
+            database.DB_NAME = os.path.join(tmp_dir, f"bench_{size}.db")
+            database.create_db()
+            start = time.perf_counter()
+            populate(size)
+            print(f"-- populated {size} tickets in {time.perf_counter() - start:.1f}s")
+            results.extend(bench_database(size, args.repeat, args.full_scan_limit, client))
+            database.close_pool()
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "results": results
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        sys.exit(1 if compare(results, args.compare, args.threshold) else 0)
+
+if __name__ == "__main__":
+    main()
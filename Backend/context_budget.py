@@ -0,0 +1,189 @@
+# context_budget.py
+import os
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Roughly one token per word or punctuation mark; close enough to the Llama
+# tokenizer for budgeting, and orders of magnitude cheaper than running it
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+# Lines worth keeping when a long paste has to be cut down
+_SIGNAL_RE = re.compile(
+    r"error|exception|fail|cannot|can't|unable|denied|invalid|timeout|timed out|crash|refund|charged|locked|not working",
+    re.IGNORECASE
+)
+
+def estimate_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text or ""))
+
+def truncate_to_budget(text: str, budget: int) -> str:
+    """Hard cut to ``budget`` tokens, keeping the start of the text."""
+    if budget <= 0:
+        return ""
+    matches = list(_TOKEN_RE.finditer(text))
+    if len(matches) <= budget:
+        return text
+    return text[:matches[budget - 1].end()] + " [...]"
+
+def compact_text(text: str, budget: int) -> str:
+    """
+    Extractively shrink ``text`` to about ``budget`` tokens: drop repeated
+    lines (typical of pasted logs), then keep the opening, the closing and
+    the lines that mention errors or failures, in their original order.
+    The "[... N lines omitted ...]" markers count against the budget.
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+
+    seen = set()
+    segments = []
+    for segment in _SENTENCE_RE.split(text):
+        segment = segment.strip()
+        key = re.sub(r"\d+", "#", segment.lower())
+        if segment and key not in seen:
+            seen.add(key)
+            segments.append(segment)
+
+    costs = [estimate_tokens(segment) for segment in segments]
+    if sum(costs) <= budget:
+        return "\n".join(segments)
+
+    # Opening and closing segments carry the customer's own framing
+    order = [0, len(segments) - 1]
+    order += [i for i in range(1, len(segments) - 1) if _SIGNAL_RE.search(segments[i])]
+    order += [i for i in range(1, len(segments) - 1) if i not in order]
+
+    # Every run of dropped segments becomes one marker; start with one run of all of them
+    marker_cost = estimate_tokens(_omitted(len(segments)))
+    keep, used = set(), marker_cost
+    for i in order:
+        if i in keep:
+            continue
+        # Keeping i splits its run in two, shortens it, or closes it
+        closed = (i == 0 or i - 1 in keep) + (i == len(segments) - 1 or i + 1 in keep)
+        cost = costs[i] + (1 - closed) * marker_cost
+        if used + cost > budget:
+            continue
+        keep.add(i)
+        used += cost
+
+    if not keep:
+        return truncate_to_budget(text, budget)
+
+    parts, skipped = [], 0
+    for i, segment in enumerate(segments):
+        if i in keep:
+            if skipped:
+                parts.append(_omitted(skipped))
+                skipped = 0
+            parts.append(segment)
+        else:
+            skipped += 1
+    if skipped:
+        parts.append(_omitted(skipped))
+    return "\n".join(parts)
+
+def _omitted(lines: int) -> str:
+    return f"[... {lines} lines omitted ...]"
+
+class ContextBudget:
+    """Per-agent input token budgets plus a bounded rolling conversation window."""
+
+    def __init__(self, budgets: Dict[str, int], history_budget: int = 400, default_budget: int = 1500):
+        self.budgets = budgets
+        self.history_budget = history_budget
+        self.default_budget = default_budget
+        self.calls = 0
+        self.compacted = 0
+        self.tokens_in = 0
+        self.tokens_sent = 0
+
+    def prepare(self, agent_name: str, content: str, context: Any = "") -> Tuple[str, str]:
+        """Fit ``content`` and ``context`` into ``agent_name``'s input budget."""
+        budget = self.budgets.get(agent_name, self.default_budget)
+        if context is None:
+            context = ""
+        elif not isinstance(context, str):
+            context = self.history_window(context)
+
+        original_context_tokens = context_tokens = estimate_tokens(context)
+        if context_tokens > self.history_budget:
+            context = truncate_to_budget(context, self.history_budget)
+            context_tokens = estimate_tokens(context)
+
+        content_tokens = estimate_tokens(content)
+        content_budget = max(budget - context_tokens, budget // 2)
+        if content_tokens > content_budget:
+            content = compact_text(content, content_budget)
+            self.compacted += 1
+            sent_tokens = estimate_tokens(content)
+        else:
+            sent_tokens = content_tokens
+
+        self.calls += 1
+        self.tokens_in += content_tokens + original_context_tokens
+        self.tokens_sent += sent_tokens + context_tokens
+        return content, context
+
+    def history_window(self, history: Sequence) -> str:
+        """
+        Build a chronological context string from conversation rows as returned
+        by get_conversation_history (newest first), keeping as many recent
+        messages as fit in the history budget.
+        """
+        lines: List[str] = []
+        used = 0
+        for row in history:
+            if isinstance(row, (list, tuple)) and len(row) == 2:
+                line = f"{row[1]}: {row[0]}"
+            else:
+                line = str(row)
+            cost = estimate_tokens(line)
+            if used + cost > self.history_budget:
+                break
+            lines.append(line)
+            used += cost
+        return "\n".join(reversed(lines))
+
+    def with_preface(self, header: str, lines: Sequence[str], history: str) -> str:
+        """
+        Put ``header`` and the leading ``lines`` that fit before ``history``
+        within the history budget. The preface gives way first, so prepare()
+        never has to cut into the conversation to make room for it.
+        """
+        used = estimate_tokens(history) + estimate_tokens(header)
+        kept = []
+        for line in lines:
+            cost = estimate_tokens(line)
+            if used + cost > self.history_budget:
+                break
+            kept.append(line)
+            used += cost
+        if not kept:
+            return history
+        return "\n".join([header, *kept] + ([history] if history else []))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "compacted_calls": self.compacted,
+            "tokens_in": self.tokens_in,
+            "tokens_sent": self.tokens_sent,
+            "tokens_saved": self.tokens_in - self.tokens_sent,
+            "budgets": self.budgets,
+            "history_budget": self.history_budget
+        }
+
+def budget_from_env() -> ContextBudget:
+    default_budget = int(os.getenv("AGENT_INPUT_TOKENS", "1500"))
+    return ContextBudget(
+        budgets={
+            "summarizer": int(os.getenv("SUMMARIZER_INPUT_TOKENS", str(default_budget))),
+            "action_extractor": int(os.getenv("ACTION_EXTRACTOR_INPUT_TOKENS", str(default_budget))),
+            "resolver": int(os.getenv("RESOLVER_INPUT_TOKENS", str(default_budget))),
+            "fused": int(os.getenv("FUSED_INPUT_TOKENS", str(default_budget)))
+        },
+        history_budget=int(os.getenv("HISTORY_INPUT_TOKENS", "400")),
+        default_budget=default_budget
+    )
@@ -1,149 +1,549 @@
 import sqlite3
 import json
-from typing import Dict, Any, List
+import logging
+import threading
+from typing import Dict, Any, Callable, List, Tuple
+from db_pool import ConnectionPool, GroupCommitWriter, pool_size_from_env, group_commit_enabled, group_commit_delay_from_env
 
 DB_NAME = "tickets.db"
 
+_pool = None
+_writer = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Return the shared connection pool, (re)creating it if DB_NAME changed."""
+    global _pool, _writer
+    if _pool is None or _pool.db_name != DB_NAME:
+        with _pool_lock:
+            if _pool is None or _pool.db_name != DB_NAME:
+                close_pool()
+                _pool = ConnectionPool(DB_NAME, size=pool_size_from_env())
+                if group_commit_enabled():
+                    _writer = GroupCommitWriter(_pool, max_delay=group_commit_delay_from_env())
+    return _pool
+
+def get_writer():
+    """Return the group-commit writer, or None when DB_GROUP_COMMIT is off."""
+    get_pool()
+    return _writer
+
+def close_pool():
+    global _pool, _writer
+    if _writer is not None:
+        _writer.close()
+        _writer = None
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+# Callables invoked with [(ticket_id, issue_text), ...] after tickets are
+# inserted or their text changes; used to keep derived indexes current
+insert_listeners: List[Callable[[List[Tuple[int, str]]], None]] = []
+
+def notify_inserted(rows: List[Tuple[int, str]]):
+    for listener in insert_listeners:
+        try:
+            listener(rows)
+        except Exception:
+            # The tickets are already stored; a stale derived index must not fail the insert
+            logging.exception("Insert listener %s failed", listener)
+
+ANALYSIS_COLUMNS = (
+    ('severity', 'TEXT'),
+    ('category', 'TEXT'),
+    ('key_points', 'TEXT'),
+    ('immediate_actions', 'TEXT'),
+    ('escalation_required', 'BOOLEAN'),
+    ('escalation_reason', 'TEXT'),
+    ('team_assignment', 'TEXT'),
+    ('follow_ups', 'TEXT'),
+    ('required_info', 'TEXT'),
+    ('resolution_steps', 'TEXT'),
+    ('alternative_solutions', 'TEXT'),
+    ('required_resources', 'TEXT'),
+    ('estimated_time', 'TEXT'),
+)
+
+# (column, type, expression over the JSON value of ai_response)
+GENERATED_COLUMNS = (
+    ('ai_priority', 'TEXT', "lower(json_extract(ai_response, '$.metadata.priority'))"),
+    ('ai_category', 'TEXT', "json_extract(ai_response, '$.metadata.category')"),
+    ('ai_confidence', 'REAL', "CASE WHEN json_type(ai_response, '$.recommendation.confidence') IN ('integer', 'real') "
+                              "THEN json_extract(ai_response, '$.recommendation.confidence') END"),
+)
+
+def _add_generated_columns(cursor, existing):
+    """Add the JSON1 generated columns and their indexes (needs SQLite >= 3.31)."""
+    try:
+        for column, column_type, expression in GENERATED_COLUMNS:
+            if column not in existing:
+                # json_valid guards writes against legacy non-JSON ai_response values
+                cursor.execute(f'''
+                    ALTER TABLE tickets ADD COLUMN {column} {column_type} GENERATED ALWAYS AS (
+                        CASE WHEN json_valid(ai_response) THEN {expression} END
+                    ) VIRTUAL
+                ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_ai_priority ON tickets (ai_priority, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_ai_category ON tickets (ai_category, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_ai_confidence ON tickets (ai_confidence)')
+    except sqlite3.OperationalError as e:
+        logging.warning("Generated columns unavailable (SQLite %s): %s", sqlite3.sqlite_version, e)
+
 def create_db():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    # Create tickets table with all necessary columns
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS tickets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            customer_name TEXT NOT NULL,
-            issue_text TEXT NOT NULL,
-            summary TEXT,
-            resolution TEXT,
-            status TEXT DEFAULT 'Pending',
-            ai_response TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
+    with get_pool().transaction() as conn:
+        cursor = conn.cursor()
+
+        # Create tickets table with all necessary columns
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS tickets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                customer_name TEXT NOT NULL,
+                issue_text TEXT NOT NULL,
+                summary TEXT,
+                resolution TEXT,
+                status TEXT DEFAULT 'Pending',
+                ai_response TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Chat conversations, used for the rolling context window
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS conversations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                customer_name TEXT NOT NULL,
+                context TEXT,
+                last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS conversation_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conversation_id INTEGER,
+                message TEXT NOT NULL,
+                role TEXT NOT NULL,
+                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (conversation_id) REFERENCES conversations(id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_conversation_messages_conv_id ON conversation_messages (conversation_id, id)')
+
+        # Detailed analysis columns written by update_ticket, added to
+        # databases created before they existed
+        # table_xinfo also lists generated columns, which table_info hides
+        existing = {row[1] for row in cursor.execute('PRAGMA table_xinfo(tickets)')}
+        for column, column_type in ANALYSIS_COLUMNS:
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE tickets ADD COLUMN {column} {column_type}')
+
+        # Frequently filtered ai_response fields, extracted by SQLite's JSON1
+        # so list filters and aggregates never parse the JSON in Python
+        _add_generated_columns(cursor, existing)
+
+        # Indexes backing keyset pagination and the list filters
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_status_id ON tickets (status, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_customer_id ON tickets (customer_name, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON tickets (created_at)')
+
+        # Per-status ticket counters, kept current by triggers so every write
+        # that touches tickets.status updates them in the same transaction
+        stats_exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ticket_stats'"
+        ).fetchone()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ticket_stats (
+                status TEXT PRIMARY KEY,
+                count INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_ticket_stats_insert AFTER INSERT ON tickets
+            BEGIN
+                INSERT INTO ticket_stats (status, count) VALUES (COALESCE(NEW.status, 'Pending'), 1)
+                ON CONFLICT(status) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_ticket_stats_delete AFTER DELETE ON tickets
+            BEGIN
+                UPDATE ticket_stats SET count = count - 1 WHERE status = COALESCE(OLD.status, 'Pending');
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_ticket_stats_update AFTER UPDATE OF status ON tickets
+            WHEN COALESCE(OLD.status, 'Pending') IS NOT COALESCE(NEW.status, 'Pending')
+            BEGIN
+                UPDATE ticket_stats SET count = count - 1 WHERE status = COALESCE(OLD.status, 'Pending');
+                INSERT INTO ticket_stats (status, count) VALUES (COALESCE(NEW.status, 'Pending'), 1)
+                ON CONFLICT(status) DO UPDATE SET count = count + 1;
+            END
+        ''')
+        if not stats_exists:
+            _rebuild_ticket_stats(conn)
+
+        # Durable background processing queue (see job_queue.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ticket_id INTEGER NOT NULL,
+                payload TEXT,
+                media BLOB,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                lease_owner TEXT,
+                lease_expires_at REAL,
+                available_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                FOREIGN KEY (ticket_id) REFERENCES tickets(id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status_available ON jobs (status, available_at)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_ticket_id ON jobs (ticket_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_jobs_lease_owner ON jobs (lease_owner)')
+
+def _rebuild_ticket_stats(conn):
+    conn.execute('DELETE FROM ticket_stats')
+    conn.execute('''
+        INSERT INTO ticket_stats (status, count)
+        SELECT COALESCE(status, 'Pending'), COUNT(*) FROM tickets GROUP BY COALESCE(status, 'Pending')
     ''')
-    
-    conn.commit()
-    conn.close()
+
+def rebuild_ticket_stats() -> Dict[str, int]:
+    """Recompute the per-status counters from the tickets table"""
+    with get_pool().transaction() as conn:
+        _rebuild_ticket_stats(conn)
+    return get_ticket_status_counts()
+
+def get_ticket_status_counts() -> Dict[str, int]:
+    """Return {status: count} from the maintained counters"""
+    with get_pool().connection() as conn:
+        rows = conn.execute('SELECT status, count FROM ticket_stats WHERE count > 0').fetchall()
+    return dict(rows)
+
+INSERT_TICKET_SQL = '''
+    INSERT INTO tickets (
+        customer_name,
+        issue_text,
+        summary,
+        resolution,
+        status,
+        ai_response,
+        created_at
+    ) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+'''
+
+def ticket_row(customer_name: str, issue_text: str, ai_response: dict = None) -> tuple:
+    """Build the parameter tuple for INSERT_TICKET_SQL."""
+    return (
+        customer_name,
+        issue_text,
+        ai_response.get('summary', {}).get('text') if ai_response else None,
+        ai_response.get('recommendation', {}).get('solution') if ai_response else None,
+        'Pending',
+        json.dumps(ai_response) if ai_response else None
+    )
 
 def insert_ticket(customer_name: str, issue_text: str, ai_response: dict = None):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    params = ticket_row(customer_name, issue_text, ai_response)
     try:
-        cursor.execute('''
-            INSERT INTO tickets (
-                customer_name, 
-                issue_text,
-                summary,
-                resolution,
-                status,
-                ai_response,
-                created_at
-            ) VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (
-            customer_name,
-            issue_text,
-            ai_response.get('summary', {}).get('text') if ai_response else None,
-            ai_response.get('recommendation', {}).get('solution') if ai_response else None,
-            'Pending',
-            json.dumps(ai_response) if ai_response else None
-        ))
-        conn.commit()
-        ticket_id = cursor.lastrowid
+        writer = get_writer()
+        if writer is not None:
+            ticket_id = writer.execute(INSERT_TICKET_SQL, params)
+        else:
+            with get_pool().transaction() as conn:
+                ticket_id = conn.execute(INSERT_TICKET_SQL, params).lastrowid
         print(f"Inserted ticket {ticket_id}")  # Debug print
+        notify_inserted([(ticket_id, issue_text)])
         return ticket_id
     except Exception as e:
         print(f"Error inserting ticket: {e}")  # Debug print
         raise
-    finally:
-        conn.close()
 
-def get_all_tickets():
-    conn = sqlite3.connect(DB_NAME)
+def insert_tickets(tickets: List[tuple]) -> List[int]:
+    """
+    Insert many (customer_name, issue_text, ai_response) tuples with one
+    executemany in a single transaction and return their ticket ids in order.
+    """
+    if not tickets:
+        return []
+    rows = [ticket_row(*ticket) for ticket in tickets]
     try:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM tickets ORDER BY created_at DESC, id DESC
-        """)
-        columns = [description[0] for description in cursor.description]
-        tickets = cursor.fetchall()
-        result = []
+        with get_pool().transaction() as conn:
+            conn.executemany(INSERT_TICKET_SQL, rows)
+            # The write lock is held until commit, so the AUTOINCREMENT ids
+            # of this batch are contiguous and end at last_insert_rowid()
+            last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        logging.debug("Inserted %d tickets", len(rows))
+        ticket_ids = list(range(last_id - len(rows) + 1, last_id + 1))
+        notify_inserted([(ticket_id, ticket[1]) for ticket_id, ticket in zip(ticket_ids, tickets)])
+        return ticket_ids
+    except Exception:
+        logging.exception("Error inserting %d tickets", len(rows))
+        raise
+
+# Columns callers may project; ai_response is the only one stored as JSON
+TICKET_COLUMNS = (
+    ('id', 'customer_name', 'issue_text', 'summary', 'resolution', 'status', 'ai_response', 'created_at')
+    + tuple(column for column, _ in ANALYSIS_COLUMNS)
+    + tuple(column for column, _, _ in GENERATED_COLUMNS)
+)
+
+def _decode_ticket(ticket_dict: Dict[str, Any]) -> Dict[str, Any]:
+    # Parse the AI response JSON if it exists
+    if ticket_dict.get('ai_response'):
+        try:
+            ticket_dict['ai_response'] = json.loads(ticket_dict['ai_response'])
+        except json.JSONDecodeError:
+            ticket_dict['ai_response'] = None
+    return ticket_dict
+
+class JSONText(str):
+    """ai_response text that SQLite's json_valid() accepted, safe to splice into a JSON body as-is."""
+
+# Selected after the projected columns whenever raw ai_response text is returned
+_JSON_VALID = 'json_valid(ai_response)'
+
+def _mark_json(columns: tuple, rows) -> list:
+    """Drop the trailing json_valid flag from each row, wrapping valid ai_response values in JSONText."""
+    index = columns.index('ai_response')
+    marked = []
+    for row in rows:
+        row = list(row)
+        if row.pop() and row[index] is not None:
+            row[index] = JSONText(row[index])
+        marked.append(tuple(row))
+    return marked
+
+def _projection(columns) -> tuple:
+    columns = tuple(columns)
+    unknown = [column for column in columns if column not in TICKET_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown ticket columns: {', '.join(unknown)}")
+    return columns
+
+def _rows_to_tickets(columns: tuple, rows, decode: bool) -> List[Dict[str, Any]]:
+    """Zip rows into dicts, parsing ai_response only if it was selected and ``decode`` is set."""
+    tickets = [dict(zip(columns, row)) for row in rows]
+    if decode and 'ai_response' in columns:
         for ticket in tickets:
-            ticket_dict = dict(zip(columns, ticket))
-            # Parse the AI response JSON if it exists
-            if ticket_dict.get('ai_response'):
-                try:
-                    ticket_dict['ai_response'] = json.loads(ticket_dict['ai_response'])
-                except json.JSONDecodeError:
-                    ticket_dict['ai_response'] = None
-            result.append(ticket_dict)
-        return result
+            _decode_ticket(ticket)
+    return tickets
+
+def get_all_tickets(columns=None, status: str = None, decode: bool = True):
+    """
+    Fetch all tickets, newest first. ``columns`` limits the SELECT to those
+    columns (default: every column); ``ai_response`` is only JSON-decoded
+    when selected and ``decode`` is true.
+    """
+    try:
+        with get_pool().connection() as conn:
+            cursor = conn.cursor()
+            select = ', '.join(_projection(columns)) if columns else '*'
+            where, params = ('WHERE status = ?', (status,)) if status else ('', ())
+            cursor.execute(f"""
+                SELECT {select} FROM tickets {where} ORDER BY created_at DESC, id DESC
+            """, params)
+            names = tuple(description[0] for description in cursor.description)
+            tickets = cursor.fetchall()
+        return _rows_to_tickets(names, tickets, decode)
+    except ValueError:
+        raise
     except Exception as e:
         print(f"Error fetching tickets: {e}")
         return []
-    finally:
-        conn.close()
 
-def update_ticket(ticket_id: int, summary: Dict[str, Any], actions: Dict[str, Any], resolution: Dict[str, Any]):
-    """Update ticket with detailed AI analysis results"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+TICKET_LIST_COLUMNS = ('id', 'customer_name', 'issue_text', 'summary', 'resolution', 'status', 'ai_response', 'created_at')
+
+def get_tickets_page(after_id: int = None, limit: int = 100, status: str = None, customer_name: str = None,
+                     created_from: str = None, created_to: str = None, query: str = None,
+                     priority: str = None, category: str = None, min_confidence: float = None,
+                     columns=TICKET_LIST_COLUMNS, decode: bool = True):
+    """
+    Fetch one page of tickets, newest first, using keyset pagination on id.
+    Returns (tickets, next_after_id); next_after_id is None on the last page.
+    Undecoded ai_response values are JSONText when they hold valid JSON.
+    """
+    columns = _projection(columns)
+    if 'id' not in columns:
+        columns = ('id',) + columns
+    clauses, params = [], []
+    if after_id is not None:
+        clauses.append('id < ?')
+        params.append(after_id)
+    if status:
+        clauses.append('status = ?')
+        params.append(status)
+    if customer_name:
+        clauses.append('customer_name = ?')
+        params.append(customer_name)
+    if created_from:
+        clauses.append('created_at >= ?')
+        params.append(created_from)
+    if created_to:
+        clauses.append('created_at <= ?')
+        params.append(created_to)
+    if priority:
+        clauses.append('ai_priority = ?')
+        params.append(priority.lower())
+    if category:
+        clauses.append('ai_category = ?')
+        params.append(category)
+    if min_confidence is not None:
+        clauses.append('ai_confidence >= ?')
+        params.append(min_confidence)
+    if query:
+        escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        clauses.append("issue_text LIKE ? ESCAPE '\\'")
+        params.append(f'%{escaped}%')
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+    raw_json = not decode and 'ai_response' in columns
+    select = columns + (_JSON_VALID,) if raw_json else columns
+    # Fetch one extra row to know whether another page follows
+    params.append(limit + 1)
+    with get_pool().connection() as conn:
+        rows = conn.execute(
+            f"SELECT {', '.join(select)} FROM tickets {where} ORDER BY id DESC LIMIT ?",
+            params
+        ).fetchall()
+    if raw_json:
+        rows = _mark_json(columns, rows)
+
+    tickets = _rows_to_tickets(columns, rows[:limit], decode)
+    next_after_id = tickets[-1]['id'] if len(rows) > limit else None
+    return tickets, next_after_id
+
+def iter_ticket_chunks(columns=TICKET_LIST_COLUMNS, chunk_size: int = 1000, created_from: str = None,
+                       created_to: str = None, status: str = None):
+    """
+    Yield tickets oldest first as lists of at most ``chunk_size`` row tuples
+    (in ``columns`` order). Each chunk is a separate keyset query, so a slow
+    consumer doesn't hold a pooled connection or a WAL snapshot in between.
+    ai_response values are JSONText when they hold valid JSON.
+    """
+    columns = _projection(columns)
+    select = columns if 'id' in columns else ('id',) + columns
+    skip_id = 'id' not in columns
+    raw_json = 'ai_response' in columns
+    clauses, params = ['id > ?'], []
+    if created_from:
+        clauses.append('created_at >= ?')
+        params.append(created_from)
+    if created_to:
+        clauses.append('created_at <= ?')
+        params.append(created_to)
+    if status:
+        clauses.append('status = ?')
+        params.append(status)
+    sql = f"SELECT {', '.join(select + ((_JSON_VALID,) if raw_json else ()))} FROM tickets WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?"
+
+    last_id = 0
+    while True:
+        with get_pool().connection() as conn:
+            cursor = conn.execute(sql, [last_id] + params + [chunk_size])
+            rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        if raw_json:
+            rows = _mark_json(select, rows)
+        last_id = rows[-1][0]
+        yield [row[1:] for row in rows] if skip_id else rows
+        if len(rows) < chunk_size:
+            return
+
+def get_tickets_by_ids(ticket_ids: List[int], columns=('id', 'resolution')) -> Dict[int, Dict[str, Any]]:
+    """Fetch the projected columns of the given tickets, keyed by id."""
+    if not ticket_ids:
+        return {}
+    columns = _projection(columns)
+    select = columns if 'id' in columns else ('id',) + columns
+    placeholders = ', '.join('?' for _ in ticket_ids)
+    with get_pool().connection() as conn:
+        rows = conn.execute(f"SELECT {', '.join(select)} FROM tickets WHERE id IN ({placeholders})", list(ticket_ids)).fetchall()
+    return {row[0]: dict(zip(select, row)) for row in rows}
+
+def get_ticket_breakdown(field: str) -> Dict[str, int]:
+    """Ticket counts per AI priority or category, read from the indexed generated columns."""
+    column = {'priority': 'ai_priority', 'category': 'ai_category'}.get(field)
+    if column is None:
+        raise ValueError(f"Unknown breakdown field: {field}")
+    with get_pool().connection() as conn:
+        rows = conn.execute(f"SELECT COALESCE({column}, 'unknown'), COUNT(*) FROM tickets GROUP BY {column}").fetchall()
+    return dict(rows)
+
+def update_ticket(ticket_id: int, summary: Dict[str, Any], actions: Dict[str, Any], resolution: Dict[str, Any],
+                  ai_response: Dict[str, Any] = None, issue_text: str = None):
+    """
+    Update ticket with detailed AI analysis results. Background jobs also
+    pass the full ``ai_response`` and, for voice/image tickets, the
+    transcribed ``issue_text``.
+    """
     try:
         # Convert complex data structures to JSON strings
         summary_json = json.dumps(summary)
         actions_json = json.dumps(actions)
         resolution_json = json.dumps(resolution)
         
-        cursor.execute('''
-            UPDATE tickets 
-            SET summary = ?,
-                severity = ?,
-                category = ?,
-                key_points = ?,
-                immediate_actions = ?,
-                escalation_required = ?,
-                escalation_reason = ?,
-                team_assignment = ?,
-                follow_ups = ?,
-                required_info = ?,
-                resolution_steps = ?,
-                alternative_solutions = ?,
-                required_resources = ?,
-                estimated_time = ?,
-                status = CASE 
-                    WHEN ? = 'critical' THEN 'Urgent'
-                    ELSE 'In Progress'
-                END
-            WHERE id = ?
-        ''', (
-            summary_json,
-            summary.get('severity', 'medium'),
-            summary.get('category', 'general'),
-            json.dumps(summary.get('key_points', [])),
-            json.dumps(actions.get('immediate_actions', [])),
-            actions.get('escalation', {}).get('required', False),
-            actions.get('escalation', {}).get('reason', ''),
-            actions.get('escalation', {}).get('team', ''),
-            json.dumps(actions.get('follow_ups', [])),
-            json.dumps(actions.get('required_info', [])),
-            json.dumps(resolution.get('steps', [])),
-            json.dumps(resolution.get('alternatives', [])),
-            json.dumps(resolution.get('resources', [])),
-            resolution.get('total_estimated_time', ''),
-            summary.get('severity', 'medium'),
-            ticket_id
-        ))
-        conn.commit()
+        with get_pool().transaction() as conn:
+            conn.execute('''
+                UPDATE tickets 
+                SET summary = ?,
+                    severity = ?,
+                    category = ?,
+                    key_points = ?,
+                    immediate_actions = ?,
+                    escalation_required = ?,
+                    escalation_reason = ?,
+                    team_assignment = ?,
+                    follow_ups = ?,
+                    required_info = ?,
+                    resolution_steps = ?,
+                    alternative_solutions = ?,
+                    required_resources = ?,
+                    estimated_time = ?,
+                    status = CASE 
+                        WHEN ? = 'critical' THEN 'Urgent'
+                        ELSE 'In Progress'
+                    END
+                WHERE id = ?
+            ''', (
+                summary_json,
+                summary.get('severity', 'medium'),
+                summary.get('category', 'general'),
+                json.dumps(summary.get('key_points', [])),
+                json.dumps(actions.get('immediate_actions', [])),
+                actions.get('escalation', {}).get('required', False),
+                actions.get('escalation', {}).get('reason', ''),
+                actions.get('escalation', {}).get('team', ''),
+                json.dumps(actions.get('follow_ups', [])),
+                json.dumps(actions.get('required_info', [])),
+                json.dumps(resolution.get('steps', [])),
+                json.dumps(resolution.get('alternatives', [])),
+                json.dumps(resolution.get('resources', [])),
+                resolution.get('total_estimated_time', ''),
+                summary.get('severity', 'medium'),
+                ticket_id
+            ))
+            if ai_response is not None:
+                conn.execute('''
+                    UPDATE tickets SET ai_response = ?, resolution = ? WHERE id = ?
+                ''', (json.dumps(ai_response), ai_response.get('recommendation', {}).get('solution'), ticket_id))
+            if issue_text is not None:
+                conn.execute('UPDATE tickets SET issue_text = ? WHERE id = ?', (issue_text, ticket_id))
+        if issue_text is not None:
+            notify_inserted([(ticket_id, issue_text)])
     except Exception as e:
         print(f"Error updating ticket: {str(e)}")
         raise
-    finally:
-        conn.close()
 
 def get_ticket_by_id(ticket_id: int) -> Dict[str, Any]:
     """Get detailed ticket information by ID"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    try:
+    with get_pool().connection() as conn:
+        cursor = conn.cursor()
         cursor.execute('''
             SELECT * FROM tickets WHERE id = ?
         ''', (ticket_id,))
@@ -158,62 +558,54 @@ def get_ticket_by_id(ticket_id: int) -> Dict[str, Any]:
                     ticket_dict[key] = json.loads(ticket_dict[key])
             return ticket_dict
         return None
-    finally:
-        conn.close()
 
 def mark_ticket_resolved(ticket_id: int):
     """Mark a ticket as resolved"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    try:
-        cursor.execute('''
+    with get_pool().transaction() as conn:
+        conn.execute('''
             UPDATE tickets 
             SET status = 'Resolved'
             WHERE id = ?
         ''', (ticket_id,))
-        conn.commit()
-    finally:
-        conn.close()
 
 
 def get_team_performance():
-    conn = sqlite3.connect(DB_NAME)
     try:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT 
-                t.id,
-                t.name,
-                t.specialty,
-                t.availability,
-                t.performance_score,
-                t.total_tickets,
-                t.resolution_rate
-            FROM teams t
-        ''')
-        return cursor.fetchall()
+        with get_pool().connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT 
+                    t.id,
+                    t.name,
+                    t.specialty,
+                    t.availability,
+                    t.performance_score,
+                    t.total_tickets,
+                    t.resolution_rate
+                FROM teams t
+            ''')
+            return cursor.fetchall()
     except sqlite3.Error as e:
         print(f"Database error: {str(e)}")
         return []
-    finally:
-        conn.close()
 
 def get_agent_metrics():
     """Retrieve agent performance metrics with validation"""
-    conn = sqlite3.connect(DB_NAME)
     try:
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT 
-                agent_name,
-                tickets_resolved,
-                avg_resolution_time,
-                satisfaction_score
-            FROM agent_performance
-        ''')
+        with get_pool().connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT 
+                    agent_name,
+                    tickets_resolved,
+                    avg_resolution_time,
+                    satisfaction_score
+                FROM agent_performance
+            ''')
+            rows = cursor.fetchall()
         
         metrics = []
-        for row in cursor.fetchall():
+        for row in rows:
             if len(row) != 4:
                 raise ValueError("Invalid column count in agent_performance")
                 
@@ -232,41 +624,39 @@ def get_agent_metrics():
     except ValueError as e:
         print(f"Data validation error: {str(e)}")
         raise
-    finally:
-        conn.close()
 
 def create_conversation(customer_name: str) -> int:
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(
-        'INSERT INTO conversations (customer_name) VALUES (?)',
-        (customer_name,)
-    )
-    conversation_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return conversation_id
+    with get_pool().transaction() as conn:
+        cursor = conn.execute(
+            'INSERT INTO conversations (customer_name) VALUES (?)',
+            (customer_name,)
+        )
+        return cursor.lastrowid
 
 def add_message_to_conversation(conversation_id: int, message: str, role: str):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(
-        'INSERT INTO conversation_messages (conversation_id, message, role) VALUES (?, ?, ?)',
-        (conversation_id, message, role)
-    )
-    conn.commit()
-    conn.close()
+    params = (conversation_id, message, role)
+    sql = 'INSERT INTO conversation_messages (conversation_id, message, role) VALUES (?, ?, ?)'
+    writer = get_writer()
+    if writer is not None:
+        writer.execute(sql, params)
+        return
+    with get_pool().transaction() as conn:
+        conn.execute(sql, params)
 
 def get_conversation_history(conversation_id: int, limit: int = 5):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute(
-        '''SELECT message, role FROM conversation_messages 
-           WHERE conversation_id = ? 
-           ORDER BY timestamp DESC LIMIT ?''',
-        (conversation_id, limit)
-    )
-    messages = cursor.fetchall()
-    conn.close()
-    return messages
+    with get_pool().connection() as conn:
+        cursor = conn.execute(
+            '''SELECT message, role FROM conversation_messages 
+               WHERE conversation_id = ? 
+               ORDER BY id DESC LIMIT ?''',
+            (conversation_id, limit)
+        )
+        return cursor.fetchall()
 
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] == ["rebuild-stats"]:
+        create_db()
+        print(rebuild_ticket_stats())
+    else:
+        print("Usage: python database.py rebuild-stats")
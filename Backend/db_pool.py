@@ -0,0 +1,168 @@
+# db_pool.py
+import os
+import time
+import queue
+import sqlite3
+import logging
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, List, Optional, Tuple
+
+# Pragmas applied to every pooled connection
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-20000",
+)
+
+def open_connection(db_name: str) -> sqlite3.Connection:
+    """Open a connection tuned for concurrent use (WAL, busy timeout, statement cache)."""
+    conn = sqlite3.connect(db_name, check_same_thread=False, cached_statements=256, timeout=5.0)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+class ConnectionPool:
+    """A fixed-size pool of persistent SQLite connections."""
+
+    def __init__(self, db_name: str, size: int = 5):
+        self.db_name = db_name
+        self.size = size
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return open_connection(self.db_name)
+        return self._idle.get()
+
+    def _release(self, conn: sqlite3.Connection):
+        if self._closed:
+            conn.close()
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; the caller is responsible for committing."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection and commit on success, roll back on error."""
+        with self.connection() as conn:
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+class GroupCommitWriter:
+    """
+    Background writer that batches single-row writes submitted within a
+    ``max_delay`` second window into one transaction, amortizing the commit
+    fsync. Callers block until the batch holding their write has committed.
+    """
+
+    def __init__(self, pool: ConnectionPool, max_batch: int = 100, max_delay: float = 0.002):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue[Optional[Tuple[str, tuple, Future]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="sqlite-group-commit", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql: str, params: tuple = ()) -> Future:
+        future: Future = Future()
+        self._queue.put((sql, params, future))
+        return future
+
+    def execute(self, sql: str, params: tuple = ()) -> Any:
+        """Submit a write and wait for its batch to commit; returns the row's lastrowid."""
+        return self.submit(sql, params).result()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch: List[Tuple[str, tuple, Future]] = [item]
+            stop = False
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                # Drain whatever is already queued, then wait out the rest of the window
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: List[Tuple[str, tuple, Future]]):
+        results = []
+        try:
+            with self.pool.transaction() as conn:
+                for sql, params, _ in batch:
+                    results.append(conn.execute(sql, params).lastrowid)
+        except Exception as e:
+            logging.error("Group commit of %d writes failed: %s", len(batch), e)
+            # Retry individually so one bad row doesn't fail the whole batch
+            for sql, params, future in batch:
+                try:
+                    with self.pool.transaction() as conn:
+                        future.set_result(conn.execute(sql, params).lastrowid)
+                except Exception as row_error:
+                    future.set_exception(row_error)
+            return
+        for (_, _, future), rowid in zip(batch, results):
+            future.set_result(rowid)
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+def pool_size_from_env() -> int:
+    return int(os.getenv("DB_POOL_SIZE", "5"))
+
+def group_commit_enabled() -> bool:
+    return os.getenv("DB_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+
+def group_commit_delay_from_env() -> float:
+    return float(os.getenv("DB_GROUP_COMMIT_DELAY_MS", "2")) / 1000
@@ -0,0 +1,95 @@
+# export.py
+import io
+import csv
+import zlib
+import importlib.util
+from typing import Iterable, Iterator, Sequence
+
+from fast_json import dumps_row
+
+# Optional, only needed for format=parquet; imported when an export asks for it
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+def ndjson_chunks(columns: Sequence[str], chunks: Iterable[list]) -> Iterator[bytes]:
+    """One JSON object per line; validated ai_response text is spliced in as-is."""
+    for rows in chunks:
+        yield b"".join(dumps_row(dict(zip(columns, row)), "ai_response") + b"\n" for row in rows)
+
+def csv_chunks(columns: Sequence[str], chunks: Iterable[list]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        # Nothing matched: still send the header row
+        yield buffer.getvalue().encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream the Parquet writer appends to; drained after each row group."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self) -> bytes:
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+def parquet_chunks(columns: Sequence[str], chunks: Iterable[list], compression: str = "snappy") -> Iterator[bytes]:
+    """One Parquet row group per chunk, streamed as soon as it is written."""
+    if not PARQUET_AVAILABLE:
+        raise RuntimeError("Parquet export requires pyarrow")
+    import pyarrow
+    import pyarrow.parquet
+    schema = pyarrow.schema([
+        (column, pyarrow.int64() if column == "id" else pyarrow.float64() if column == "ai_confidence" else pyarrow.string())
+        for column in columns
+    ])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression=compression)
+    try:
+        for rows in chunks:
+            batch = {column: [row[i] for row in rows] for i, column in enumerate(columns)}
+            writer.write_table(pyarrow.Table.from_pydict(batch, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip a byte stream incrementally, flushing each compressed chunk."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def export_stream(export_format: str, columns: Sequence[str], chunks: Iterable[list], compress: bool) -> Iterator[bytes]:
+    """Encode row chunks as ``export_format``, gzipped if ``compress`` (Parquet compresses internally)."""
+    if export_format == "parquet":
+        return parquet_chunks(columns, chunks, compression="gzip" if compress else "snappy")
+    stream = ndjson_chunks(columns, chunks) if export_format == "ndjson" else csv_chunks(columns, chunks)
+    return gzip_chunks(stream) if compress else stream
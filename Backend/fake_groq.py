@@ -0,0 +1,107 @@
+# fake_groq.py
+"""
+Offline stand-in for the AsyncGroq client, used by the benchmarks to time
+the pipeline without network calls. Responses are canned per agent, chosen
+from the schema in the system prompt.
+"""
+import json
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Dict
+
+SUMMARY = {
+    "summary": "Customer cannot log in after a password reset",
+    "metadata": {"sentiment": "negative", "priority": "high", "category": "login issue", "conversation_id": "conv_bench"}
+}
+ACTIONS = {
+    "actions": [
+        {"type": "Password Reset", "description": "Send a new password reset link and verify the email address", "priority": "High"},
+        {"type": "Authentication", "description": "Check the account for lockouts after failed attempts", "priority": "Medium"}
+    ]
+}
+RESOLUTION = {
+    "recommendation": {
+        "solution": "Reset the password and clear the account lockout",
+        "confidence": "high",
+        "steps": ["Verify identity", "Send reset link", "Clear lockout flag", "Confirm login"],
+        "resources": ["https://support.example.com/login-help"]
+    },
+    "similar_cases": []
+}
+
+def canned_response(system_prompt: str) -> Dict[str, Any]:
+    has_actions = '"actions"' in system_prompt
+    has_recommendation = '"recommendation"' in system_prompt
+    if has_actions and has_recommendation:
+        return {**SUMMARY, **ACTIONS, **RESOLUTION}
+    if has_recommendation:
+        return RESOLUTION
+    if has_actions:
+        return ACTIONS
+    return SUMMARY
+
+class _Completions:
+    def __init__(self, client: "FakeAsyncGroq"):
+        self._client = client
+
+    async def create(self, model: str, messages: list, stream: bool = False, **kwargs):
+        self._client.calls += 1
+        if self._client.latency:
+            await asyncio.sleep(self._client.latency)
+        text = json.dumps(canned_response(messages[0]["content"]))
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        usage = SimpleNamespace(prompt_tokens=prompt_chars // 4, completion_tokens=len(text) // 4)
+        if stream:
+            return self._stream(text)
+        message = SimpleNamespace(content=text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage, headers={})
+
+    @property
+    def with_raw_response(self) -> "_RawCompletions":
+        return _RawCompletions(self)
+
+    async def _stream(self, text: str, chunk_size: int = 8):
+        for i in range(0, len(text), chunk_size):
+            delta = SimpleNamespace(content=text[i:i + chunk_size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+class _RawResponse:
+    """Like the SDK's raw response: rate-limit headers plus ``parse()``."""
+
+    def __init__(self, result, headers: Dict[str, str]):
+        self._result = result
+        self.headers = headers
+
+    def parse(self):
+        return self._result
+
+class _RawCompletions:
+    def __init__(self, completions: _Completions):
+        self._completions = completions
+
+    async def create(self, **kwargs):
+        result = await self._completions.create(**kwargs)
+        headers = {
+            "x-ratelimit-limit-tokens": "1000000",
+            "x-ratelimit-remaining-tokens": "1000000",
+            "x-ratelimit-remaining-requests": "1000000"
+        }
+        return _RawResponse(result, headers)
+
+class FakeAsyncGroq:
+    """
+    Mimics ``AsyncGroq().chat.completions.create`` (and its
+    ``with_raw_response`` variant) with canned JSON replies.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+def install(agent_system, latency: float = 0.0) -> FakeAsyncGroq:
+    """Point every agent in ``agent_system`` at one shared fake client."""
+    client = FakeAsyncGroq(latency=latency)
+    for agent in agent_system.agents.values():
+        agent.client = client
+    return client
@@ -0,0 +1,57 @@
+# fast_json.py
+import json
+from typing import Any, List, Optional
+from fastapi.responses import JSONResponse
+
+from database import JSONText
+
+try:
+    import orjson
+except ImportError:  # optional: fall back to the stdlib encoder
+    orjson = None
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+def dumps_row(row: dict, raw_field: str) -> bytes:
+    """
+    Serialize one row dict whose ``raw_field`` holds stored JSON text
+    (ai_response as read by the database layer). JSONText objects, which
+    SQLite already validated, are spliced in verbatim instead of being
+    decoded and re-encoded; anything else is decoded first.
+    """
+    row = dict(row)
+    raw = row.pop(raw_field, None)
+    if isinstance(raw, JSONText) and raw[:1] == "{" and raw[-1:] == "}":
+        raw = raw.encode("utf-8")
+    else:
+        # Not validated JSON text (NULL, legacy or malformed values, or already decoded)
+        try:
+            raw = dumps(json.loads(raw) if isinstance(raw, str) else raw)
+        except ValueError:
+            raw = b"null"
+    encoded = dumps(row)
+    separator = b"," if len(encoded) > 2 else b""
+    return encoded[:-1] + separator + dumps(raw_field) + b":" + raw + b"}"
+
+def dumps_rows(rows: List[dict], raw_field: str) -> bytes:
+    """Serialize a JSON array of rows with dumps_row."""
+    return b"[" + b",".join(dumps_row(row, raw_field) for row in rows) + b"]"
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with orjson when it is installed. Endpoints that
+    return an instance directly also skip FastAPI's jsonable_encoder pass;
+    ``raw_field`` renders a list of rows with dumps_rows.
+    """
+
+    def __init__(self, content: Any, *args, raw_field: Optional[str] = None, **kwargs):
+        self.raw_field = raw_field
+        super().__init__(content, *args, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        if self.raw_field and isinstance(content, list):
+            return dumps_rows(content, self.raw_field)
+        return dumps(content)
@@ -0,0 +1,117 @@
+# image_preprocess.py
+"""
+Prepares uploaded images for Tesseract. OCR time grows with pixel count, so
+images are checked against size limits before decoding, scaled down to
+roughly OCR_TARGET_DPI, converted to grayscale, binarized with Otsu's
+threshold and cropped to the region that holds ink.
+"""
+import io
+import os
+from typing import Tuple
+
+from PIL import Image, ImageOps
+
+OCR_MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", str(50_000_000)))
+# Longest side after scaling; screenshots carry no usable DPI, so this is
+# what keeps a 4K capture from being OCRed at full size
+OCR_MAX_DIMENSION = int(os.getenv("OCR_MAX_DIMENSION", "2000"))
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+# DPI reported to Tesseract when the image doesn't say
+OCR_DEFAULT_DPI = 96
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "true").lower() in ("1", "true", "yes")
+OCR_CROP_MARGIN = 16
+
+class ImageTooLarge(ValueError):
+    """Raised before decoding an image whose dimensions exceed OCR_MAX_PIXELS."""
+
+def _source_dpi(image: Image.Image) -> float:
+    dpi = image.info.get("dpi")
+    try:
+        return float(dpi[0]) if dpi and float(dpi[0]) > 1 else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+def target_scale(width: int, height: int, dpi: float) -> float:
+    """Downscale factor (never above 1) for the DPI and dimension limits."""
+    scale = min(1.0, OCR_MAX_DIMENSION / max(width, height))
+    if dpi > OCR_TARGET_DPI:
+        scale = min(scale, OCR_TARGET_DPI / dpi)
+    return scale
+
+def otsu_threshold(histogram) -> int:
+    """Gray level that best separates a 256-bin histogram into two classes."""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_level, best_variance = 127, -1.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+def preprocess(image_bytes: bytes) -> Tuple[Image.Image, int]:
+    """
+    Decode ``image_bytes`` into a grayscale (or black-on-white binarized)
+    image cropped to its text, and the DPI to report to Tesseract.
+    Raises ImageTooLarge without decoding oversized images.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    width, height = image.size
+    if width * height > OCR_MAX_PIXELS:
+        raise ImageTooLarge(f"Image is {width}x{height}, above the {OCR_MAX_PIXELS} pixel limit")
+
+    dpi = _source_dpi(image)
+    scale = target_scale(width, height, dpi)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if scale < 1 and image.format == "JPEG":
+        # Let the JPEG decoder skip detail (1/2, 1/4, 1/8 scale) instead of decoding it all
+        image.draft("L", size)
+    if image.getexif().get(0x0112, 1) != 1:
+        # Camera photos: apply the EXIF orientation
+        image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "P"):
+        # Transparent areas become white rather than black
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image)
+    image = image.convert("L")
+    if (image.width > image.height) != (width > height):
+        # EXIF rotation swapped the sides
+        size = size[::-1]
+    if image.size != size:
+        # Area averaging: cheap, and keeps thin strokes when shrinking
+        image = image.resize(size, Image.BOX)
+
+    threshold = otsu_threshold(image.histogram())
+    binary = image.point(lambda level: 255 if level > threshold else 0)
+    # Dark mode: text is the minority class, so make it black on white
+    dark = binary.histogram()[0] > (binary.width * binary.height) / 2
+    if dark:
+        binary = ImageOps.invert(binary)
+        image = ImageOps.invert(image)
+    if OCR_BINARIZE:
+        image = binary
+
+    ink = ImageOps.invert(binary).getbbox()
+    if ink:
+        left, top, right, bottom = ink
+        image = image.crop((max(0, left - OCR_CROP_MARGIN), max(0, top - OCR_CROP_MARGIN),
+                            min(image.width, right + OCR_CROP_MARGIN), min(image.height, bottom + OCR_CROP_MARGIN)))
+
+    return image, max(70, round((dpi or OCR_DEFAULT_DPI) * scale))
+
+def to_pnm(image: Image.Image) -> bytes:
+    """Uncompressed PGM bytes; Tesseract reads them from stdin without a temp file."""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PPM")
+    return buffer.getvalue()
@@ -0,0 +1,277 @@
+# intent_classifier.py
+"""
+Local fast path for trivial tickets. Greetings, thanks and status checks are
+matched with whole-word rules; FAQ categories come from a naive Bayes model
+trained offline on stored tickets' metadata.category. Anything that isn't
+matched with enough confidence goes to the agents.
+
+    python intent_classifier.py train [--faq "category,..."]   # fit INTENT_MODEL_PATH from DB_NAME
+    python intent_classifier.py report                         # share of stored tickets served locally
+"""
+import os
+import re
+import json
+import math
+import logging
+import argparse
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from similar_index import features
+
+# Whole-message patterns: "hi, my app crashes" is a real ticket, not a greeting
+_GREETING_RE = re.compile(
+    r"^(?:hi|hello|hey|hiya|howdy|greetings|good (?:morning|afternoon|evening))"
+    r"(?:\s+(?:there|team|all|everyone|support))?[\s!.,]*$"
+)
+_THANKS_RE = re.compile(
+    r"^(?:(?:ok(?:ay)?|great|perfect|awesome|cool)[\s,!.]+)?"
+    r"(?:thanks?|thank you|thx|ty|cheers|much appreciated)"
+    r"(?:\s+(?:a lot|so much|very much|again|for (?:the|your) help))?[\s!.,]*$"
+)
+# "update" only as a question about progress: "please update my ticket with..." is a change request
+_STATUS_RE = re.compile(
+    r"\b(?:status|progress|news)\b.*\b(?:ticket|request|case)\b"
+    r"|\b(?:any|an|the latest|latest) updates? (?:on|about|for|regarding)\b.*\b(?:ticket|request|case)\b"
+    r"|\b(?:ticket|request|case)\b.*\b(?:status|progress)\b"
+    r"|\bwhere is my (?:ticket|request|case)\b"
+)
+_PROBLEM_RE = re.compile(
+    r"\b(?:error|fail\w*|crash\w*|broken|bug|not working|can'?t|cannot|unable|refund|charged|wrong|problem)\b"
+)
+_TICKET_ID_RE = re.compile(r"#\s*(\d+)|\b(?:ticket|request|case)\s+(?:id\s+|number\s+|no\.?\s*)?(\d+)\b")
+# Status checks are short; longer messages usually describe a new problem
+STATUS_MAX_WORDS = 12
+
+class Intent(NamedTuple):
+    name: str                  # "greeting", "thanks", "status_check" or "faq"
+    confidence: float
+    category: Optional[str] = None
+    answer: Optional[dict] = None
+    ticket_id: Optional[int] = None
+
+def match_rules(text: str) -> Optional[Intent]:
+    """Greeting, thanks or status check, or None."""
+    text = " ".join((text or "").lower().split())
+    if _GREETING_RE.match(text):
+        return Intent("greeting", 1.0)
+    if _THANKS_RE.match(text):
+        return Intent("thanks", 1.0)
+    if len(text.split()) <= STATUS_MAX_WORDS and _STATUS_RE.search(text) and not _PROBLEM_RE.search(text):
+        found = _TICKET_ID_RE.search(text)
+        return Intent("status_check", 1.0, ticket_id=int(found.group(1) or found.group(2)) if found else None)
+    return None
+
+class NaiveBayesModel:
+    """Multinomial naive Bayes over the similar-ticket index's word and bigram features."""
+
+    def __init__(self, labels, priors, weights, answers=None, trained_on=0):
+        self.labels = list(labels)
+        self.priors = list(priors)
+        self.weights: Dict[str, list] = weights
+        self.answers: Dict[str, dict] = answers or {}
+        self.trained_on = trained_on
+
+    @classmethod
+    def fit(cls, samples: Iterable[Tuple[str, str]], alpha: float = 1.0, min_count: int = 2) -> "NaiveBayesModel":
+        """Train on (text, label) pairs; features seen fewer than ``min_count`` times are dropped."""
+        label_docs, label_features, totals = Counter(), defaultdict(Counter), Counter()
+        for text, label in samples:
+            label_docs[label] += 1
+            for feature in features(text):
+                label_features[label][feature] += 1
+                totals[feature] += 1
+        vocabulary = [feature for feature, count in totals.items() if count >= min_count]
+        labels = sorted(label_docs)
+        documents = sum(label_docs.values())
+        priors, weights = [], {feature: [] for feature in vocabulary}
+        for label in labels:
+            counts = label_features[label]
+            denominator = sum(counts[feature] for feature in vocabulary) + alpha * (len(vocabulary) + 1)
+            priors.append(math.log(label_docs[label] / documents))
+            for feature in vocabulary:
+                weights[feature].append(math.log((counts[feature] + alpha) / denominator))
+        return cls(labels, priors, weights, trained_on=documents)
+
+    def predict(self, text: str, min_features: int = 2) -> Optional[Tuple[str, float]]:
+        """(label, posterior probability), or None when the text shares too few features with the training data."""
+        if not self.labels:
+            return None
+        scores = list(self.priors)
+        known = 0
+        for feature in features(text):
+            weights = self.weights.get(feature)
+            if weights is None:
+                continue
+            known += 1
+            for i, weight in enumerate(weights):
+                scores[i] += weight
+        if known < min_features:
+            return None
+        best = max(range(len(scores)), key=scores.__getitem__)
+        total = sum(math.exp(score - scores[best]) for score in scores)
+        return self.labels[best], 1.0 / total
+
+    def to_dict(self) -> dict:
+        return {"labels": self.labels, "priors": self.priors, "weights": self.weights,
+                "answers": self.answers, "trained_on": self.trained_on}
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path: str) -> "NaiveBayesModel":
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+class IntentClassifier:
+    """
+    Decides whether a ticket can be answered locally. FAQ categories are
+    only served when the trained model has an answer for them and the
+    posterior reaches ``threshold``.
+    """
+
+    def __init__(self, model: NaiveBayesModel = None, threshold: float = 0.9):
+        self.model = model
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.served = Counter()
+
+    def classify(self, text: str) -> Optional[Intent]:
+        intent = match_rules(text)
+        if intent is None and self.model is not None and self.model.answers:
+            prediction = self.model.predict(text)
+            if prediction is not None:
+                category, confidence = prediction
+                if confidence >= self.threshold and category in self.model.answers:
+                    intent = Intent("faq", round(confidence, 4), category, self.model.answers[category])
+        with self._lock:
+            self.requests += 1
+            if intent is not None:
+                self.served[intent.name] += 1
+        return intent
+
+    def stats(self) -> dict:
+        with self._lock:
+            served = sum(self.served.values())
+            return {
+                "enabled": True,
+                "threshold": self.threshold,
+                "model": {
+                    "categories": len(self.model.labels), "faq_categories": sorted(self.model.answers),
+                    "trained_on": self.model.trained_on
+                } if self.model is not None else None,
+                "requests": self.requests,
+                "served_locally": served,
+                "local_fraction": round(served / self.requests, 4) if self.requests else 0.0,
+                "by_intent": dict(self.served)
+            }
+
+def _normalize(solution: str) -> str:
+    return " ".join(solution.lower().split()).rstrip(".")
+
+def normalize_category(category: str) -> str:
+    """Stored categories are free text from the summarizer: "Technical" and "technical " are one label."""
+    return " ".join(str(category).lower().split())
+
+def confidence_score(value) -> int:
+    """A recommendation's confidence as 0-100: "high"/"medium"/"low" or a number, 50 if unreadable."""
+    try:
+        if isinstance(value, str) and value.lower() in ("high", "medium", "low"):
+            return {"high": 80, "medium": 50, "low": 20}[value.lower()]
+        return int(value)
+    except (ValueError, TypeError):
+        return 50
+
+def faq_answers(rows: Iterable[Tuple[str, str]], categories) -> Dict[str, dict]:
+    """
+    Canned answer per FAQ category: the recommendation given most often
+    (ties broken by its confidence) among stored (category, ai_response) rows.
+    Categories are compared case-insensitively; answers are keyed normalized.
+    """
+    categories = {normalize_category(category) for category in categories}
+    counts, best = defaultdict(Counter), {}
+    for category, ai_response in rows:
+        category = normalize_category(category or "")
+        if category not in categories:
+            continue
+        try:
+            recommendation = json.loads(ai_response).get("recommendation")
+        except (TypeError, ValueError, AttributeError):
+            continue
+        if not isinstance(recommendation, dict) or not recommendation.get("solution"):
+            continue
+        key = _normalize(recommendation["solution"])
+        counts[category][key] += 1
+        current = best.get((category, key))
+        if current is None or confidence_score(recommendation.get("confidence", 0)) > confidence_score(current.get("confidence", 0)):
+            best[(category, key)] = recommendation
+    answers = {}
+    for category, solutions in counts.items():
+        key = max(solutions, key=lambda k: (solutions[k], confidence_score(best[(category, k)].get("confidence", 0))))
+        recommendation = best[(category, key)]
+        answers[category] = {
+            "solution": recommendation["solution"],
+            "steps": recommendation.get("steps") or [],
+            "resources": recommendation.get("resources") or []
+        }
+    return answers
+
+def train(faq_categories=(), chunk_size: int = 5000) -> NaiveBayesModel:
+    """Fit a model on every stored ticket that has an AI category."""
+    import database
+    rows = [
+        row for chunk in database.iter_ticket_chunks(columns=('issue_text', 'ai_category', 'ai_response'), chunk_size=chunk_size)
+        for row in chunk if row[0] and row[1]
+    ]
+    model = NaiveBayesModel.fit((text, normalize_category(category)) for text, category, _ in rows)
+    wanted = {normalize_category(category) for category in faq_categories if category.strip()}
+    model.answers = faq_answers(((category, ai_response) for _, category, ai_response in rows), wanted)
+    missing = wanted - set(model.answers)
+    if missing:
+        logging.warning("No stored recommendation for FAQ categories: %s", ", ".join(sorted(missing)))
+    return model
+
+def report(classifier: IntentClassifier, chunk_size: int = 5000) -> dict:
+    """Replay stored tickets through ``classifier``; FAQ answers are checked against the stored category."""
+    import database
+    faq_correct = 0
+    for chunk in database.iter_ticket_chunks(columns=('issue_text', 'ai_category'), chunk_size=chunk_size):
+        for text, category in chunk:
+            intent = classifier.classify(text or "")
+            if intent is not None and intent.name == "faq" and intent.category == normalize_category(category or ""):
+                faq_correct += 1
+    stats = classifier.stats()
+    faq = stats["by_intent"].get("faq", 0)
+    stats["faq_precision"] = round(faq_correct / faq, 4) if faq else None
+    return stats
+
+def classifier_from_env() -> Optional[IntentClassifier]:
+    if os.getenv("INTENT_CLASSIFIER_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    path = os.getenv("INTENT_MODEL_PATH", "intent_model.json")
+    model = None
+    if os.path.exists(path):
+        try:
+            model = NaiveBayesModel.load(path)
+        except (OSError, ValueError, TypeError):
+            logging.exception("Could not load intent model from %s; only rule intents are served locally", path)
+    return IntentClassifier(model, threshold=float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.9")))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train or evaluate the local intent classifier")
+    parser.add_argument("command", choices=("train", "report"))
+    parser.add_argument("--faq", default="", help="comma-separated categories to answer locally")
+    args = parser.parse_args()
+    path = os.getenv("INTENT_MODEL_PATH", "intent_model.json")
+    if args.command == "train":
+        model = train(args.faq.split(","))
+        model.save(path)
+        print(f"Trained on {model.trained_on} tickets, {len(model.labels)} categories "
+              f"({len(model.answers)} answered locally) -> {path}")
+    else:
+        classifier = classifier_from_env() or IntentClassifier()
+        print(json.dumps(report(classifier), indent=2))
@@ -0,0 +1,231 @@
+# job_queue.py
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import database
+
+# Seconds a claimed job stays invisible to other workers before it is
+# considered abandoned (worker crash or restart) and handed out again
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Base delay before a failed job is retried; doubles on every attempt
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "2"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+class PermanentJobError(Exception):
+    """Raised by a job handler for failures a retry can't fix (e.g. a rejected upload)."""
+
+JOB_COLUMNS = ('id', 'ticket_id', 'status', 'attempts', 'max_attempts', 'last_error', 'created_at', 'updated_at')
+
+def enqueue_job(conn, ticket_id: int, payload: Dict[str, Any], media: bytes = None,
+                max_attempts: int = None) -> int:
+    """Queue processing for ``ticket_id`` on an open transaction."""
+    now = time.time()
+    return conn.execute('''
+        INSERT INTO jobs (ticket_id, payload, media, status, attempts, max_attempts, available_at, created_at, updated_at)
+        VALUES (?, ?, ?, 'queued', 0, ?, ?, ?, ?)
+    ''', (ticket_id, json.dumps(payload), media, max_attempts or JOB_MAX_ATTEMPTS, now, now, now)).lastrowid
+
+def submit_ticket_job(customer_name: str, issue_text: Optional[str], media: bytes = None,
+                      media_kind: str = None) -> int:
+    """
+    Insert a Pending ticket and its processing job in one transaction, so a
+    ticket is never left without the work that fills it in.
+    """
+    params = database.ticket_row(customer_name, issue_text or "")
+    with database.get_pool().transaction() as conn:
+        ticket_id = conn.execute(database.INSERT_TICKET_SQL, params).lastrowid
+        enqueue_job(conn, ticket_id, {"media_kind": media_kind}, media)
+    if issue_text:
+        database.notify_inserted([(ticket_id, issue_text)])
+    return ticket_id
+
+def claim_job(worker_id: str, visibility_timeout: float = None) -> Optional[Dict[str, Any]]:
+    """
+    Lease the oldest runnable job: queued and due, or running with an expired
+    lease. Returns None when there is nothing to do.
+    """
+    now = time.time()
+    lease = f"{worker_id}:{uuid.uuid4().hex}"
+    with database.get_pool().transaction() as conn:
+        # Abandoned jobs that already used their attempts are given up on
+        conn.execute('''
+            UPDATE tickets SET status = 'Failed' WHERE status = 'Pending' AND id IN (
+                SELECT ticket_id FROM jobs WHERE status = 'running' AND lease_expires_at <= ? AND attempts >= max_attempts
+            )
+        ''', (now,))
+        conn.execute('''
+            UPDATE jobs SET status = 'failed', last_error = COALESCE(last_error, 'lease expired'), updated_at = ?
+            WHERE status = 'running' AND lease_expires_at <= ? AND attempts >= max_attempts
+        ''', (now, now))
+        # A single UPDATE takes the write lock, so two workers can't claim the same row
+        claimed = conn.execute('''
+            UPDATE jobs
+            SET status = 'running', lease_owner = ?, lease_expires_at = ?, attempts = attempts + 1, updated_at = ?
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE (status = 'queued' AND available_at <= ?)
+                   OR (status = 'running' AND lease_expires_at <= ?)
+                ORDER BY available_at, id
+                LIMIT 1
+            )
+        ''', (lease, now + (visibility_timeout or JOB_VISIBILITY_TIMEOUT), now, now, now)).rowcount
+        if not claimed:
+            return None
+        row = conn.execute('''
+            SELECT id, ticket_id, payload, media, attempts, max_attempts FROM jobs WHERE lease_owner = ?
+        ''', (lease,)).fetchone()
+    return {
+        "id": row[0],
+        "ticket_id": row[1],
+        "payload": json.loads(row[2] or "{}"),
+        "media": row[3],
+        "attempts": row[4],
+        "max_attempts": row[5],
+        "lease": lease
+    }
+
+def extend_lease(job: Dict[str, Any], visibility_timeout: float = None) -> bool:
+    """Push back the lease of a job that is still being worked on."""
+    now = time.time()
+    with database.get_pool().transaction() as conn:
+        return conn.execute('''
+            UPDATE jobs SET lease_expires_at = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = 'running'
+        ''', (now + (visibility_timeout or JOB_VISIBILITY_TIMEOUT), now, job["id"], job["lease"])).rowcount == 1
+
+def complete_job(job: Dict[str, Any]) -> bool:
+    now = time.time()
+    with database.get_pool().transaction() as conn:
+        # Dropping the media here keeps finished jobs small
+        return conn.execute('''
+            UPDATE jobs SET status = 'done', media = NULL, last_error = NULL, updated_at = ?
+            WHERE id = ? AND lease_owner = ?
+        ''', (now, job["id"], job["lease"])).rowcount == 1
+
+def fail_job(job: Dict[str, Any], error: str, retry: bool = True) -> str:
+    """
+    Schedule a retry with exponential backoff, or mark the job failed once
+    its attempts are used up (or at once when ``retry`` is false). A failed
+    job's ticket is marked Failed so clients stop waiting for it.
+    """
+    now = time.time()
+    if not retry or job["attempts"] >= job["max_attempts"]:
+        status, available_at = 'failed', now
+    else:
+        status, available_at = 'queued', now + JOB_RETRY_DELAY * 2 ** (job["attempts"] - 1)
+    with database.get_pool().transaction() as conn:
+        updated = conn.execute('''
+            UPDATE jobs SET status = ?, available_at = ?, lease_owner = NULL, lease_expires_at = NULL,
+                last_error = ?, updated_at = ?
+            WHERE id = ? AND lease_owner = ?
+        ''', (status, available_at, error[:1000], now, job["id"], job["lease"])).rowcount
+        if updated and status == 'failed':
+            conn.execute("UPDATE tickets SET status = 'Failed' WHERE id = ? AND status = 'Pending'", (job["ticket_id"],))
+    return status
+
+def get_ticket_job(ticket_id: int) -> Optional[Dict[str, Any]]:
+    """Latest job for a ticket, without its payload."""
+    with database.get_pool().connection() as conn:
+        row = conn.execute(f'''
+            SELECT {", ".join(JOB_COLUMNS)} FROM jobs WHERE ticket_id = ? ORDER BY id DESC LIMIT 1
+        ''', (ticket_id,)).fetchone()
+    return dict(zip(JOB_COLUMNS, row)) if row else None
+
+def get_job_counts() -> Dict[str, int]:
+    with database.get_pool().connection() as conn:
+        return dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+class JobWorker:
+    """
+    Runs ``handler(job)`` for queued jobs on ``concurrency`` asyncio workers.
+    A job's lease is renewed while its handler runs; if the process dies the
+    lease lapses and another worker picks the job up again.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[None]], concurrency: int = JOB_WORKERS,
+                 poll_interval: float = JOB_POLL_INTERVAL, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self.processed = 0
+        self.failed = 0
+
+    def start(self):
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers after a job was enqueued in this process."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                job = await asyncio.to_thread(claim_job, self.worker_id, self.visibility_timeout)
+            except Exception:
+                logging.exception("Error claiming job")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._process(job)
+
+    async def _heartbeat(self, job: Dict[str, Any]):
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            try:
+                await asyncio.to_thread(extend_lease, job, self.visibility_timeout)
+            except Exception:
+                # A locked or busy database shouldn't cost the job its lease; try again next beat
+                logging.exception("Error extending lease on job %s", job["id"])
+
+    async def _process(self, job: Dict[str, Any]):
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            await self.handler(job)
+            await asyncio.to_thread(complete_job, job)
+            self.processed += 1
+        except asyncio.CancelledError:
+            # Shutting down: leave the lease to expire so the job is retried
+            raise
+        except PermanentJobError as e:
+            logging.error("Job %s for ticket %s failed permanently: %s", job["id"], job["ticket_id"], e)
+            await asyncio.to_thread(fail_job, job, str(e), False)
+            self.failed += 1
+        except Exception as e:
+            logging.exception("Job %s for ticket %s failed (attempt %s)", job["id"], job["ticket_id"], job["attempts"])
+            status = await asyncio.to_thread(fail_job, job, f"{type(e).__name__}: {e}")
+            if status == 'failed':
+                self.failed += 1
+        finally:
+            heartbeat.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "processed": self.processed,
+            "failed": self.failed,
+            "jobs": get_job_counts()
+        }
@@ -1,34 +1,72 @@
 # main.py
+import time
+# Start of the import phase, reported by /admin/startup-profile
+IMPORT_STARTED = time.perf_counter()
+
 import os
+import sys
 import json
 import logging
-import io
-import wave
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
 from typing import Optional, List
-from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Depends
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from dotenv import load_dotenv
-import uvicorn
-import speech_recognition as sr
-from PIL import Image
-import pytesseract
-
-# Set the Tesseract command path explicitly (fallback if not in PATH)
-pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+from media import convert_voice_to_text, extract_text_from_image, transcribe_segment, OCR_MAX_UPLOAD_BYTES
+from media_workers import media_pool
+from media_cache import get_media_cache
+from voice_stream import VoiceSessionError, VoiceTranscriptionError, store_from_env as voice_store_from_env
+from job_queue import JobWorker, PermanentJobError, submit_ticket_job, get_ticket_job
+from fast_json import FastJSONResponse, dumps as fast_dumps
+from similar_index import rebuild as rebuild_similar_index
+from export import EXPORT_FORMATS, PARQUET_AVAILABLE, export_stream
 
 # Import your database functions and error handlers
-from database import create_db, insert_ticket, get_all_tickets, update_ticket, get_team_performance, get_agent_metrics, create_conversation, add_message_to_conversation
+from database import insert_listeners, create_db, insert_ticket, insert_tickets, get_all_tickets, get_tickets_page, iter_ticket_chunks, TICKET_LIST_COLUMNS, get_ticket_by_id, update_ticket, get_ticket_status_counts, get_ticket_breakdown, rebuild_ticket_stats, get_team_performance, get_agent_metrics, create_conversation, add_message_to_conversation, get_conversation_history
 from error_handling import handle_database_error, handle_index_error
-from ai_module import handle_ticket
+from ai_module import handle_ticket, handle_ticket_stream, response_cache, context_budget, scheduler, single_flight, similar_index, intent_classifier, warm_up_connections, close_clients, GROQ_WARMUP_CONNECTIONS, format_response as format_ai_response
 
 # Load environment variables
 load_dotenv()
 
-# Create the database if it doesn't exist
-create_db()
+IMPORTS_DONE = time.perf_counter()
+
+# Milliseconds spent in each startup phase, filled in by lifespan()
+startup_profile = {"imports_ms": round((IMPORTS_DONE - IMPORT_STARTED) * 1000, 1)}
+
+@contextmanager
+def profile_step(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_profile[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+def init_backend():
+    """Create the database if it doesn't exist and hook up insert listeners; shared with worker.py."""
+    with profile_step("create_db"):
+        create_db()
+    # Keep the similar-ticket index current as tickets are stored
+    if similar_index is not None and similar_index.add_tickets not in insert_listeners:
+        insert_listeners.append(similar_index.add_tickets)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_backend()
+    with profile_step("background_tasks"):
+        start_background_tasks()
+    startup_profile["ready_ms"] = round((time.perf_counter() - IMPORT_STARTED) * 1000, 1)
+    logging.info("Startup profile: %s", startup_profile)
+    try:
+        yield
+    finally:
+        await stop_background_tasks()
 
-app = FastAPI()
+# orjson-backed responses for every endpoint that doesn't pick its own class
+app = FastAPI(default_response_class=FastJSONResponse, lifespan=lifespan)
 
 # CORS settings to allow your Streamlit frontend (adjust origin as needed)
 app.add_middleware(
@@ -37,6 +75,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-After-Id"],
 )
 
 # Exception handlers
@@ -50,93 +89,381 @@ app.add_exception_handler(Exception, lambda req, exc: JSONResponse(
 def read_root():
     return {"message": "Welcome to the AI Customer Support Backend"}
 
-def convert_voice_to_text(voice_bytes: bytes) -> str:
-    recognizer = sr.Recognizer()
-    try:
-        # Write the raw audio bytes to a WAV file
-        wav_audio = io.BytesIO()
-        with wave.open(wav_audio, "wb") as wav_file:
-            wav_file.setnchannels(1)  # Mono audio
-            wav_file.setsampwidth(2)  # 16-bit audio
-            wav_file.setframerate(16000)  # 16 kHz sample rate
-            wav_file.writeframes(voice_bytes)
-        wav_audio.seek(0)
-
-        with sr.AudioFile(wav_audio) as source:
-            audio_data = recognizer.record(source)
-        return recognizer.recognize_google(audio_data)
-    except sr.UnknownValueError:
-        return "Could not understand the audio."
-    except sr.RequestError as e:
-        return f"Speech recognition service error: {e}"
-    except Exception as e:
-        return f"Error processing audio: {e}"
-
-# Function to extract text from an image
-def extract_text_from_image(image_bytes: bytes) -> str:
-    try:
-        image = Image.open(io.BytesIO(image_bytes))
-        extracted_text = pytesseract.image_to_string(image)
-        return extracted_text.strip()
-    except Exception as e:
-        logging.error(f"Error extracting text from image: {e}")
-        return ""
-
-@app.post("/submit_ticket/")
+@app.post("/submit_ticket/", status_code=202)
 async def submit_ticket(
     customer_name: str = Form(...),
     issue_text: Optional[str] = Form(None),
     voice: Optional[UploadFile] = File(None),
     image: Optional[UploadFile] = File(None)
 ):
+    """
+    Store the ticket as Pending and queue OCR/ASR and AI processing; poll
+    /tickets/{ticket_id}/status for the result.
+    """
     try:
+        media, media_kind = None, None
         if voice:
-            voice_bytes = await voice.read()
-            issue_text = convert_voice_to_text(voice_bytes)
+            media, media_kind = await voice.read(), "voice"
         elif image:
-            image_bytes = await image.read()
-            issue_text = extract_text_from_image(image_bytes)
+            media, media_kind = await image.read(), "image"
+            if len(media) > OCR_MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail=f"Images are limited to {OCR_MAX_UPLOAD_BYTES} bytes")
 
-        if not issue_text:
+        if not media and not (issue_text and issue_text.strip()):
             raise HTTPException(status_code=400, detail="No valid input provided")
 
-        # Process with AI and get response
-        ai_response = await handle_ticket(issue_text)
-        
-        # Store ticket in database with AI response
-        ticket_id = insert_ticket(customer_name, issue_text, ai_response)
-        
-        if safe_get(ai_response, "recommendation", {}).get("confidence", 0) >= 95:
-            return {"message": "Resolved instantly", "AI Response": ai_response, "ticket_id": ticket_id}
-        else:
-            return {"message": "Ticket submitted for further review", "AI Response": ai_response, "ticket_id": ticket_id}
+        ticket_id = await asyncio.to_thread(submit_ticket_job, customer_name, None if media else issue_text, media, media_kind)
+        job_worker.notify()
+        return {
+            "message": "Ticket queued for processing",
+            "ticket_id": ticket_id,
+            "status": "Pending",
+            "status_url": f"/tickets/{ticket_id}/status"
+        }
+    except HTTPException:
+        raise
     except Exception as e:
         logging.exception("Error in submit_ticket:")
         raise HTTPException(status_code=500, detail=f"Error submitting ticket: {str(e)}")
 
-# Sort tickets by newest first and sync with user dashboard
-@app.get("/get_tickets/", response_model=List[dict])
-def get_tickets(query: Optional[str] = None):
+async def transcribe_voice_segment(pcm: bytes) -> str:
+    return await media_pool.run(transcribe_segment, pcm)
+
+# Chunked voice uploads (None without numpy)
+voice_sessions = voice_store_from_env(transcribe_voice_segment)
+# Largest request body accepted by /voice/sessions/{session_id}/chunks
+VOICE_MAX_CHUNK_BYTES = int(os.getenv("VOICE_MAX_CHUNK_BYTES", str(1024 * 1024)))
+
+def get_voice_sessions():
+    if voice_sessions is None:
+        raise HTTPException(status_code=501, detail="Chunked voice uploads require numpy on the server")
+    return voice_sessions
+
+@app.post("/voice/sessions", status_code=201)
+async def start_voice_session(
+    customer_name: str = Form(...),
+    sample_rate: int = Form(48000),
+    channels: int = Form(1)
+):
+    """
+    Start a chunked voice upload. POST raw 16-bit little-endian PCM at
+    ``sample_rate`` with ``channels`` interleaved channels to the chunks
+    URL as it is recorded, then POST to the finish URL.
+    """
+    if not 8000 <= sample_rate <= 192000 or channels not in (1, 2):
+        raise HTTPException(status_code=400, detail="Unsupported audio format")
+    try:
+        session = get_voice_sessions().create(customer_name, sample_rate, channels)
+    except VoiceSessionError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {
+        "session_id": session.id,
+        "chunks_url": f"/voice/sessions/{session.id}/chunks",
+        "finish_url": f"/voice/sessions/{session.id}/finish"
+    }
+
+@app.post("/voice/sessions/{session_id}/chunks")
+async def add_voice_chunk(session_id: str, request: Request):
+    pcm = await request.body()
+    if len(pcm) > VOICE_MAX_CHUNK_BYTES:
+        raise HTTPException(status_code=413, detail=f"Chunks are limited to {VOICE_MAX_CHUNK_BYTES} bytes")
+    try:
+        session = get_voice_sessions().get(session_id)
+    except VoiceSessionError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     try:
-        tickets = get_all_tickets()
-        if query:
-            tickets = [t for t in tickets if query.lower() in t['issue_text'].lower()]
-        
-        # Ensure all required fields are present
-        return [{
-            "id": ticket['id'],
-            "customer_name": ticket['customer_name'],
-            "issue_text": ticket['issue_text'],
-            "summary": ticket['summary'],
-            "resolution": ticket['resolution'],
-            "status": ticket['status'],
-            "ai_response": ticket.get('ai_response'),
-            "created_at": ticket['created_at']
-        } for ticket in tickets]
+        await session.add_chunk(pcm)
+    except VoiceSessionError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    return session.stats()
+
+@app.post("/voice/sessions/{session_id}/finish", status_code=202)
+async def finish_voice_session(session_id: str):
+    """Wait for the remaining segment transcripts and queue the ticket like /submit_ticket/."""
+    try:
+        session = get_voice_sessions().pop(session_id)
+    except VoiceSessionError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        transcript = await session.finish()
+    except VoiceTranscriptionError as e:
+        raise HTTPException(status_code=502, detail=f"Speech recognition failed: {e}")
+    if not transcript:
+        raise HTTPException(status_code=400, detail="No speech detected")
+
+    ticket_id = await asyncio.to_thread(submit_ticket_job, session.customer_name, transcript)
+    job_worker.notify()
+    return {
+        "message": "Ticket queued for processing",
+        "ticket_id": ticket_id,
+        "status": "Pending",
+        "status_url": f"/tickets/{ticket_id}/status",
+        "transcript": transcript,
+        **session.stats()
+    }
+
+def ticket_analysis(ai_response: dict) -> tuple:
+    """Map a handle_ticket response onto update_ticket's summary/actions/resolution."""
+    metadata = safe_get(ai_response, "metadata", {}) or {}
+    actions = [a for a in safe_get(ai_response, "actions", []) or [] if isinstance(a, dict)]
+    recommendation = safe_get(ai_response, "recommendation", {}) or {}
+    summary = {
+        "text": safe_get(safe_get(ai_response, "summary", {}), "text", ""),
+        "severity": str(metadata.get("priority") or "medium").lower(),
+        "category": metadata.get("category") or "general",
+        "key_points": []
+    }
+    action_items = {"immediate_actions": [a.get("description", "") for a in actions]}
+    resolution = {"steps": recommendation.get("steps", []), "resources": recommendation.get("resources", [])}
+    return summary, action_items, resolution
+
+async def process_ticket_job(job: dict):
+    """Job handler: transcribe media if needed, run the agents and store the analysis."""
+    ticket = await asyncio.to_thread(get_ticket_by_id, job["ticket_id"])
+    if ticket is None:
+        logging.warning("Ticket %s for job %s no longer exists", job["ticket_id"], job["id"])
+        return
+
+    issue_text = ticket["issue_text"]
+    transcribed = None
+    media_kind = job["payload"].get("media_kind")
+    if media_kind:
+        decoder = convert_voice_to_text if media_kind == "voice" else extract_text_from_image
+        try:
+            issue_text = transcribed = await media_pool.run(decoder, job["media"])
+        except ValueError as e:
+            # Rejected upload (too large, unreadable): the same bytes fail every time
+            raise PermanentJobError(str(e)) from e
+        if not issue_text:
+            raise PermanentJobError(f"No text could be extracted from the {media_kind}")
+
+    ai_response = await handle_ticket(issue_text, ticket_id=job["ticket_id"])
+    # Raising schedules a retry; the ticket is marked Failed once attempts run out
+    if safe_get(ai_response, "error"):
+        raise RuntimeError(safe_get(ai_response, "details", ai_response["error"]))
+    if safe_get(ai_response, "agent_errors"):
+        raise RuntimeError("; ".join(ai_response["agent_errors"]))
+
+    await asyncio.to_thread(update_ticket, job["ticket_id"], *ticket_analysis(ai_response),
+                            ai_response=ai_response, issue_text=transcribed)
+
+# In-process queue workers; JOB_WORKERS=0 leaves the queue to worker.py processes
+job_worker = JobWorker(process_ticket_job)
+
+# Pre-opened Groq connections; skipped with GROQ_WARMUP_CONNECTIONS=0
+warm_up_task: Optional[asyncio.Task] = None
+
+def start_background_tasks():
+    global warm_up_task
+    if job_worker.concurrency > 0:
+        job_worker.start()
+    # In the background, so a slow or unreachable API doesn't delay startup
+    if GROQ_WARMUP_CONNECTIONS > 0:
+        warm_up_task = asyncio.create_task(warm_up_connections(GROQ_WARMUP_CONNECTIONS))
+    # First start with an existing database: embed its tickets in the background
+    if similar_index is not None and len(similar_index) == 0:
+        asyncio.get_running_loop().run_in_executor(None, rebuild_similar_index, similar_index)
+
+async def stop_background_tasks():
+    await job_worker.stop()
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    await close_clients()
+    media_pool.shutdown()
+
+@app.get("/tickets/{ticket_id:int}")
+async def get_ticket(ticket_id: int):
+    ticket = await asyncio.to_thread(get_ticket_by_id, ticket_id)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    ai_response = ticket.get("ai_response")
+    ticket["ai_response"] = json.loads(ai_response) if ai_response else None
+    return ticket
+
+@app.get("/tickets/{ticket_id:int}/status")
+async def get_ticket_status(ticket_id: int):
+    ticket = await asyncio.to_thread(get_ticket_by_id, ticket_id)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    job = await asyncio.to_thread(get_ticket_job, ticket_id)
+    ai_response = ticket.get("ai_response")
+    return {
+        "ticket_id": ticket_id,
+        "status": ticket.get("status"),
+        "job": job,
+        "ai_response": json.loads(ai_response) if ai_response else None
+    }
+
+# Limits for /submit_tickets/bulk
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "5000"))
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", "8"))
+
+def parse_bulk_lines(body: bytes) -> list:
+    """Parse a JSON array or JSON-lines payload into a list of items (or parse errors)."""
+    text = body.decode("utf-8").strip()
+    if text.startswith("["):
+        return json.loads(text)
+    items = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            items.append({"_parse_error": str(e)})
+    return items
+
+@app.post("/submit_tickets/bulk")
+async def submit_tickets_bulk(
+    request: Request,
+    concurrency: int = Query(BULK_CONCURRENCY, ge=1, le=64),
+    process_ai: bool = True
+):
+    """
+    Accept a batch of {"customer_name", "issue_text"} objects as a JSON array,
+    JSON lines, or a multipart upload with a JSON-lines "file" field. Tickets
+    are analysed with at most `concurrency` handle_ticket calls in flight and
+    written in one transaction.
+    """
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None:
+                raise HTTPException(status_code=400, detail="Multipart batch requires a 'file' field")
+            items = parse_bulk_lines(await upload.read())
+        else:
+            items = parse_bulk_lines(await request.body())
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch payload: {e}")
+
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="No tickets provided")
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BULK_MAX_ITEMS} tickets")
+
+    results = [{"index": i} for i in range(len(items))]
+    valid = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict) or "_parse_error" in item:
+            results[i].update(status="error", error=f"Invalid JSON: {safe_get(item, '_parse_error', 'not an object')}")
+        elif not all(isinstance(item.get(field), str) and item[field].strip() for field in ("customer_name", "issue_text")):
+            results[i].update(status="error", error="customer_name and issue_text must be non-empty strings")
+        else:
+            valid.append(i)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def analyse(i):
+        async with semaphore:
+            return await handle_ticket(items[i]["issue_text"], lane="batch")
+
+    if process_ai:
+        ai_responses = await asyncio.gather(*(analyse(i) for i in valid))
+    else:
+        ai_responses = [None] * len(valid)
+
+    try:
+        ticket_ids = await asyncio.to_thread(
+            insert_tickets,
+            [(items[i]["customer_name"], items[i]["issue_text"], ai_response) for i, ai_response in zip(valid, ai_responses)]
+        )
+    except Exception as e:
+        logging.exception("Error in submit_tickets_bulk:")
+        raise HTTPException(status_code=500, detail=f"Error storing tickets: {str(e)}")
+
+    for i, ticket_id, ai_response in zip(valid, ticket_ids, ai_responses):
+        results[i].update(status="ok", ticket_id=ticket_id, ai_response=ai_response)
+
+    return {
+        "submitted": len(items),
+        "created": len(ticket_ids),
+        "failed": len(items) - len(ticket_ids),
+        "results": results
+    }
+
+# Sort tickets by newest first and sync with user dashboard.
+# Results are keyset-paginated: pass the X-Next-After-Id header back as after_id.
+@app.get("/get_tickets/")
+def get_tickets(
+    query: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    status: Optional[str] = None,
+    customer_name: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    priority: Optional[str] = None,
+    category: Optional[str] = None,
+    min_confidence: Optional[float] = None,
+    fields: Optional[str] = None
+):
+    # Comma-separated column projection, e.g. fields=id,customer_name,status
+    columns = tuple(field.strip() for field in fields.split(",") if field.strip()) if fields else TICKET_LIST_COLUMNS
+    try:
+        # ai_response stays as stored JSON text; values SQLite's json_valid()
+        # accepts are spliced into the body as-is instead of decoded per row
+        tickets, next_after_id = get_tickets_page(
+            after_id=after_id,
+            limit=limit,
+            status=status,
+            customer_name=customer_name,
+            created_from=created_from.strftime("%Y-%m-%d %H:%M:%S") if created_from else None,
+            created_to=created_to.strftime("%Y-%m-%d %H:%M:%S") if created_to else None,
+            query=query,
+            priority=priority,
+            category=category,
+            min_confidence=min_confidence,
+            columns=columns,
+            decode=False
+        )
+        headers = {"X-Next-After-Id": str(next_after_id)} if next_after_id is not None else None
+        return FastJSONResponse(tickets, headers=headers, raw_field="ai_response" if "ai_response" in columns else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logging.exception("Error in get_tickets:")
         raise HTTPException(status_code=500, detail=f"Error fetching tickets: {str(e)}")
 
+# Rows fetched per query (and per streamed chunk) by /tickets/export
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+@app.get("/tickets/export")
+def export_tickets(
+    format: str = "ndjson",
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status: Optional[str] = None,
+    compress: bool = False,
+    chunk_size: int = Query(EXPORT_CHUNK_SIZE, ge=1, le=50000)
+):
+    """
+    Stream every matching ticket, oldest first, as NDJSON, CSV or Parquet.
+    Rows are read and encoded one chunk at a time, so memory stays flat
+    however many tickets are exported; ``compress`` gzips on the fly.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if format == "parquet" and not PARQUET_AVAILABLE:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow on the server")
+
+    chunks = iter_ticket_chunks(
+        columns=TICKET_LIST_COLUMNS,
+        chunk_size=chunk_size,
+        created_from=created_from.strftime("%Y-%m-%d %H:%M:%S") if created_from else None,
+        created_to=created_to.strftime("%Y-%m-%d %H:%M:%S") if created_to else None,
+        status=status
+    )
+    media_type, extension = EXPORT_FORMATS[format]
+    gzipped = compress and format != "parquet"
+    filename = f"tickets_{datetime.now():%Y%m%d_%H%M%S}.{extension}{'.gz' if gzipped else ''}"
+    # A sync generator: Starlette runs each step in its threadpool, off the event loop
+    return StreamingResponse(
+        export_stream(format, TICKET_LIST_COLUMNS, chunks, compress),
+        media_type="application/gzip" if gzipped else media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @app.post("/process_ticket/")
 def process_ticket(ticket_id: int, issue_text: str):
     try:
@@ -147,8 +474,30 @@ def process_ticket(ticket_id: int, issue_text: str):
         logging.exception("Error processing ticket:")
         raise HTTPException(status_code=500, detail=f"Error processing ticket: {str(e)}")
 
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {fast_dumps(data).decode('utf-8')}\n\n"
+
+# Number of prior messages fetched for the rolling chat context window
+HISTORY_MESSAGES = int(os.getenv("HISTORY_MESSAGES", "10"))
+
+def start_chat_turn(data: dict, message: str, customer_name: str):
+    """Resolve the conversation, fetch its recent history and record the user's message."""
+    conversation_id = data.get("conversation_id")
+    history = get_conversation_history(conversation_id, HISTORY_MESSAGES) if conversation_id else []
+    if not conversation_id:
+        conversation_id = create_conversation(customer_name)
+    add_message_to_conversation(conversation_id, message, "user")
+    return conversation_id, history
+
+async def chat_event_stream(message: str, history: list, conversation_id: int):
+    yield sse_event("conversation", {"conversation_id": conversation_id})
+    async for event, data in handle_ticket_stream(message, history, lane="interactive"):
+        if event == "done":
+            await asyncio.to_thread(add_message_to_conversation, conversation_id, format_ai_response(data), "assistant")
+        yield sse_event(event, data)
+
 @app.post("/chat/")
-async def chat_endpoint(request: Request):
+async def chat_endpoint(request: Request, stream: bool = False):
     try:
         # Log the raw incoming request data
         raw_body = await request.body()
@@ -166,11 +515,25 @@ async def chat_endpoint(request: Request):
             logging.error("Missing required fields: message or customer_name")
             return JSONResponse(content={"error": "Missing required fields"}, status_code=400)
 
-        # Process the message using AI agents
-        response = await handle_ticket(message)
+        # Pooled reads and group-committed writes block until they finish,
+        # so keep them off the event loop
+        conversation_id, history = await asyncio.to_thread(start_chat_turn, data, message, customer_name)
+
+        # Opt-in Server-Sent Events: partial summary/actions/recommendation, then "done"
+        if stream:
+            return StreamingResponse(
+                chat_event_stream(message, history, conversation_id),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+
+        # Process the message using AI agents, with recent turns as context
+        response = await handle_ticket(message, history, lane="interactive")
         logging.debug(f"AI Response: {response}")
+        await asyncio.to_thread(add_message_to_conversation, conversation_id, format_ai_response(response), "assistant")
+        response["conversation_id"] = conversation_id
 
-        return JSONResponse(content=response, status_code=200)
+        return FastJSONResponse(content=response, status_code=200)
     except json.JSONDecodeError as e:
         logging.error(f"JSON decoding error: {e}")
         return JSONResponse(content={"error": "Invalid JSON format"}, status_code=400)
@@ -202,15 +565,16 @@ def safe_get(data, key, default=None):
 @app.get("/admin/metrics")
 async def get_admin_metrics():
     try:
-        tickets = get_all_tickets()
-        resolved_tickets = len([t for t in tickets if t[5] == 'Resolved'])
-        unresolved_tickets = len(tickets) - resolved_tickets
+        status_counts = get_ticket_status_counts()
+        resolved_tickets = status_counts.get('Resolved', 0)
+        unresolved_tickets = sum(status_counts.values()) - resolved_tickets
 
         return {
             "active_tickets": unresolved_tickets,
             "resolved_tickets": resolved_tickets,
+            "status_counts": status_counts,
             "timeline": ["Mon", "Tue", "Wed", "Thu", "Fri"],
-            "resolution_rate": calculate_resolution_rate(tickets),
+            "resolution_rate": calculate_resolution_rate(status_counts),
             "satisfaction": [4.2, 4.3, 4.4, 4.3, 4.5],
             "overall_resolution_rate": 90,
             "avg_response_time": 15
@@ -219,11 +583,79 @@ async def get_admin_metrics():
         logging.exception("Error in admin metrics:")
         raise HTTPException(status_code=500, detail=str(e))
 
-def calculate_resolution_rate(tickets):
-    resolved = len([t for t in tickets if t[4] == 'Resolved'])
-    total = len(tickets) if tickets else 1
+@app.get("/admin/ticket-breakdown")
+def get_admin_ticket_breakdown():
+    try:
+        return {
+            "priority_counts": get_ticket_breakdown("priority"),
+            "category_counts": get_ticket_breakdown("category")
+        }
+    except Exception as e:
+        logging.exception("Error in ticket breakdown:")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/admin/metrics/rebuild")
+def rebuild_admin_metrics():
+    try:
+        return {"status_counts": rebuild_ticket_stats()}
+    except Exception as e:
+        logging.exception("Error rebuilding metrics:")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def calculate_resolution_rate(status_counts):
+    resolved = status_counts.get('Resolved', 0)
+    total = sum(status_counts.values()) or 1
     return round((resolved / total) * 100, 2)
 
+@app.get("/admin/media-stats")
+def get_media_stats():
+    """Worker pool load, plus OCR/ASR cache hits across all media worker processes."""
+    cache = get_media_cache()
+    return {**media_pool.stats(), "cache": cache.stats() if cache is not None else {"enabled": False}}
+
+@app.get("/admin/voice-stats")
+def get_voice_stats():
+    return voice_sessions.stats() if voice_sessions is not None else {"enabled": False}
+
+@app.get("/admin/context-stats")
+def get_context_stats():
+    return context_budget.stats()
+
+@app.get("/admin/cache-stats")
+def get_cache_stats():
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.stats()}
+
+@app.get("/admin/startup-profile")
+def get_startup_profile():
+    """Startup phase timings, and which optional stacks have been loaded so far."""
+    return {
+        **startup_profile,
+        "loaded": {name: name in sys.modules for name in ("speech_recognition", "PIL", "pyarrow")}
+    }
+
+@app.get("/admin/similar-stats")
+def get_similar_stats():
+    return similar_index.stats() if similar_index is not None else {"enabled": False}
+
+@app.get("/admin/intent-stats")
+def get_intent_stats():
+    """Share of tickets answered by the local intent classifier instead of the agents."""
+    return intent_classifier.stats() if intent_classifier is not None else {"enabled": False}
+
+@app.get("/admin/job-stats")
+async def get_job_stats():
+    return await asyncio.to_thread(job_worker.stats)
+
+@app.get("/admin/coalescing-stats")
+def get_coalescing_stats():
+    return single_flight.stats()
+
+@app.get("/admin/scheduler-stats")
+def get_scheduler_stats():
+    return scheduler.stats()
+
 # Fix Team Management tab
 @app.get("/admin/teams", response_model=List[dict])
 async def get_teams():
@@ -258,25 +690,24 @@ def get_agent_metrics_endpoint():
 @app.get("/suggestions")
 def get_suggestions():
     try:
-        tickets = get_all_tickets()
+        # Only the columns the suggestions use; no ai_response is read or parsed
+        tickets = get_all_tickets(columns=('id', 'customer_name', 'issue_text'), status='Pending')
         return {
             "suggestions": [
                 {
-                    "ticket_id": t[0],
-                    "customer_name": t[1],
+                    "ticket_id": t['id'],
+                    "customer_name": t['customer_name'],
                     "suggestion": generate_suggestion(t)
                 }
-                for t in tickets if t[4] == 'Pending'
+                for t in tickets
             ]
         }
     except Exception as e:
         logging.exception("Suggestions error:")
         raise HTTPException(status_code=500, detail="Error generating suggestions")
-    except IndexError:
-        raise HTTPException(status_code=500, detail="Data format mismatch in tickets")
 
 def generate_suggestion(ticket):
-    if "technical" in ticket[2].lower():
+    if "technical" in (ticket['issue_text'] or "").lower():
         return "Escalate to technical team"
     return "Assign to general support"
 
@@ -289,4 +720,5 @@ async def global_exception_handler(request: Request, exc: Exception):
     )
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
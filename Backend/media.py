@@ -0,0 +1,119 @@
+# media.py
+# Synchronous media decoders. Kept free of app/DB imports so they can be
+# shipped to worker processes cheaply.
+import io
+import os
+import wave
+import logging
+import subprocess
+
+from media_cache import cached_decode
+
+# The speech and OCR stacks are imported on first use, so text-only API
+# workers never load them
+
+# Tesseract binary: TESSERACT_CMD, else the default Windows install, else PATH
+_WINDOWS_TESSERACT = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+TESSERACT_CMD = os.getenv("TESSERACT_CMD") or (_WINDOWS_TESSERACT if os.path.exists(_WINDOWS_TESSERACT) else "tesseract")
+TESSERACT_LANG = os.getenv("TESSERACT_LANG", "eng")
+# Uploads above this are rejected before they are queued
+OCR_MAX_UPLOAD_BYTES = int(os.getenv("OCR_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+
+# Hard limit (seconds) for a single decode, enforced inside the worker so a
+# stuck tesseract subprocess or recognizer request doesn't hold it forever
+DECODE_TIMEOUT = float(os.getenv("MEDIA_JOB_TIMEOUT", "60"))
+
+def pcm_to_wav(pcm: bytes, sample_rate: int = 16000, channels: int = 1) -> io.BytesIO:
+    """Wrap raw 16-bit PCM in an in-memory WAV file."""
+    wav_audio = io.BytesIO()
+    with wave.open(wav_audio, "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)  # 16-bit audio
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm)
+    wav_audio.seek(0)
+    return wav_audio
+
+# Part of the voice cache key: a different engine or language must not reuse transcripts
+SPEECH_CONFIG = {"engine": "google", "language": "en-US"}
+
+def _recognize(wav_audio: io.BytesIO) -> str:
+    import speech_recognition as sr
+    recognizer = sr.Recognizer()
+    recognizer.operation_timeout = DECODE_TIMEOUT
+    with sr.AudioFile(wav_audio) as source:
+        audio_data = recognizer.record(source)
+    return recognizer.recognize_google(audio_data, language=SPEECH_CONFIG["language"])
+
+def convert_voice_to_text(voice_bytes: bytes, sample_rate: int = 16000, channels: int = 1) -> str:
+    """
+    Transcribe a whole recording. WAV uploads keep the rate and channels in
+    their header; anything else is taken as raw 16-bit PCM in the given format.
+    Repeated uploads of the same recording are served from the media cache.
+    Unintelligible audio gives "", an unreadable file raises ValueError and
+    service errors raise so the job can be retried.
+    """
+    import speech_recognition as sr
+
+    def decode():
+        wav_audio = io.BytesIO(voice_bytes) if voice_bytes[:4] == b"RIFF" else pcm_to_wav(voice_bytes, sample_rate, channels)
+        try:
+            return _recognize(wav_audio)
+        except sr.UnknownValueError:
+            return ""
+    config = {**SPEECH_CONFIG, "sample_rate": sample_rate, "channels": channels}
+    return cached_decode("voice", voice_bytes, config, decode)
+
+def transcribe_segment(pcm: bytes, sample_rate: int = 16000) -> str:
+    """
+    Transcribe one voice-activity segment of 16-bit mono PCM. Unintelligible
+    audio gives "", service errors raise so the caller can count them.
+    """
+    import speech_recognition as sr
+
+    def decode():
+        try:
+            return _recognize(pcm_to_wav(pcm, sample_rate))
+        except sr.UnknownValueError:
+            return ""
+    return cached_decode("voice_segment", pcm, {**SPEECH_CONFIG, "sample_rate": sample_rate}, decode)
+
+def run_tesseract(image_data: bytes, dpi: int = None) -> str:
+    """OCR an encoded image passed on stdin; the text comes back on stdout, no temp files."""
+    command = [TESSERACT_CMD, "stdin", "stdout", "-l", TESSERACT_LANG]
+    if dpi:
+        command += ["--dpi", str(dpi)]
+    result = subprocess.run(command, input=image_data, capture_output=True, timeout=DECODE_TIMEOUT)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode("utf-8", "replace").strip() or "tesseract failed")
+    return result.stdout.decode("utf-8", "replace")
+
+def ocr_config() -> dict:
+    """Settings that change OCR output; part of the image cache key."""
+    import image_preprocess
+    return {
+        "lang": TESSERACT_LANG,
+        "max_dimension": image_preprocess.OCR_MAX_DIMENSION,
+        "target_dpi": image_preprocess.OCR_TARGET_DPI,
+        "binarize": image_preprocess.OCR_BINARIZE
+    }
+
+# Function to extract text from an image
+def extract_text_from_image(image_bytes: bytes) -> str:
+    """OCR text of ``image_bytes``. Raises ValueError for uploads that can never be read (too large, not an image)."""
+    from PIL import UnidentifiedImageError
+    from image_preprocess import ImageTooLarge, preprocess, to_pnm
+
+    def decode():
+        image, dpi = preprocess(image_bytes)
+        return run_tesseract(to_pnm(image), dpi).strip()
+    try:
+        # Failed decodes raise out of cached_decode, so they are never cached
+        return cached_decode("image", image_bytes, ocr_config(), decode)
+    except ImageTooLarge:
+        raise
+    except UnidentifiedImageError as e:
+        raise ValueError(f"Not a readable image: {e}") from e
+    except Exception as e:
+        logging.error(f"Error extracting text from image: {e}")
+        return ""
@@ -0,0 +1,159 @@
+# media_cache.py
+"""
+Content-addressed cache of OCR and speech recognition output. Keys hash the
+upload bytes together with the decoder configuration, so a re-uploaded
+screenshot or recording skips decoding while a changed language or
+preprocessing setting misses. Entries live in a SQLite file shared by all
+media worker processes and are evicted least recently used once the store
+exceeds its size or entry limit. Hit and miss counters are kept in the same
+file, so the API process reports hits made in its workers.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+MEDIA_CACHE_MAX_ENTRIES = int(os.getenv("MEDIA_CACHE_MAX_ENTRIES", "20000"))
+
+def content_key(kind: str, data: bytes, config: Dict[str, Any]) -> str:
+    digest = hashlib.sha256()
+    digest.update(json.dumps([kind, config], sort_keys=True).encode("utf-8"))
+    digest.update(data)
+    return digest.hexdigest()
+
+class MediaCache:
+    def __init__(self, db_path: str, max_bytes: int = MEDIA_CACHE_MAX_BYTES, max_entries: int = MEDIA_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # Several worker processes share the file: wait for each other's writes
+        self._conn = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS media_cache (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                text TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_media_cache_last_used ON media_cache (last_used)')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS media_cache_counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+
+    def _count(self, name: str, amount: int = 1):
+        self._conn.execute('''
+            INSERT INTO media_cache_counters (name, value) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+        ''', (name, amount))
+
+    def get(self, key: str, kind: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM media_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE media_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._count(f"{kind}.hits" if row is not None else f"{kind}.misses")
+        return row[0] if row is not None else None
+
+    def set(self, key: str, kind: str, text: str):
+        now = time.time()
+        size = len(text.encode("utf-8")) + len(key)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute('''
+                    INSERT OR REPLACE INTO media_cache (key, kind, text, size, created_at, last_used)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (key, kind, text, size, now, now))
+                # Drop the least recently used entries beyond either limit
+                evicted = self._conn.execute('''
+                    DELETE FROM media_cache WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key,
+                                   SUM(size) OVER (ORDER BY last_used DESC, key) AS running_bytes,
+                                   ROW_NUMBER() OVER (ORDER BY last_used DESC, key) AS position
+                            FROM media_cache
+                        ) WHERE running_bytes > ? OR position > ?
+                    )
+                ''', (self.max_bytes, self.max_entries)).rowcount
+                if evicted:
+                    self._count("evictions", evicted)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM media_cache")
+            self._conn.execute("DELETE FROM media_cache_counters")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM media_cache").fetchone()
+            counters = dict(self._conn.execute("SELECT name, value FROM media_cache_counters").fetchall())
+        kinds = {}
+        for name, value in counters.items():
+            kind, _, counter = name.partition(".")
+            if counter:
+                kinds.setdefault(kind, {"hits": 0, "misses": 0})[counter] = value
+        for counts in kinds.values():
+            total = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = round(counts["hits"] / total * 100, 2) if total else 0.0
+        return {
+            "enabled": True,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "max_entries": self.max_entries,
+            "evictions": counters.get("evictions", 0),
+            "kinds": kinds
+        }
+
+_cache: Optional[MediaCache] = None
+_cache_pid: Optional[int] = None
+
+def get_media_cache() -> Optional[MediaCache]:
+    """This process's handle on the shared cache, or None when MEDIA_CACHE_ENABLED is off."""
+    global _cache, _cache_pid
+    if os.getenv("MEDIA_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _cache is None or _cache_pid != os.getpid():
+        _cache = MediaCache(os.getenv("MEDIA_CACHE_DB", "media_cache.db"))
+        _cache_pid = os.getpid()
+    return _cache
+
+def cached_decode(kind: str, data: bytes, config: Dict[str, Any], decode: Callable[[], str]) -> str:
+    """
+    Return the cached text for ``data`` under ``config``, or run ``decode``
+    and cache its result. Exceptions from ``decode`` propagate and are never
+    cached; cache errors only cost the lookup.
+    """
+    try:
+        cache = get_media_cache()
+        key = content_key(kind, data, config) if cache is not None else None
+        text = cache.get(key, kind) if cache is not None else None
+    except sqlite3.Error as e:
+        logging.error("Media cache lookup failed: %s", e)
+        cache = text = None
+    if text is not None:
+        return text
+    text = decode()
+    if cache is not None:
+        try:
+            cache.set(key, kind, text)
+        except sqlite3.Error as e:
+            logging.error("Media cache write failed: %s", e)
+    return text
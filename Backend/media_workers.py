@@ -0,0 +1,86 @@
+# media_workers.py
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+class MediaQueueFull(Exception):
+    """Raised when every worker is busy and the wait queue is at its limit."""
+
+class MediaWorkerPool:
+    """
+    Bounded process pool for CPU/subprocess-heavy media decoding (OCR, ASR),
+    so a large upload doesn't stall the event loop serving other requests.
+    """
+
+    def __init__(self, max_workers: int = 2, queue_limit: int = 8, timeout: float = 60):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn keeps workers independent of the server's threads and
+            # sockets, and matches the behaviour on Windows
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run ``fn(*args)`` in a worker process, bounded by the queue limit and timeout."""
+        if self._in_flight >= self.max_workers + self.queue_limit:
+            self.rejected += 1
+            raise MediaQueueFull("Media processing queue is full")
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_executor(), fn, *args)
+            result = await asyncio.wait_for(future, timeout=self.timeout)
+            self.completed += 1
+            return result
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logging.error("Media job %s timed out after %ss", getattr(fn, "__name__", fn), self.timeout)
+            raise
+        except BrokenProcessPool:
+            logging.exception("Media worker pool broke; it will be recreated")
+            self._executor = None
+            raise
+        finally:
+            self._in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "queue_limit": self.queue_limit,
+            "timeout": self.timeout,
+            "in_flight": self._in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+def pool_from_env() -> MediaWorkerPool:
+    return MediaWorkerPool(
+        max_workers=int(os.getenv("MEDIA_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))),
+        queue_limit=int(os.getenv("MEDIA_QUEUE_LIMIT", "8")),
+        # Slightly above the in-worker decode timeout so that one fires first
+        timeout=float(os.getenv("MEDIA_JOB_TIMEOUT", "60")) + 5
+    )
+
+media_pool = pool_from_env()
@@ -0,0 +1,256 @@
+# rate_limiter.py
+import os
+import re
+import time
+import asyncio
+import logging
+import itertools
+import contextvars
+from typing import Any, Dict, List, Mapping, Optional
+
+# Dispatch lanes, most urgent first
+LANES = {"interactive": 0, "standard": 1, "batch": 2}
+# Ticket severity within a lane, from the summarizer's metadata.priority
+SEVERITIES = {"critical": 0, "urgent": 0, "high": 0, "medium": 1, "low": 2}
+
+class TicketPriority:
+    """
+    Priority shared by every agent call made for one ticket. The severity
+    starts unknown and is filled in once the summarizer reports it, which
+    re-ranks that ticket's calls that are still queued. A ticket's first
+    calls are all queued before any severity is known, so it mostly orders
+    what comes after: retries after a 429 and, when streaming, the other
+    agents' calls still waiting for budget as the summarizer's metadata
+    streams in.
+    """
+
+    def __init__(self, lane: str = "standard", severity: Optional[str] = None):
+        self.lane = lane
+        self.severity = severity
+
+    def key(self) -> tuple:
+        severity = SEVERITIES.get(str(self.severity).lower(), 1) if self.severity else 1
+        return (LANES.get(self.lane, 1), severity)
+
+# Set by handle_ticket; inherited by the agent tasks it spawns
+current_priority: contextvars.ContextVar = contextvars.ContextVar("current_priority", default=None)
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Parse Groq reset durations such as '7.66s', '2m59.56s', '1h2m' or '120ms'."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    total, matched = 0.0, False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+class TokenBucket:
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until ``amount`` is available (0 if it is now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.refill_per_second if self.refill_per_second > 0 else 1.0
+
+    def consume(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+class _Waiter:
+    __slots__ = ("seq", "priority", "tokens", "future")
+
+    def __init__(self, seq: int, priority: TicketPriority, tokens: int, future: asyncio.Future):
+        self.seq = seq
+        self.priority = priority
+        self.tokens = tokens
+        self.future = future
+
+class OutboundScheduler:
+    """
+    Paces outbound Groq calls to stay just under the account's request and
+    token limits. Calls wait in a priority queue (lane, then ticket severity,
+    then arrival order) and are released as the token buckets refill. A
+    bucket only exists once its limit is known: configured, or for tokens
+    read from the x-ratelimit-limit-tokens header of the first response.
+    Until then calls are only held back by a 429's retry-after. Reservations
+    are settled against the usage each call reports, and the token level is
+    re-synced from every response's x-ratelimit-remaining-tokens.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 headroom: float = 0.9, enabled: bool = True):
+        self.headroom = headroom
+        self.enabled = enabled
+        self.requests = self._bucket(requests_per_minute)
+        self.tokens = self._bucket(tokens_per_minute)
+        # Tokens reserved by calls that haven't reported their usage yet
+        self.in_flight = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._loop = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self.dispatched = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+
+    def _bucket(self, per_minute: Optional[float]) -> Optional[TokenBucket]:
+        if not per_minute:
+            return None
+        return TokenBucket(per_minute * self.headroom, per_minute * self.headroom / 60)
+
+    async def acquire(self, tokens: int):
+        """Wait for this call's turn under the current rate limits."""
+        if not self.enabled:
+            return
+        self._ensure_dispatcher()
+        priority = current_priority.get() or TicketPriority()
+        waiter = _Waiter(next(self._seq), priority, tokens, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        self._wakeup.set()
+        start = time.monotonic()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Dispatched but the caller is gone: it will never settle
+                self.settle(tokens)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        self.total_wait += time.monotonic() - start
+
+    def _ensure_dispatcher(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._dispatcher is None or self._dispatcher.done():
+            self._loop = loop
+            self._wakeup = asyncio.Event()
+            self._waiters = [w for w in self._waiters if w.future.get_loop() is loop]
+            self._dispatcher = loop.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while True:
+            self._waiters = [w for w in self._waiters if not w.future.done()]
+            if not self._waiters:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            wait = self._paused_until - time.monotonic()
+            # Priorities can change while queued, so pick the head each round
+            waiter = min(self._waiters, key=lambda w: (w.priority.key(), w.seq))
+            if self.requests is not None:
+                wait = max(wait, self.requests.time_until(1))
+            if self.tokens is not None:
+                wait = max(wait, self.tokens.time_until(waiter.tokens))
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+
+            if self.requests is not None:
+                self.requests.consume(1)
+            if self.tokens is not None:
+                self.tokens.consume(waiter.tokens)
+            self.in_flight += waiter.tokens
+            self._waiters.remove(waiter)
+            self.dispatched += 1
+            waiter.future.set_result(None)
+
+    def settle(self, reserved: int, used: Optional[int] = None):
+        """
+        Close a dispatched call's reservation. ``used`` is the call's reported
+        total tokens; the difference from ``reserved`` is returned to (or
+        taken from) the token bucket. Pass None when usage is unknown.
+        """
+        if not self.enabled:
+            return
+        self.in_flight = max(0, self.in_flight - reserved)
+        if used is not None and self.tokens is not None:
+            self.tokens._refill()
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + reserved - used)
+
+    def observe(self, headers: Optional[Mapping[str, str]]):
+        """Size and re-sync the token bucket from a response's x-ratelimit-* headers."""
+        if not headers:
+            return
+        limit_tokens = headers.get("x-ratelimit-limit-tokens")
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if limit_tokens:
+            capacity = float(limit_tokens) * self.headroom
+            if self.tokens is None:
+                self.tokens = TokenBucket(capacity, capacity / 60)
+            self.tokens.capacity = capacity
+            self.tokens.refill_per_second = capacity / 60
+        if remaining_tokens is not None and self.tokens is not None:
+            # The server's count is authoritative, minus headroom and the
+            # reservations of calls it hasn't answered yet
+            reserve = self.tokens.capacity / self.headroom * (1 - self.headroom)
+            self.tokens._refill()
+            self.tokens.level = min(self.tokens.capacity, float(remaining_tokens) - reserve - self.in_flight)
+
+        # Groq reports requests per day; only act when the day's quota is spent
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        if remaining_requests is not None and float(remaining_requests) <= 0:
+            self.pause(parse_duration(headers.get("x-ratelimit-reset-requests")) or 60)
+
+    def on_rate_limited(self, headers: Optional[Mapping[str, str]]):
+        """Back off after a 429, honouring retry-after when present."""
+        self.rate_limited += 1
+        headers = headers or {}
+        retry_after = parse_duration(headers.get("retry-after")) or parse_duration(headers.get("x-ratelimit-reset-tokens")) or 1.0
+        self.observe(headers)
+        self.pause(retry_after)
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logging.warning("Pausing outbound AI calls for %.2fs", seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "queued": len(self._waiters),
+            "dispatched": self.dispatched,
+            "rate_limited": self.rate_limited,
+            "avg_wait_s": round(self.total_wait / self.dispatched, 4) if self.dispatched else 0.0,
+            "request_budget": round(self.requests.level, 2) if self.requests is not None else None,
+            "token_budget": round(self.tokens.level, 2) if self.tokens is not None else None,
+            "token_capacity": round(self.tokens.capacity, 2) if self.tokens is not None else None,
+            "tokens_in_flight": self.in_flight,
+            "paused_for_s": round(max(0.0, self._paused_until - time.monotonic()), 2)
+        }
+
+def _per_minute(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+def scheduler_from_env() -> OutboundScheduler:
+    """
+    Request pacing only applies when GROQ_REQUESTS_PER_MINUTE is set (Groq's
+    request headers are per day); the token limit defaults to the account's
+    x-ratelimit-limit-tokens unless GROQ_TOKENS_PER_MINUTE sets it up front.
+    """
+    return OutboundScheduler(
+        requests_per_minute=_per_minute("GROQ_REQUESTS_PER_MINUTE"),
+        tokens_per_minute=_per_minute("GROQ_TOKENS_PER_MINUTE"),
+        headroom=float(os.getenv("GROQ_RATE_HEADROOM", "0.9")),
+        enabled=os.getenv("GROQ_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+    )
@@ -0,0 +1,163 @@
+# response_cache.py
+import os
+import re
+import copy
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
+
+def normalize_text(text: str) -> str:
+    """Normalize issue text so trivially different phrasings share a cache key."""
+    text = (text or "").lower().strip()
+    text = re.sub(r"\s+", " ", text)
+    return text.rstrip(" .!?")
+
+def make_cache_key(agent_name: str, model: str, prompt_template: str, issue_text: str, context=None) -> str:
+    """Build a key from the normalized input and the agent's prompt/model version."""
+    prompt_version = hashlib.sha256(prompt_template.encode("utf-8")).hexdigest()[:16]
+    payload = json.dumps(
+        [agent_name, model, prompt_version, normalize_text(issue_text), context or ""],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    TTL + LRU cache for agent outputs, optionally persisted to SQLite. Disk
+    writes and their commits run on a single background thread, so set()
+    never waits for an fsync on the caller's (event loop) thread.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._conn = None
+        self._writer = None
+        if db_path:
+            # WAL, so reads on the caller's thread don't wait for the writer's commits
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            self._conn.commit()
+            self._write_conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+
+    def _is_fresh(self, created_at: float) -> bool:
+        return self.ttl <= 0 or time.time() - created_at < self.ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self._is_fresh(entry[1]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return copy.deepcopy(entry[0])
+            if entry:
+                del self._entries[key]
+
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM response_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and self._is_fresh(row[1]):
+                    value = json.loads(row[0])
+                    self._store(key, copy.deepcopy(value), row[1])
+                    self.hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        created_at = time.time()
+        with self._lock:
+            self._store(key, copy.deepcopy(value), created_at)
+        if self._writer is not None:
+            self._writer.submit(self._persist, key, json.dumps(value), created_at)
+
+    def _persist(self, key: str, value: str, created_at: float):
+        """Runs on the writer thread."""
+        try:
+            self._write_conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, created_at)
+            )
+            if self.ttl > 0:
+                self._write_conn.execute(
+                    "DELETE FROM response_cache WHERE created_at < ?", (created_at - self.ttl,)
+                )
+            # Keep the on-disk store bounded to the same size as memory
+            self._write_conn.execute('''
+                DELETE FROM response_cache WHERE key IN (
+                    SELECT key FROM response_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+            self._write_conn.commit()
+        except sqlite3.Error as e:
+            self._write_conn.rollback()
+            logging.error("Response cache persistence error: %s", e)
+
+    def _clear_disk(self):
+        self._write_conn.execute("DELETE FROM response_cache")
+        self._write_conn.commit()
+
+    def flush(self):
+        """Wait until every queued disk write has committed."""
+        if self._writer is not None:
+            self._writer.submit(lambda: None).result()
+
+    def _store(self, key: str, value: Dict[str, Any], created_at: float):
+        self._entries[key] = (value, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self._writer is not None:
+            # Wait, so a following get() can't read back a cleared row
+            self._writer.submit(self._clear_disk).result()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total * 100, 2) if total else 0.0,
+            "persistent": self._conn is not None
+        }
+
+def cache_from_env() -> Optional[ResponseCache]:
+    """Build the cache from RESPONSE_CACHE_* environment variables, or None if disabled."""
+    if os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    return ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        db_path=os.getenv("RESPONSE_CACHE_DB") or None
+    )
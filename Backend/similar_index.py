@@ -0,0 +1,185 @@
+# similar_index.py
+"""
+Local similar-ticket retrieval. Each ticket's text is embedded with signed
+feature hashing over words and word bigrams (no model, no vocabulary), and
+the vectors are appended to a flat float32 file that is memory-mapped for
+search, so the index grows incrementally and survives restarts.
+
+    python similar_index.py rebuild    # re-embed every ticket in DB_NAME
+"""
+import os
+import re
+import sys
+import zlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: similar-ticket retrieval is disabled without it
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within one process
+    fcntl = None
+
+_WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by can could do does for from had has have i i'm in is it it's "
+    "me my of on or our so that the their them there this to was we were what when which will with "
+    "you your please hi hello thanks".split()
+)
+# Rows scored per block, bounding temporary memory on large indexes
+SEARCH_BLOCK = 65536
+
+def features(text: str) -> List[str]:
+    words = [w for w in _WORD_RE.findall((text or "").lower()) if w not in _STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+def embed(text: str, dim: int) -> "np.ndarray":
+    """Signed hashed bag of words and bigrams, log-scaled and L2-normalized."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature in features(text):
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % dim] += 1.0 if (h // dim) & 1 else -1.0
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+class SimilarTicketIndex:
+    def __init__(self, path: str, dim: int = 256):
+        self.path = path
+        self.dim = dim
+        self.vectors_path = os.path.join(path, f"vectors_{dim}.f32")
+        self.ids_path = os.path.join(path, f"ids_{dim}.i64")
+        self.lock_path = os.path.join(path, f"index_{dim}.lock")
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._ids = None
+        self._mapped = 0
+        self.searches = 0
+        self.added = 0
+
+    def __len__(self) -> int:
+        return os.path.getsize(self.ids_path) // 8 if os.path.exists(self.ids_path) else 0
+
+    @contextmanager
+    def _file_lock(self):
+        """
+        Exclusive lock shared by every process appending to this index (the
+        API, worker.py, several uvicorn workers), so the paired vector and id
+        appends of one batch are never interleaved with another's.
+        """
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def add_tickets(self, rows: Iterable[Tuple[int, str]]):
+        """Append (ticket_id, issue_text) rows; usable as a database insert listener."""
+        rows = [(ticket_id, text) for ticket_id, text in rows if text]
+        if not rows:
+            return
+        vectors = np.stack([embed(text, self.dim) for _, text in rows])
+        ids = np.array([ticket_id for ticket_id, _ in rows], dtype=np.int64)
+        with self._file_lock():
+            # Drop any partial batch left by a writer that died mid-append
+            count = len(self)
+            # Vectors first: readers size the index from the ids file
+            with open(self.vectors_path, "ab") as f:
+                f.truncate(count * self.dim * 4)
+                f.write(vectors.tobytes())
+            with open(self.ids_path, "ab") as f:
+                f.truncate(count * 8)
+                f.write(ids.tobytes())
+            self.added += len(rows)
+
+    def _snapshot(self):
+        """Current (vectors, ids) memory maps, remapped when the files have grown."""
+        count = len(self)
+        if count != self._mapped:
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim)) if count else None
+            self._ids = np.memmap(self.ids_path, dtype=np.int64, mode="r", shape=(count,)) if count else None
+            self._mapped = count
+        return self._vectors, self._ids
+
+    def search(self, text: str, k: int = 3, exclude: Sequence[int] = (), min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """Top-``k`` (ticket_id, cosine similarity) pairs, best first."""
+        query = embed(text, self.dim)
+        if not query.any():
+            return []
+        with self._lock:
+            vectors, ids = self._snapshot()
+            self.searches += 1
+        if vectors is None:
+            return []
+
+        # Over-fetch so excluded ids and re-indexed duplicates don't starve the result
+        want = k + len(exclude) + 4
+        best_scores, best_ids = [], []
+        for start in range(0, len(ids), SEARCH_BLOCK):
+            scores = vectors[start:start + SEARCH_BLOCK] @ query
+            top = np.argpartition(-scores, min(want, len(scores)) - 1)[:want]
+            best_scores.append(scores[top])
+            best_ids.append(np.asarray(ids[start:start + SEARCH_BLOCK])[top])
+        scores, candidates = np.concatenate(best_scores), np.concatenate(best_ids)
+
+        results, seen = [], set(exclude)
+        for i in np.argsort(-scores):
+            ticket_id, score = int(candidates[i]), float(scores[i])
+            if score < min_score or len(results) == k:
+                break
+            if ticket_id not in seen:
+                seen.add(ticket_id)
+                results.append((ticket_id, round(score, 4)))
+        return results
+
+    def reset(self):
+        with self._file_lock():
+            for path in (self.vectors_path, self.ids_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._vectors = self._ids = None
+            self._mapped = 0
+
+    def stats(self) -> dict:
+        return {"enabled": True, "path": self.path, "dim": self.dim, "tickets": len(self), "added": self.added, "searches": self.searches}
+
+def rebuild(index: SimilarTicketIndex, chunk_size: int = 5000) -> int:
+    """Re-embed every ticket in the database into a fresh index."""
+    import database
+    index.reset()
+    total = 0
+    for rows in database.iter_ticket_chunks(columns=('id', 'issue_text'), chunk_size=chunk_size):
+        index.add_tickets(rows)
+        total += len(rows)
+    return total
+
+def index_from_env() -> Optional[SimilarTicketIndex]:
+    if os.getenv("SIMILAR_INDEX_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if np is None:
+        logging.warning("numpy is not installed; similar-ticket retrieval is disabled")
+        return None
+    return SimilarTicketIndex(
+        os.getenv("SIMILAR_INDEX_DIR", "similar_index"),
+        dim=int(os.getenv("SIMILAR_INDEX_DIM", "256"))
+    )
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["rebuild"]:
+        index = index_from_env()
+        if index is None:
+            sys.exit("Similar-ticket index is disabled (SIMILAR_INDEX_ENABLED or numpy missing)")
+        print(f"Indexed {rebuild(index)} tickets into {index.path}")
+    else:
+        print(__doc__)
@@ -0,0 +1,59 @@
+# single_flight.py
+import os
+import copy
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from rate_limiter import current_priority
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller starts the
+    work and everyone arriving while it is in flight awaits the same task.
+    Nothing is remembered after it finishes; that is the response cache's job.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._inflight: Dict[str, tuple] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Optional[str], fn: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.enabled or key is None:
+            return await fn()
+
+        flight = self._inflight.get(key)
+        if flight is not None and flight[0].get_loop() is asyncio.get_running_loop():
+            task, priority = flight
+            self.coalesced += 1
+            # An interactive caller joining a batch call shouldn't wait in the batch lane
+            joiner = current_priority.get()
+            if joiner is not None and priority is not None and joiner.key() < priority.key():
+                priority.lane = joiner.lane
+            # Waiters get their own copy so none of them can mutate another's result
+            return copy.deepcopy(await asyncio.shield(task))
+
+        # Run as a task so a cancelled leader doesn't cancel the waiters
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = (task, current_priority.get())
+        self.leaders += 1
+        task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key, (None,))[0] is task:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.leaders + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "inflight": len(self._inflight),
+            "executed": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0
+        }
+
+def single_flight_from_env() -> SingleFlight:
+    return SingleFlight(enabled=os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() in ("1", "true", "yes"))
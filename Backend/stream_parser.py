@@ -0,0 +1,120 @@
+# stream_parser.py
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+class IncrementalJSONParser:
+    """
+    Parse a JSON object as it streams in, token by token.
+
+    The scanner state (string/escape flags, open brackets, last safe cut point)
+    is carried across feed() calls, so each character is scanned once. A
+    snapshot re-parses the text so far, so one is only taken when a chunk
+    reaches a closing boundary (end of a string, a comma or a closing
+    bracket); partial objects then grow a value at a time, and parse work
+    scales with the number of values rather than the number of chunks.
+    The snapshot closes any open string and brackets; if that is not valid
+    yet (e.g. a dangling key), the text is cut back to the last position
+    known to end on a complete value.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.last_value: Optional[Dict[str, Any]] = None
+        self._start: Optional[int] = None
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._complete = False
+        self._end: Optional[int] = None
+        self._safe_cut: Optional[Tuple[int, str]] = None
+        self._boundary = False
+
+    def feed(self, chunk: str) -> Optional[Dict[str, Any]]:
+        """Add a chunk; return the new partial object if it changed, else None."""
+        offset = len(self.text)
+        self.text += chunk
+        if self._complete:
+            return None
+        self._boundary = False
+        for i in range(offset, len(self.text)):
+            self._scan(i, self.text[i])
+            if self._complete:
+                break
+        if not self._boundary:
+            return None
+        value = self._snapshot()
+        if value is not None and value != self.last_value:
+            self.last_value = value
+            return value
+        return None
+
+    def result(self) -> Optional[Dict[str, Any]]:
+        """Parse the full text, falling back to the last good partial object."""
+        try:
+            if self._complete:
+                value = json.loads(self.text[self._start:self._end])
+            else:
+                value = json.loads(self.text)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        return self.last_value
+
+    def _closers(self) -> str:
+        return "".join(reversed(self._stack))
+
+    def _scan(self, i: int, ch: str):
+        if self._start is None:
+            # Skip any prose or code fence before the object
+            if ch == "{":
+                self._start = i
+                self._stack.append("}")
+                self._safe_cut = (i + 1, self._closers())
+            return
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif ch == "\\":
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                self._boundary = True
+            return
+        if ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            self._stack.append("}" if ch == "{" else "]")
+            self._safe_cut = (i + 1, self._closers())
+        elif ch in "}]":
+            self._boundary = True
+            if self._stack:
+                self._stack.pop()
+            if not self._stack:
+                self._complete = True
+                self._end = i + 1
+        elif ch == ",":
+            self._boundary = True
+            self._safe_cut = (i, self._closers())
+
+    def _snapshot(self) -> Optional[Dict[str, Any]]:
+        if self._start is None:
+            return None
+        if self._complete:
+            candidates = [self.text[self._start:self._end]]
+        else:
+            tail = self.text[self._start:]
+            if self._in_string:
+                tail = (tail[:-1] if self._escape else tail) + '"'
+            candidates = [tail + self._closers()]
+            if self._safe_cut is not None:
+                cut, closers = self._safe_cut
+                candidates.append(self.text[self._start:cut] + closers)
+        for candidate in candidates:
+            try:
+                value = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(value, dict):
+                return value
+        return None
@@ -0,0 +1,15 @@
+import os
+import asyncio
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import ai_module
+
+def test_clients_are_rebuilt_after_close():
+    first = ai_module.agent_system.agents["summarizer"].client
+    asyncio.run(ai_module.close_clients())
+    assert first.is_closed()
+    second = ai_module.agent_system.agents["summarizer"].client
+    assert second is not first and not second.is_closed()
+    assert ai_module.agent_system.agents["resolver"].client is second
+    asyncio.run(ai_module.close_clients())
@@ -0,0 +1,59 @@
+from context_budget import ContextBudget, compact_text, estimate_tokens, truncate_to_budget
+
+def test_short_input_is_untouched():
+    text = "I cannot log in.\nIt says invalid password."
+    assert compact_text(text, 100) is text
+    assert truncate_to_budget(text, estimate_tokens(text)) is text
+    budget = ContextBudget({"summarizer": 100}, history_budget=50)
+    assert budget.prepare("summarizer", text, None) == (text, "")
+    assert budget.stats()["compacted_calls"] == 0 and budget.stats()["tokens_saved"] == 0
+
+def test_truncate_edges():
+    assert truncate_to_budget("one two three", 0) == ""
+    assert truncate_to_budget("one two three", 2) == "one two [...]"
+    assert truncate_to_budget("one, two", 2) == "one, [...]"
+
+STEPS = ["parse", "load", "merge", "sort", "filter", "render", "upload", "notify", "archive", "index", "audit", "sync"]
+
+def test_compact_keeps_framing_and_error_lines():
+    lines = (["My export keeps failing since the update."]
+             + [f"INFO step {name} ok" for name in STEPS]
+             + ["ERROR timeout while writing file 7"]
+             + [f"DEBUG cache warm for {name}" for name in STEPS]
+             + ["Please help, this blocks payroll."])
+    compacted = compact_text("\n".join(lines), 50)
+    kept = [line for line in compacted.splitlines() if not line.startswith("[...")]
+    assert kept[0] == lines[0] and kept[-1] == lines[-1]
+    assert "ERROR timeout while writing file 7" in kept
+    # Omission markers are part of what gets sent, so they are budgeted too
+    assert estimate_tokens(compacted) <= 50
+    assert "lines omitted" in compacted
+
+def test_repeated_lines_are_dropped_before_cutting():
+    text = "\n".join(["Login failed"] + ["retrying connection 1", "retrying connection 2"] * 10)
+    assert compact_text(text, 8) == "Login failed\nretrying connection 1"
+
+def test_history_window_keeps_newest_in_order():
+    budget = ContextBudget({}, history_budget=10)
+    # get_conversation_history order: newest first
+    history = [("third message", "user"), ("second message", "assistant"), ("first message", "user")]
+    assert budget.history_window(history) == "assistant: second message\nuser: third message"
+
+def test_prepare_splits_budget_between_history_and_content():
+    budget = ContextBudget({"resolver": 20}, history_budget=6)
+    context = "one two three four five six seven eight"
+    content = " ".join(f"word{i}" for i in range(30))
+    sent_content, sent_context = budget.prepare("resolver", content, context)
+    assert sent_context == "one two three four five six [...]"
+    # Never less than half the agent's budget for the ticket itself
+    assert estimate_tokens(sent_content) <= 14 + 5
+    assert budget.stats()["compacted_calls"] == 1
+
+def test_preface_gives_way_before_history():
+    budget = ContextBudget({}, history_budget=20)
+    history = "user: my card was charged twice"
+    resolutions = ["- Ticket #4: refunded the duplicate charge", "- Ticket #9: voided the pending authorization"]
+    context = budget.with_preface("Similar tickets:", resolutions, history)
+    assert context == "Similar tickets:\n- Ticket #4: refunded the duplicate charge\n" + history
+    assert budget.prepare("resolver", "charged twice", context)[1] == context
+    assert budget.with_preface("Similar tickets:", resolutions, history * 3) == history * 3
@@ -0,0 +1,88 @@
+import logging
+import pytest
+import database
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "tickets.db"))
+    database.create_db()
+    yield
+    database.close_pool()
+
+def response(priority, category, confidence):
+    return {
+        "summary": {"text": "issue"},
+        "metadata": {"priority": priority, "category": category},
+        "recommendation": {"solution": "fix", "confidence": confidence}
+    }
+
+def test_projection_skips_ai_response(temp_db):
+    database.insert_tickets([("alice", "cannot log in", response("high", "login", 80))])
+    assert database.get_all_tickets(columns=("id", "status")) == [{"id": 1, "status": "Pending"}]
+    with pytest.raises(ValueError):
+        database.get_all_tickets(columns=("id", "status; DROP TABLE tickets"))
+
+def test_generated_columns_filter_and_aggregate(temp_db):
+    database.insert_tickets([
+        ("alice", "cannot log in", response("High", "login", 80)),
+        ("bob", "charged twice", response("critical", "billing", 95)),
+        ("carol", "no analysis yet", None),
+    ])
+    tickets, _ = database.get_tickets_page(priority="high", columns=("customer_name",))
+    assert tickets == [{"id": 1, "customer_name": "alice"}]
+    tickets, _ = database.get_tickets_page(category="billing", min_confidence=90)
+    assert [t["customer_name"] for t in tickets] == ["bob"]
+    assert tickets[0]["ai_response"]["metadata"]["category"] == "billing"
+    assert database.get_ticket_breakdown("priority") == {"high": 1, "critical": 1, "unknown": 1}
+
+def test_create_db_is_idempotent(tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "reopen.db"))
+    with caplog.at_level(logging.WARNING):
+        database.create_db()
+        database.create_db()
+    database.close_pool()
+    assert "Generated columns unavailable" not in caplog.text
+
+def test_ticket_stats_follow_inserts_updates_and_deletes(temp_db):
+    def counted():
+        with database.get_pool().connection() as conn:
+            return dict(conn.execute('SELECT status, COUNT(*) FROM tickets GROUP BY status').fetchall())
+
+    ids = database.insert_tickets([("alice", "cannot log in", None), ("bob", "charged twice", None),
+                                   ("carol", "app crashes", None)])
+    assert database.get_ticket_status_counts() == {"Pending": 3}
+    database.mark_ticket_resolved(ids[0])
+    assert database.get_ticket_status_counts() == {"Pending": 2, "Resolved": 1} == counted()
+    with database.get_pool().transaction() as conn:
+        conn.execute('DELETE FROM tickets WHERE id IN (?, ?)', (ids[0], ids[1]))
+    assert database.get_ticket_status_counts() == {"Pending": 1} == counted()
+    with database.get_pool().transaction() as conn:
+        # Drift the counters, as a write made with the triggers missing would
+        conn.execute("UPDATE ticket_stats SET count = 7 WHERE status = 'Pending'")
+    assert database.get_ticket_status_counts() == {"Pending": 7}
+    assert database.rebuild_ticket_stats() == {"Pending": 1} == counted()
+
+def test_tickets_page_keyset_pagination_and_filters(temp_db):
+    ids = database.insert_tickets([(f"customer{i % 2}", f"issue {i} 50%_off", None) for i in range(5)])
+    database.mark_ticket_resolved(ids[1])
+    with database.get_pool().transaction() as conn:
+        conn.execute("UPDATE tickets SET created_at = '2024-01-0' || id || ' 12:00:00'")
+
+    pages, after_id = [], None
+    while True:
+        tickets, after_id = database.get_tickets_page(after_id=after_id, limit=2, columns=("id",))
+        pages.append([ticket["id"] for ticket in tickets])
+        if after_id is None:
+            break
+    assert pages == [ids[:2:-1], ids[2:0:-1], ids[:1]]
+
+    page = lambda **filters: [t["id"] for t in database.get_tickets_page(columns=("id",), **filters)[0]]
+    assert page(status="Resolved") == [ids[1]]
+    assert page(customer_name="customer0") == [ids[4], ids[2], ids[0]]
+    assert page(created_from="2024-01-02 00:00:00", created_to="2024-01-03 23:59:59") == [ids[2], ids[1]]
+    assert page(query="issue 3") == [ids[3]]
+    # LIKE wildcards in the query are matched literally
+    assert page(query="0%_o") == ids[::-1]
+    assert page(query="0_o") == []
+    with pytest.raises(ValueError):
+        database.get_tickets_page(columns=("id", "password"))
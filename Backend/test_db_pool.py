@@ -0,0 +1,54 @@
+import sqlite3
+import pytest
+from db_pool import ConnectionPool, GroupCommitWriter
+
+class CountingPool(ConnectionPool):
+    """Counts the transactions the writer opens."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.transactions = 0
+
+    def transaction(self):
+        self.transactions += 1
+        return super().transaction()
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = CountingPool(str(tmp_path / "pool.db"), size=2)
+    with pool.transaction() as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)")
+    pool.transactions = 0
+    yield pool
+    pool.close()
+
+def test_pool_reuses_connections_and_rolls_back(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    with pytest.raises(sqlite3.IntegrityError):
+        with pool.transaction() as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('a')")
+            conn.execute("INSERT INTO items (name) VALUES ('a')")
+    with pool.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+def test_group_commit_batches_writes(pool):
+    writer = GroupCommitWriter(pool, max_delay=0.2)
+    futures = [writer.submit("INSERT INTO items (name) VALUES (?)", (f"item{i}",)) for i in range(20)]
+    ids = [future.result(timeout=5) for future in futures]
+    writer.close()
+    assert sorted(ids) == list(range(1, 21))
+    assert pool.transactions == 1
+
+def test_group_commit_failure_reaches_only_its_waiter(pool):
+    writer = GroupCommitWriter(pool, max_delay=0.2)
+    good = writer.submit("INSERT INTO items (name) VALUES (?)", ("a",))
+    duplicate = writer.submit("INSERT INTO items (name) VALUES (?)", ("a",))
+    other = writer.submit("INSERT INTO items (name) VALUES (?)", ("b",))
+    assert good.result(timeout=5) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result(timeout=5)
+    assert other.result(timeout=5) == 2
+    writer.close()
@@ -0,0 +1,23 @@
+import csv
+import gzip
+import json
+from export import export_stream
+
+COLUMNS = ("id", "issue_text", "ai_response")
+CHUNKS = [[(1, 'says "no", twice', '{"metadata": {"priority": "high"}}')], [(2, "plain", None)]]
+
+def test_ndjson_splices_stored_json():
+    lines = b"".join(export_stream("ndjson", COLUMNS, CHUNKS, compress=False)).splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"id": 1, "issue_text": 'says "no", twice', "ai_response": {"metadata": {"priority": "high"}}},
+        {"id": 2, "issue_text": "plain", "ai_response": None},
+    ]
+
+def test_gzipped_csv_round_trips():
+    body = gzip.decompress(b"".join(export_stream("csv", COLUMNS, CHUNKS, compress=True))).decode("utf-8")
+    rows = list(csv.reader(body.splitlines()))
+    assert rows[0] == list(COLUMNS)
+    assert rows[1][1] == 'says "no", twice' and len(rows) == 3
+
+def test_csv_header_without_rows():
+    assert b"".join(export_stream("csv", COLUMNS, [], compress=False)) == b"id,issue_text,ai_response\r\n"
@@ -0,0 +1,36 @@
+import json
+import database
+from database import JSONText
+from fast_json import dumps_row, dumps_rows
+
+def test_dumps_row_null_legacy_and_malformed_values():
+    rows = [
+        {"id": 1, "ai_response": JSONText('{"summary": {"text": "spliced"}}')},
+        {"id": 2, "ai_response": None},
+        {"id": 3, "ai_response": '"legacy plain string"'},
+        {"id": 4, "ai_response": '{bad}'},
+        {"id": 5, "ai_response": 'not json at all'},
+        {"id": 6, "ai_response": {"already": "decoded"}},
+    ]
+    assert [json.loads(dumps_row(row, "ai_response"))["ai_response"] for row in rows] == [
+        {"summary": {"text": "spliced"}}, None, "legacy plain string", None, None, {"already": "decoded"}
+    ]
+    json.loads(dumps_rows(rows, "ai_response"))
+
+def test_only_sql_validated_values_are_spliced(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "tickets.db"))
+    database.create_db()
+    try:
+        database.insert_tickets([("alice", "valid", {"summary": {"text": "ok"}}), ("bob", "broken", None)])
+        with database.get_pool().connection() as conn:
+            conn.execute("UPDATE tickets SET ai_response = '{bad}' WHERE customer_name = 'bob'")
+            conn.commit()
+        tickets, _ = database.get_tickets_page(columns=("id", "ai_response"), decode=False)
+        chunks = list(database.iter_ticket_chunks(columns=("ai_response",)))
+    finally:
+        database.close_pool()
+    assert [type(ticket["ai_response"]) for ticket in tickets] == [str, JSONText]
+    assert [type(value) for value, in chunks[0]] == [JSONText, str]
+    assert json.loads(dumps_rows(tickets, "ai_response")) == [
+        {"id": 2, "ai_response": None}, {"id": 1, "ai_response": {"summary": {"text": "ok"}}}
+    ]
@@ -0,0 +1,66 @@
+import os
+import asyncio
+import pytest
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+import ai_module
+import fake_groq
+from response_cache import ResponseCache, make_cache_key
+
+ISSUE = "My invoice shows the same charge twice"
+VALID = {**fake_groq.SUMMARY, **fake_groq.ACTIONS, **fake_groq.RESOLUTION}
+
+@pytest.fixture
+def fused(monkeypatch):
+    """Fused mode against the fake client, with a fresh cache and no local shortcuts."""
+    monkeypatch.setattr(ai_module, "AGENT_MODE", "fused")
+    monkeypatch.setattr(ai_module, "response_cache", ResponseCache())
+    monkeypatch.setattr(ai_module, "intent_classifier", None)
+    monkeypatch.setattr(ai_module, "similar_index", None)
+    monkeypatch.setattr(ai_module.scheduler, "enabled", False)
+    client = fake_groq.install(ai_module.agent_system)
+
+    def run(fused_payload):
+        canned = fake_groq.canned_response
+        monkeypatch.setattr(fake_groq, "canned_response", lambda prompt: fused_payload if prompt.startswith("Analyze the customer support message") else canned(prompt))
+        response = asyncio.run(ai_module.handle_ticket(ISSUE))
+        agent = ai_module.agent_system.agents["fused"]
+        key = make_cache_key(agent.name, agent.model, agent.prompt_template, ISSUE, None)
+        return response, client.calls, ai_module.response_cache.get(key)
+
+    yield run
+    for agent in ai_module.agent_system.agents.values():
+        agent.client = None
+
+def test_split_fused_response():
+    summary, actions, resolution = ai_module.split_fused_response(VALID)
+    assert summary["metadata"]["category"] == "login issue"
+    assert actions == {"actions": fake_groq.ACTIONS["actions"]}
+    assert resolution["recommendation"]["solution"] == fake_groq.RESOLUTION["recommendation"]["solution"]
+    assert ai_module.split_fused_response({"error": "Invalid JSON response format"}) is None
+
+def test_valid_fused_payload_uses_one_call(fused):
+    response, calls, cached = fused(VALID)
+    assert calls == 1
+    assert response["recommendation"]["solution"] == "Reset the password and clear the account lockout"
+    assert cached == VALID
+
+@pytest.mark.parametrize("payload", [
+    {key: value for key, value in VALID.items() if key != "actions"},          # missing key
+    {**VALID, "actions": "Send a reset link"},                                 # wrong type
+    {**VALID, "recommendation": ["Reset the password"]},                       # wrong type
+])
+def test_invalid_fused_payload_falls_back_uncached(fused, payload):
+    response, calls, cached = fused(payload)
+    # One fused call, then the summarizer, action extractor and resolver
+    assert calls == 4
+    assert response["actions"] == fake_groq.ACTIONS["actions"]
+    assert cached is None
+
+def test_cache_hits_get_their_own_conversation_id(fused):
+    first, _, _ = fused(VALID)
+    second, calls, _ = fused(VALID)
+    assert calls == 1
+    assert first["metadata"]["conversation_id"] != second["metadata"]["conversation_id"]
+    assert second["metadata"]["conversation_id"] != VALID["metadata"]["conversation_id"]
@@ -0,0 +1,35 @@
+import io
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image, ImageDraw
+import image_preprocess
+from image_preprocess import ImageTooLarge, otsu_threshold, preprocess
+
+def png(image):
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def test_otsu_splits_bimodal_histogram():
+    histogram = [0] * 256
+    histogram[40], histogram[210] = 500, 1500
+    assert 40 <= otsu_threshold(histogram) < 210
+
+def test_dark_screenshot_is_downscaled_binarized_and_cropped():
+    image = Image.new("RGB", (4000, 2000), (30, 30, 30))
+    ImageDraw.Draw(image).rectangle((1000, 800, 1600, 900), fill=(230, 230, 230))
+    processed, dpi = preprocess(png(image))
+    # 4000px wide scaled to 2000, then cropped to the light block plus margins
+    margin = 2 * image_preprocess.OCR_CROP_MARGIN
+    assert abs(processed.width - (300 + margin)) <= 2 and abs(processed.height - (50 + margin)) <= 2
+    assert sum(processed.histogram()[1:255]) == 0
+    # Light-on-dark content comes out black on white
+    assert processed.getpixel((processed.width // 2, processed.height // 2)) == 0
+    assert processed.getpixel((0, 0)) == 255
+
+def test_oversized_image_is_rejected_before_decoding(monkeypatch):
+    monkeypatch.setattr(image_preprocess, "OCR_MAX_PIXELS", 100)
+    with pytest.raises(ImageTooLarge):
+        preprocess(png(Image.new("L", (20, 20))))
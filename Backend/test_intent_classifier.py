@@ -0,0 +1,62 @@
+import json
+import database
+from intent_classifier import IntentClassifier, NaiveBayesModel, faq_answers, match_rules, train
+
+def test_rules_need_whole_words():
+    assert match_rules("Hi there!").name == "greeting"
+    assert match_rules("thanks a lot").name == "thanks"
+    assert match_rules("Any update on ticket #42?").ticket_id == 42
+    assert match_rules("what's the status of my request").name == "status_check"
+    for text in ("this is broken", "my order history is empty", "shipping is late", "hi, my app crashes",
+                 "the ticket status page shows an error"):
+        assert match_rules(text) is None
+
+def test_change_requests_are_not_status_checks():
+    for text in ("please update my ticket with my new shipping address", "Can you update my request to add a second seat",
+                 "my ticket needs an update to the billing email"):
+        assert match_rules(text) is None
+
+def test_faq_answers_only_confident_answered_categories():
+    samples = [("How do I reset my password", "account access"), ("forgot my password reset link", "account access"),
+               ("password reset email never arrived", "account access"),
+               ("charged twice on my card", "billing"), ("refund for duplicate card charge", "billing"),
+               ("card charged twice this month", "billing")]
+    model = NaiveBayesModel.fit(samples, min_count=1)
+    model.answers = {"account access": {"solution": "Use the reset link", "steps": [], "resources": []}}
+    classifier = IntentClassifier(model, threshold=0.8)
+
+    intent = classifier.classify("how do I reset my password")
+    assert intent.name == "faq" and intent.category == "account access"
+    assert classifier.classify("my card was charged twice") is None
+    assert classifier.classify("the app crashes on startup") is None
+    assert classifier.stats()["local_fraction"] == round(1 / 3, 4)
+
+def test_faq_answers_ignore_category_case():
+    response = lambda solution: json.dumps({"recommendation": {"solution": solution, "confidence": 80}})
+    rows = [("Technical", response("Restart the app")), ("technical ", response("Restart the app")),
+            ("TECHNICAL", response("Reinstall")), ("Billing", response("Refund issued"))]
+    answers = faq_answers(rows, ["Technical"])
+    assert list(answers) == ["technical"]
+    assert answers["technical"]["solution"] == "Restart the app"
+
+def test_faq_answers_accept_word_confidences():
+    response = lambda solution, confidence: json.dumps({"recommendation": {"solution": solution, "confidence": confidence}})
+    rows = [("technical", response("Reinstall", 30)), ("technical", response("Restart the app", "high")),
+            ("technical", response("Restart the app", "n/a")), ("technical", response("Reinstall", "low"))]
+    # Equal counts, so the tie goes to the higher confidence: "high" (80) beats 30
+    assert faq_answers(rows, ["technical"])["technical"]["solution"] == "Restart the app"
+
+def test_train_on_mixed_case_stored_categories(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "tickets.db"))
+    database.create_db()
+    stored = lambda category: {"metadata": {"category": category},
+                               "recommendation": {"solution": "Use the reset link", "confidence": 90}}
+    database.insert_tickets([("alice", "forgot my password", stored("Account Access")),
+                             ("bob", "password reset link expired", stored("account access")),
+                             ("carol", "charged twice", stored("Billing"))])
+    try:
+        model = train(["Account Access"])
+    finally:
+        database.close_pool()
+    assert model.labels == ["account access", "billing"]
+    assert model.answers["account access"]["solution"] == "Use the reset link"
@@ -0,0 +1,117 @@
+import time
+import asyncio
+import sqlite3
+import pytest
+import database
+import job_queue
+
+@pytest.fixture
+def temp_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "jobs.db"))
+    database.create_db()
+    yield
+    database.close_pool()
+
+def test_submit_and_claim_once(temp_db):
+    ticket_id = job_queue.submit_ticket_job("alice", "cannot log in")
+    job = job_queue.claim_job("w1")
+    assert job["ticket_id"] == ticket_id and job["attempts"] == 1
+    assert job_queue.claim_job("w2") is None
+    assert job_queue.complete_job(job)
+    assert job_queue.get_ticket_job(ticket_id)["status"] == "done"
+    assert database.get_ticket_by_id(ticket_id)["status"] == "Pending"
+
+def test_expired_lease_is_reclaimed_and_retries_are_bounded(temp_db, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_RETRY_DELAY", 0)
+    ticket_id = job_queue.submit_ticket_job("bob", "app crashes")
+    job = job_queue.claim_job("w1", visibility_timeout=0.01)
+    time.sleep(0.02)
+
+    retry = job_queue.claim_job("w2")
+    assert retry["id"] == job["id"] and retry["attempts"] == 2
+    # The first worker lost its lease and can no longer complete the job
+    assert not job_queue.complete_job(job)
+
+    assert job_queue.fail_job(retry, "boom") == "queued"
+    last = job_queue.claim_job("w3")
+    assert job_queue.fail_job(last, "boom again") == "failed"
+    assert job_queue.get_ticket_job(ticket_id)["last_error"] == "boom again"
+
+def test_dead_lettered_job_fails_its_ticket(temp_db, monkeypatch):
+    monkeypatch.setattr(job_queue, "JOB_RETRY_DELAY", 0)
+    ticket_id = job_queue.submit_ticket_job("carol", "cannot pay")
+    for _ in range(job_queue.JOB_MAX_ATTEMPTS):
+        job_queue.fail_job(job_queue.claim_job("w1"), "boom")
+    assert job_queue.get_ticket_job(ticket_id)["status"] == "failed"
+    assert database.get_ticket_by_id(ticket_id)["status"] == "Failed"
+
+def test_permanent_error_is_not_retried(temp_db):
+    async def handler(job):
+        raise job_queue.PermanentJobError("Image is 9000x9000, above the pixel limit")
+
+    ticket_id = job_queue.submit_ticket_job("dave", None, media=b"png", media_kind="image")
+    worker = job_queue.JobWorker(handler)
+    asyncio.run(worker._process(job_queue.claim_job("w1")))
+    job = job_queue.get_ticket_job(ticket_id)
+    assert job["status"] == "failed" and job["attempts"] == 1
+    assert database.get_ticket_by_id(ticket_id)["status"] == "Failed"
+    assert job_queue.claim_job("w2") is None
+
+def test_heartbeat_survives_a_failed_lease_extension(temp_db, monkeypatch):
+    extend_lease = job_queue.extend_lease
+    beats = []
+
+    def flaky_extend_lease(job, visibility_timeout=None):
+        beats.append(job["id"])
+        if len(beats) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return extend_lease(job, visibility_timeout)
+
+    async def handler(job):
+        await asyncio.sleep(0.1)
+
+    monkeypatch.setattr(job_queue, "extend_lease", flaky_extend_lease)
+    ticket_id = job_queue.submit_ticket_job("erin", "slow analysis")
+    worker = job_queue.JobWorker(handler, visibility_timeout=0.06)
+    asyncio.run(worker._process(job_queue.claim_job("w1")))
+    assert len(beats) >= 2
+    assert job_queue.get_ticket_job(ticket_id)["status"] == "done"
+
+class FailingCompletions:
+    """Stands in for the Groq client: every completion call fails."""
+
+    def __init__(self):
+        self.calls = 0
+        self.with_raw_response = self
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        raise ConnectionError("Groq unreachable")
+
+def test_agent_failures_are_retried_then_dead_lettered(temp_db, monkeypatch):
+    import os
+    from types import SimpleNamespace
+    os.environ.setdefault("GROQ_API_KEY", "test-key")
+    import ai_module
+    import main
+
+    monkeypatch.setattr(job_queue, "JOB_RETRY_DELAY", 0)
+    monkeypatch.setattr(ai_module, "response_cache", None)
+    monkeypatch.setattr(ai_module, "intent_classifier", None)
+    monkeypatch.setattr(ai_module, "similar_index", None)
+    monkeypatch.setattr(ai_module.scheduler, "enabled", False)
+    completions = FailingCompletions()
+    for agent in ai_module.agent_system.agents.values():
+        monkeypatch.setattr(agent, "_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+
+    ticket_id = job_queue.submit_ticket_job("erin", "my dashboard shows a blank page after login")
+    worker = job_queue.JobWorker(main.process_ticket_job)
+    for _ in range(job_queue.JOB_MAX_ATTEMPTS):
+        asyncio.run(worker._process(job_queue.claim_job("w1")))
+
+    job = job_queue.get_ticket_job(ticket_id)
+    assert job["status"] == "failed" and job["attempts"] == job_queue.JOB_MAX_ATTEMPTS
+    assert "Groq unreachable" in job["last_error"]
+    ticket = database.get_ticket_by_id(ticket_id)
+    assert ticket["status"] == "Failed" and ticket["ai_response"] is None
+    assert completions.calls == 3 * job_queue.JOB_MAX_ATTEMPTS
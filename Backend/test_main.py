@@ -0,0 +1,84 @@
+import os
+import json
+import pytest
+
+os.environ.setdefault("GROQ_API_KEY", "test-key")
+
+from fastapi.testclient import TestClient
+
+import ai_module
+import database
+import fake_groq
+import main
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """The app on a temporary database, with agents answered by the fake client."""
+    monkeypatch.setattr(database, "DB_NAME", str(tmp_path / "tickets.db"))
+    monkeypatch.setattr(main.job_worker, "concurrency", 0)
+    monkeypatch.setattr(main, "GROQ_WARMUP_CONNECTIONS", 0)
+    monkeypatch.setattr(main, "similar_index", None)
+    monkeypatch.setattr(ai_module, "response_cache", None)
+    monkeypatch.setattr(ai_module, "intent_classifier", None)
+    monkeypatch.setattr(ai_module, "similar_index", None)
+    monkeypatch.setattr(ai_module.scheduler, "enabled", False)
+    with TestClient(main.app) as test_client:
+        fake_groq.install(ai_module.agent_system)
+        yield test_client
+    database.close_pool()
+
+TICKETS = [
+    {"customer_name": "alice", "issue_text": "I cannot log in to my account"},
+    {"customer_name": "bob", "issue_text": "I was charged twice this month"},
+]
+
+def stored(ticket_id):
+    ticket = database.get_ticket_by_id(ticket_id)
+    return {"customer_name": ticket["customer_name"], "issue_text": ticket["issue_text"]}
+
+def test_bulk_json_array_is_analysed_and_stored_in_order(client):
+    body = client.post("/submit_tickets/bulk", json=TICKETS).json()
+    assert body["created"] == 2 and body["failed"] == 0
+    ids = [result["ticket_id"] for result in body["results"]]
+    # insert_tickets derives the ids from last_insert_rowid(); they must map back to the right rows
+    assert ids[1] == ids[0] + 1
+    assert [stored(ticket_id) for ticket_id in ids] == TICKETS
+    assert body["results"][0]["ai_response"]["summary"]
+
+def test_bulk_json_lines_reports_bad_items(client):
+    lines = [
+        json.dumps(TICKETS[0]),
+        "{not json",
+        json.dumps({"customer_name": "carol", "issue_text": 123}),
+        json.dumps({"customer_name": "  ", "issue_text": "blank name"}),
+        json.dumps(TICKETS[1]),
+    ]
+    response = client.post("/submit_tickets/bulk", content="\n".join(lines), headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == 2 and body["failed"] == 3
+    assert [result["status"] for result in body["results"]] == ["ok", "error", "error", "error", "ok"]
+    assert body["results"][1]["error"].startswith("Invalid JSON")
+    assert "non-empty strings" in body["results"][2]["error"]
+    assert stored(body["results"][4]["ticket_id"]) == TICKETS[1]
+
+def test_bulk_multipart_upload_without_analysis(client):
+    upload = "\n".join(json.dumps(ticket) for ticket in TICKETS).encode()
+    body = client.post("/submit_tickets/bulk?process_ai=false", files={"file": ("tickets.jsonl", upload)}).json()
+    assert body["created"] == 2
+    assert all(result["ai_response"] is None for result in body["results"])
+    assert client.post("/submit_tickets/bulk", files={"other": ("x", b"")}).status_code == 400
+
+def test_bulk_rejects_oversized_batches(client, monkeypatch):
+    monkeypatch.setattr(main, "BULK_MAX_ITEMS", 1)
+    assert client.post("/submit_tickets/bulk", json=TICKETS).status_code == 413
+    assert client.post("/submit_tickets/bulk", json=[]).status_code == 400
+
+def test_get_tickets_pages_through_the_next_after_id_header(client):
+    client.post("/submit_tickets/bulk?process_ai=false", json=TICKETS + [{"customer_name": "carol", "issue_text": "App crashes"}])
+    first = client.get("/get_tickets/", params={"limit": 2, "fields": "id,customer_name"})
+    assert [t["customer_name"] for t in first.json()] == ["carol", "bob"]
+    second = client.get("/get_tickets/", params={"limit": 2, "fields": "id,customer_name", "after_id": first.headers["X-Next-After-Id"]})
+    assert [t["customer_name"] for t in second.json()] == ["alice"]
+    assert "X-Next-After-Id" not in second.headers
+    assert client.get("/get_tickets/", params={"fields": "id,nope"}).status_code == 400
@@ -0,0 +1,38 @@
+import pytest
+import media_cache
+from media_cache import MediaCache, cached_decode
+
+@pytest.fixture
+def cache_db(tmp_path, monkeypatch):
+    monkeypatch.setenv("MEDIA_CACHE_DB", str(tmp_path / "media_cache.db"))
+    monkeypatch.setattr(media_cache, "_cache", None)
+
+def test_duplicates_skip_decoding(cache_db):
+    calls = []
+    def decode():
+        calls.append(1)
+        return "error 500 on checkout"
+
+    assert cached_decode("image", b"png bytes", {"lang": "eng"}, decode) == "error 500 on checkout"
+    assert cached_decode("image", b"png bytes", {"lang": "eng"}, decode) == "error 500 on checkout"
+    # Other bytes or another decoder configuration are different entries
+    cached_decode("image", b"png bytes", {"lang": "deu"}, decode)
+    cached_decode("voice", b"png bytes", {"lang": "eng"}, decode)
+    assert len(calls) == 3
+    assert media_cache.get_media_cache().stats()["kinds"]["image"] == {"hits": 1, "misses": 2, "hit_rate": 33.33}
+
+def test_failures_are_not_cached(cache_db):
+    def fail():
+        raise RuntimeError("tesseract failed")
+    with pytest.raises(RuntimeError):
+        cached_decode("image", b"png bytes", {}, fail)
+    assert cached_decode("image", b"png bytes", {}, lambda: "text") == "text"
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = MediaCache(str(tmp_path / "cache.db"), max_bytes=10_000, max_entries=2)
+    cache.set("a", "image", "first")
+    cache.set("b", "image", "second")
+    assert cache.get("a", "image") == "first"
+    cache.set("c", "image", "third")
+    assert cache.get("b", "image") is None
+    assert cache.get("a", "image") == "first" and cache.stats()["evictions"] == 1
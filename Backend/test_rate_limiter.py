@@ -0,0 +1,58 @@
+import asyncio
+from rate_limiter import OutboundScheduler, TicketPriority, current_priority, parse_duration
+
+def test_parse_duration():
+    assert parse_duration("7.66s") == 7.66
+    assert abs(parse_duration("2m59.56s") - 179.56) < 1e-9
+    assert parse_duration("120ms") == 0.12
+    assert parse_duration("3") == 3.0
+    assert parse_duration(None) is None
+
+def test_dispatch_order_follows_lane_then_severity():
+    async def run():
+        scheduler = OutboundScheduler(requests_per_minute=600, tokens_per_minute=10**9, headroom=1.0)
+        scheduler.requests.level = 0
+        order = []
+
+        async def call(name, lane, severity=None):
+            current_priority.set(TicketPriority(lane, severity))
+            await scheduler.acquire(10)
+            order.append(name)
+
+        await asyncio.gather(
+            call("batch", "batch"),
+            call("standard-low", "standard", "low"),
+            call("standard-high", "standard", "high"),
+            call("interactive", "interactive")
+        )
+        return order
+
+    assert asyncio.run(run()) == ["interactive", "standard-high", "standard-low", "batch"]
+
+def test_headers_shrink_token_budget():
+    scheduler = OutboundScheduler(tokens_per_minute=6000, headroom=0.9)
+    scheduler.observe({"x-ratelimit-limit-tokens": "6000", "x-ratelimit-remaining-tokens": "1000"})
+    assert scheduler.tokens.level <= 1000 - 600 + 1
+
+def test_token_bucket_sized_from_headers():
+    scheduler = OutboundScheduler()
+    assert scheduler.requests is None and scheduler.tokens is None
+    scheduler.observe({"x-ratelimit-limit-tokens": "100000", "x-ratelimit-remaining-tokens": "100000"})
+    assert scheduler.tokens.capacity == 90000
+    assert abs(scheduler.tokens.level - 90000) < 1
+
+def test_settle_reconciles_reservation_with_usage():
+    async def run():
+        scheduler = OutboundScheduler(tokens_per_minute=10000, headroom=1.0)
+        await scheduler.acquire(1000)
+        assert scheduler.in_flight == 1000
+        scheduler.settle(1000, used=200)
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.in_flight == 0
+    assert scheduler.tokens.level > 9700
+    # A fresh remaining count raises the level again instead of only lowering it
+    scheduler.tokens.level = 0
+    scheduler.observe({"x-ratelimit-limit-tokens": "10000", "x-ratelimit-remaining-tokens": "8000"})
+    assert abs(scheduler.tokens.level - 8000) < 1
@@ -0,0 +1,34 @@
+import time
+from response_cache import ResponseCache, make_cache_key, normalize_text
+
+def test_normalized_text_shares_key():
+    assert normalize_text("  Can't   LOG in!! ") == "can't log in"
+    key_a = make_cache_key("agent", "model", "prompt", "Reset password.")
+    key_b = make_cache_key("agent", "model", "prompt", "reset   password")
+    assert key_a == key_b
+    assert key_a != make_cache_key("agent", "model", "prompt v2", "reset password")
+
+def test_lru_eviction_and_counters():
+    cache = ResponseCache(max_entries=2, ttl=0)
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.set("c", {"v": 3})
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["evictions"] == 1
+
+def test_ttl_expiry():
+    cache = ResponseCache(ttl=0.01)
+    cache.set("a", {"v": 1})
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+def test_sqlite_persistence(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    cache = ResponseCache(db_path=db_path)
+    cache.set("a", {"v": 1})
+    cache.flush()
+    assert ResponseCache(db_path=db_path).get("a") == {"v": 1}
+    cache.clear()
+    assert ResponseCache(db_path=db_path).get("a") is None
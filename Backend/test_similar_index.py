@@ -0,0 +1,50 @@
+import os
+import pytest
+
+pytest.importorskip("numpy")
+
+from similar_index import SimilarTicketIndex
+
+def test_nearest_tickets_and_persistence(tmp_path):
+    index = SimilarTicketIndex(str(tmp_path / "index"), dim=128)
+    index.add_tickets([
+        (1, "I cannot log in after resetting my password"),
+        (2, "My card was charged twice this month"),
+        (3, "The app crashes on the payments screen"),
+    ])
+    assert index.search("charged twice on my card", k=1)[0][0] == 2
+    assert index.search("password reset but cannot log in", k=1)[0][0] == 1
+
+    index.add_tickets([(4, "Charged twice for my subscription")])
+    reopened = SimilarTicketIndex(str(tmp_path / "index"), dim=128)
+    assert len(reopened) == 4
+    assert [ticket_id for ticket_id, _ in reopened.search("charged twice", k=2, exclude=(2,), min_score=0.3)] == [4]
+
+def _append(path, worker):
+    index = SimilarTicketIndex(path, dim=64)
+    for i in range(25):
+        ticket_id = worker * 1000 + i
+        index.add_tickets([(ticket_id, f"worker {worker} ticket {i} login error"), (ticket_id + 500, f"worker {worker} billing {i}")])
+
+def test_concurrent_processes_keep_ids_aligned(tmp_path):
+    import multiprocessing
+    path = str(tmp_path / "index")
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=_append, args=(path, worker)) for worker in range(1, 5)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    index = SimilarTicketIndex(path, dim=64)
+    assert len(index) == 200
+    assert os.path.getsize(index.vectors_path) == 200 * 64 * 4
+    assert index.search("worker 3 ticket 7 login error", k=1)[0][0] == 3007
+
+def test_partial_append_is_dropped(tmp_path):
+    index = SimilarTicketIndex(str(tmp_path / "index"), dim=32)
+    index.add_tickets([(1, "cannot log in")])
+    with open(index.vectors_path, "ab") as f:
+        f.write(b"\0" * 32 * 4 * 3)
+    index.add_tickets([(2, "charged twice")])
+    assert len(index) == 2
+    assert index.search("charged twice", k=1)[0][0] == 2
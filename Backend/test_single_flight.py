@@ -0,0 +1,37 @@
+import asyncio
+from single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"summary": "shared"}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("same", work) for _ in range(10)), flight.do("other", work))
+
+    results = asyncio.run(run())
+    assert len(calls) == 2
+    assert all(result == {"summary": "shared"} for result in results)
+    assert flight.stats()["coalesced"] == 9
+    assert flight.stats()["inflight"] == 0
+
+def test_waiters_survive_leader_cancellation():
+    flight = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await waiter
+
+    assert asyncio.run(run()) == {"ok": True}
@@ -0,0 +1,53 @@
+import json
+from stream_parser import IncrementalJSONParser
+
+def feed_all(text, step=3):
+    parser = IncrementalJSONParser()
+    partials = []
+    for i in range(0, len(text), step):
+        partial = parser.feed(text[i:i + step])
+        if partial is not None:
+            partials.append(partial)
+    return parser, partials
+
+def test_partials_grow_and_final_matches():
+    doc = {"summary": 'Can\'t "log" in', "metadata": {"priority": "high"}, "actions": [{"type": "Reset"}]}
+    parser, partials = feed_all(json.dumps(doc))
+    assert partials[0] == {}
+    assert any(p.get("summary") == 'Can\'t "log" in' and "metadata" not in p for p in partials)
+    assert partials[-1] == doc
+    assert parser.result() == doc
+
+def test_ignores_code_fence_and_trailing_text():
+    doc = {"actions": [{"description": "reset {password}"}]}
+    parser, _ = feed_all("```json\n" + json.dumps(doc) + "\n``` done {x}")
+    assert parser.result() == doc
+
+def test_snapshots_only_at_value_boundaries():
+    parser = IncrementalJSONParser()
+    text = json.dumps({"summary": "x" * 500, "priority": "high"})
+    head = text.index("x")
+    partials = [parser.feed(ch) for ch in text]
+    # Nothing is re-parsed while the long string value is still streaming
+    assert all(partial is None for partial in partials[head:head + 500])
+    assert [p for p in partials if p is not None][-1] == {"summary": "x" * 500, "priority": "high"}
+
+def test_streamed_error_payloads_are_not_cached(monkeypatch):
+    import os
+    import asyncio
+    os.environ.setdefault("GROQ_API_KEY", "test-key")
+    import ai_module
+    import fake_groq
+    from response_cache import ResponseCache
+
+    monkeypatch.setattr(ai_module, "response_cache", ResponseCache())
+    monkeypatch.setattr(ai_module.scheduler, "enabled", False)
+    monkeypatch.setattr(fake_groq, "canned_response", lambda prompt: {"error": "model overloaded"})
+    fake_groq.install(ai_module.agent_system)
+    try:
+        parsed = asyncio.run(ai_module.stream_agent("summarizer", "my app crashes", None, asyncio.Queue()))
+    finally:
+        for agent in ai_module.agent_system.agents.values():
+            agent.client = None
+    assert parsed == {"error": "model overloaded"}
+    assert ai_module.response_cache.stats()["entries"] == 0
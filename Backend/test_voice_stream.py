@@ -0,0 +1,72 @@
+import asyncio
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from voice_stream import StreamResampler, VoiceActivitySegmenter, VoiceSession
+
+def tone(seconds, rate=16000, amplitude=8000, channels=1):
+    t = np.arange(int(seconds * rate)) / rate
+    mono = (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.int16)
+    return np.repeat(mono, channels) if channels > 1 else mono
+
+def test_resampling_in_chunks_matches_one_pass():
+    audio = tone(1.0, rate=48000, channels=2).tobytes()
+    whole = StreamResampler(48000, channels=2).process(audio)
+    chunked = StreamResampler(48000, channels=2)
+    # Odd chunk sizes split frames and samples across calls
+    parts = [chunked.process(audio[i:i + 3001]) for i in range(0, len(audio), 3001)]
+    assert abs(len(whole) - 16000) <= 1
+    assert np.abs(np.concatenate(parts).astype(int) - whole.astype(int)).max() <= 1
+
+def test_segments_split_on_silence():
+    silence = np.zeros(16000, dtype=np.int16)
+    audio = np.concatenate([silence[:8000], tone(1.0), silence, tone(0.8), silence[:4000]])
+    segmenter = VoiceActivitySegmenter()
+    segments = segmenter.feed(audio[:20000]) + segmenter.feed(audio[20000:]) + segmenter.flush()
+    assert len(segments) == 2
+    # Each segment covers its utterance plus pre-roll and trailing silence
+    assert 1.0 <= len(segments[0]) / 32000 <= 1.8
+
+def test_session_joins_transcripts_in_order():
+    async def transcribe(pcm):
+        # Shorter (later) segments finish first
+        await asyncio.sleep(len(pcm) / 1e7)
+        return f"part{len(pcm) // 32000}"
+
+    async def run():
+        session = VoiceSession("alice", 16000, 1, transcribe)
+        silence = np.zeros(16000, dtype=np.int16)
+        for audio in (tone(2.0), silence, tone(1.0), silence):
+            await session.add_chunk(audio.tobytes())
+        return await session.finish(), session.stats()
+
+    transcript, stats = asyncio.run(run())
+    assert transcript == "part2 part1" and stats["segments"] == 2
+
+def test_session_retries_a_full_queue_and_fails_on_a_lost_segment(monkeypatch):
+    import voice_stream
+    from media_workers import MediaQueueFull
+    monkeypatch.setattr(voice_stream, "VOICE_SEGMENT_RETRY_DELAY", 0)
+    attempts = []
+
+    async def transcribe(pcm):
+        attempts.append(len(pcm))
+        if len(attempts) == 1:
+            raise MediaQueueFull("Media processing queue is full")
+        if len(pcm) < 64000:
+            raise RuntimeError("recognizer unavailable")
+        return "my order never arrived"
+
+    async def run():
+        session = VoiceSession("bob", 16000, 1, transcribe)
+        silence = np.zeros(16000, dtype=np.int16)
+        for audio in (tone(2.0), silence, tone(1.0), silence):
+            await session.add_chunk(audio.tobytes())
+        with pytest.raises(voice_stream.VoiceTranscriptionError, match="1 of 2"):
+            await session.finish()
+        return session.stats()
+
+    stats = asyncio.run(run())
+    # The full queue was retried; the recognizer error was not
+    assert len(attempts) == 3 and stats["failed"] == 1
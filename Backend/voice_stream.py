@@ -0,0 +1,283 @@
+# voice_stream.py
+"""
+Chunked voice ingestion. Raw 16-bit PCM arrives in chunks at the client's
+sample rate; each chunk is downmixed and resampled to 16 kHz mono once,
+then split on voice-activity boundaries. Every finished segment is
+transcribed right away while the upload continues, so only the open
+segment and the not-yet-transcribed ones are held in memory.
+"""
+import os
+import time
+import uuid
+import asyncio
+import logging
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from media_workers import MediaQueueFull
+
+try:
+    import numpy as np
+except ImportError:  # optional: chunked voice uploads are disabled without it
+    np = None
+
+TARGET_RATE = 16000
+VAD_FRAME_MS = 30
+# Trailing silence that closes a segment
+VAD_SILENCE_MS = int(os.getenv("VAD_SILENCE_MS", "500"))
+# Segments with less speech than this are dropped as clicks and noise
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "250"))
+# Audio kept from before speech starts, so the first syllable isn't clipped
+VAD_PREROLL_MS = 200
+# Long utterances are cut here, bounding a segment's memory and latency
+VAD_MAX_SEGMENT_SECONDS = float(os.getenv("VAD_MAX_SEGMENT_SECONDS", "15"))
+# Absolute RMS floor (16-bit scale) and multiple of the noise floor for speech
+VAD_MIN_RMS = float(os.getenv("VAD_MIN_RMS", "300"))
+VAD_NOISE_RATIO = 3.0
+
+VOICE_MAX_SESSIONS = int(os.getenv("VOICE_MAX_SESSIONS", "32"))
+VOICE_MAX_SECONDS = float(os.getenv("VOICE_MAX_SECONDS", "300"))
+VOICE_SESSION_TTL = float(os.getenv("VOICE_SESSION_TTL", "120"))
+# Segments of one session transcribed at once; the rest wait their turn
+VOICE_SEGMENT_CONCURRENCY = int(os.getenv("VOICE_SEGMENT_CONCURRENCY", "2"))
+# Attempts per segment while the media queue is full, backing off from the base delay
+VOICE_SEGMENT_ATTEMPTS = int(os.getenv("VOICE_SEGMENT_ATTEMPTS", "4"))
+VOICE_SEGMENT_RETRY_DELAY = float(os.getenv("VOICE_SEGMENT_RETRY_DELAY", "0.5"))
+
+class VoiceSessionError(Exception):
+    """Raised for unknown, expired or over-limit voice upload sessions."""
+
+class VoiceTranscriptionError(Exception):
+    """Raised by ``VoiceSession.finish`` when a segment could not be transcribed."""
+
+class StreamResampler:
+    """
+    Downmix interleaved 16-bit PCM to mono and resample it to ``target_rate``
+    chunk by chunk: a box filter against aliasing, then linear interpolation,
+    with the filter history and interpolation phase carried across chunks.
+    """
+
+    def __init__(self, source_rate: int, channels: int = 1, target_rate: int = TARGET_RATE):
+        self.source_rate = source_rate
+        self.channels = channels
+        self.target_rate = target_rate
+        self.step = source_rate / target_rate
+        width = max(1, round(self.step))
+        self._kernel = np.full(width, 1.0 / width, dtype=np.float32)
+        self._history = np.zeros(width - 1, dtype=np.float32)
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._remainder = b""
+        self._position = 0.0
+
+    def process(self, pcm: bytes) -> "np.ndarray":
+        pcm = self._remainder + pcm
+        usable = len(pcm) - len(pcm) % (2 * self.channels)
+        self._remainder = pcm[usable:]
+        samples = np.frombuffer(pcm[:usable], dtype=np.int16)
+        mono = samples.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        if self.source_rate == self.target_rate:
+            return mono.astype(np.int16)
+
+        raw = np.concatenate([self._history, mono])
+        smoothed = np.convolve(raw, self._kernel, mode="valid") if len(self._kernel) > 1 else raw
+        if len(self._kernel) > 1:
+            self._history = raw[len(raw) - len(self._history):]
+        data = np.concatenate([self._tail, smoothed])
+        if len(data) < 2:
+            self._tail = data
+            return np.zeros(0, dtype=np.int16)
+        positions = np.arange(self._position, len(data) - 1, self.step)
+        out = np.interp(positions, np.arange(len(data)), data)
+        # The last sample starts the next chunk's data; shift the phase to match
+        next_position = positions[-1] + self.step if len(positions) else self._position
+        self._position = next_position - (len(data) - 1)
+        self._tail = data[-1:]
+        return np.clip(out, -32768, 32767).astype(np.int16)
+
+class VoiceActivitySegmenter:
+    """
+    Energy-based voice activity detection on 30 ms frames of 16 kHz mono
+    audio, with an adaptive noise floor. ``feed`` returns the segments
+    (16-bit PCM bytes) closed by the audio it was given.
+    """
+
+    def __init__(self, rate: int = TARGET_RATE):
+        self.frame_size = rate * VAD_FRAME_MS // 1000
+        self.silence_frames = VAD_SILENCE_MS // VAD_FRAME_MS
+        self.min_speech_frames = VAD_MIN_SPEECH_MS // VAD_FRAME_MS
+        self.max_frames = int(VAD_MAX_SEGMENT_SECONDS * 1000 // VAD_FRAME_MS)
+        self._pending = np.zeros(0, dtype=np.int16)
+        self._preroll = deque(maxlen=VAD_PREROLL_MS // VAD_FRAME_MS)
+        self._segment: List[bytes] = []
+        self._speech_frames = 0
+        self._silent_run = 0
+        self.noise_floor = VAD_MIN_RMS / VAD_NOISE_RATIO
+
+    def _close(self) -> Optional[bytes]:
+        segment = b"".join(self._segment) if self._speech_frames >= self.min_speech_frames else None
+        self._segment, self._speech_frames, self._silent_run = [], 0, 0
+        return segment
+
+    def feed(self, samples: "np.ndarray") -> List[bytes]:
+        samples = np.concatenate([self._pending, samples])
+        whole = len(samples) - len(samples) % self.frame_size
+        self._pending = samples[whole:]
+        closed = []
+        for frame in samples[:whole].reshape(-1, self.frame_size):
+            rms = float(np.sqrt(np.mean(frame.astype(np.float32) ** 2)))
+            speech = rms >= max(VAD_MIN_RMS, self.noise_floor * VAD_NOISE_RATIO)
+            if not speech:
+                self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+            frame = frame.tobytes()
+            if not self._segment:
+                if speech:
+                    self._segment = list(self._preroll) + [frame]
+                    self._preroll.clear()
+                    self._speech_frames = 1
+                else:
+                    self._preroll.append(frame)
+                continue
+            self._segment.append(frame)
+            if speech:
+                self._speech_frames += 1
+                self._silent_run = 0
+            else:
+                self._silent_run += 1
+            if self._silent_run >= self.silence_frames or len(self._segment) >= self.max_frames:
+                segment = self._close()
+                if segment:
+                    closed.append(segment)
+        return closed
+
+    def flush(self) -> List[bytes]:
+        if self._pending.size and self._segment:
+            self._segment.append(self._pending.tobytes())
+        self._pending = np.zeros(0, dtype=np.int16)
+        segment = self._close() if self._segment else None
+        return [segment] if segment else []
+
+class VoiceSession:
+    """One chunked upload: resampler, segmenter and its segments' transcriptions."""
+
+    def __init__(self, customer_name: str, sample_rate: int, channels: int,
+                 transcribe: Callable[[bytes], Awaitable[str]]):
+        self.id = uuid.uuid4().hex
+        self.customer_name = customer_name
+        self.resampler = StreamResampler(sample_rate, channels)
+        self.segmenter = VoiceActivitySegmenter()
+        self.transcribe = transcribe
+        self.lock = asyncio.Lock()
+        self.semaphore = asyncio.Semaphore(VOICE_SEGMENT_CONCURRENCY)
+        self.tasks: List[asyncio.Task] = []
+        self.samples = 0
+        self.failed = 0
+        self.touched = time.monotonic()
+
+    @property
+    def seconds(self) -> float:
+        return self.samples / TARGET_RATE
+
+    async def _transcribe(self, segment: bytes) -> Optional[str]:
+        """The segment's transcript, or None once it has failed for good."""
+        async with self.semaphore:
+            for attempt in range(VOICE_SEGMENT_ATTEMPTS):
+                try:
+                    return (await self.transcribe(segment) or "").strip()
+                except MediaQueueFull:
+                    # Other uploads hold the media workers; wait for a free slot
+                    if attempt + 1 < VOICE_SEGMENT_ATTEMPTS:
+                        await asyncio.sleep(VOICE_SEGMENT_RETRY_DELAY * 2 ** attempt)
+                        continue
+                    logging.error("Media queue stayed full; dropping a voice segment of session %s", self.id)
+                except Exception:
+                    logging.exception("Transcribing a voice segment of session %s failed", self.id)
+                break
+            self.failed += 1
+            return None
+
+    def _start(self, segments: List[bytes]):
+        self.tasks.extend(asyncio.create_task(self._transcribe(segment)) for segment in segments)
+
+    async def add_chunk(self, pcm: bytes):
+        async with self.lock:
+            samples = self.resampler.process(pcm)
+            if (self.samples + len(samples)) / TARGET_RATE > VOICE_MAX_SECONDS:
+                raise VoiceSessionError(f"Recording is longer than {VOICE_MAX_SECONDS:g} seconds")
+            self.samples += len(samples)
+            self.touched = time.monotonic()
+            self._start(self.segmenter.feed(samples))
+
+    async def finish(self) -> str:
+        """
+        Close the last segment and join all transcripts in speaking order.
+        Raises VoiceTranscriptionError rather than return a transcript with gaps.
+        """
+        async with self.lock:
+            self._start(self.segmenter.flush())
+            texts = await asyncio.gather(*self.tasks)
+        if self.failed:
+            raise VoiceTranscriptionError(f"{self.failed} of {len(texts)} speech segments could not be transcribed")
+        return " ".join(text for text in texts if text)
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def stats(self) -> dict:
+        return {"seconds": round(self.seconds, 2), "segments": len(self.tasks), "failed": self.failed}
+
+class VoiceSessionStore:
+    """Open upload sessions, bounded in number and expired when idle."""
+
+    def __init__(self, transcribe: Callable[[bytes], Awaitable[str]], max_sessions: int = VOICE_MAX_SESSIONS,
+                 ttl: float = VOICE_SESSION_TTL):
+        self.transcribe = transcribe
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sessions: Dict[str, VoiceSession] = {}
+        self.finished = 0
+        self.expired = 0
+
+    def _expire(self):
+        now = time.monotonic()
+        for session_id, session in list(self.sessions.items()):
+            if now - session.touched > self.ttl:
+                session.cancel()
+                del self.sessions[session_id]
+                self.expired += 1
+
+    def create(self, customer_name: str, sample_rate: int, channels: int) -> VoiceSession:
+        self._expire()
+        if len(self.sessions) >= self.max_sessions:
+            raise VoiceSessionError("Too many voice uploads in progress")
+        session = VoiceSession(customer_name, sample_rate, channels, self.transcribe)
+        self.sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str) -> VoiceSession:
+        self._expire()
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise VoiceSessionError("Unknown or expired voice session")
+        return session
+
+    def pop(self, session_id: str) -> VoiceSession:
+        session = self.get(session_id)
+        del self.sessions[session_id]
+        self.finished += 1
+        return session
+
+    def stats(self) -> dict:
+        return {
+            "enabled": True,
+            "open": len(self.sessions),
+            "finished": self.finished,
+            "expired": self.expired,
+            "sessions": {session_id: session.stats() for session_id, session in self.sessions.items()}
+        }
+
+def store_from_env(transcribe: Callable[[bytes], Awaitable[str]]) -> Optional[VoiceSessionStore]:
+    if np is None:
+        logging.warning("numpy is not installed; chunked voice uploads are disabled")
+        return None
+    return VoiceSessionStore(transcribe)
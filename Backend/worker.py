@@ -0,0 +1,32 @@
+# worker.py
+"""
+Standalone ticket processing worker. Claims jobs from the same SQLite queue
+as the API's in-process workers, so it can run alongside (or instead of,
+with JOB_WORKERS=0 on the API) the web server.
+
+    python worker.py --concurrency 4
+"""
+import asyncio
+import argparse
+
+from job_queue import JobWorker, JOB_WORKERS
+from main import init_backend, process_ticket_job
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=max(JOB_WORKERS, 1), help="Jobs processed at once")
+    args = parser.parse_args()
+
+    init_backend()
+    worker = JobWorker(process_ticket_job, concurrency=args.concurrency)
+    worker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await worker.stop()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
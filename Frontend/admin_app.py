@@ -8,9 +8,51 @@ import time
 
 API_URL = "http://127.0.0.1:8000"
 
+# Seconds cached API reads stay fresh; "Refresh Data" clears them early
+CACHE_TTL = 30
+LIST_FIELDS = "id,customer_name,issue_text,status,created_at"
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_metrics():
+    """Ticket counts per status, maintained server-side."""
+    response = requests.get(f"{API_URL}/admin/metrics")
+    response.raise_for_status()
+    return response.json()
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_breakdown():
+    response = requests.get(f"{API_URL}/admin/ticket-breakdown")
+    response.raise_for_status()
+    return response.json()
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_ticket_page(after_id, limit, status):
+    """One page of ticket list columns (no ai_response) and the cursor for the next page."""
+    params = {"limit": limit, "fields": LIST_FIELDS}
+    if after_id is not None:
+        params["after_id"] = after_id
+    if status != "All":
+        params["status"] = status
+    response = requests.get(f"{API_URL}/get_tickets/", params=params)
+    response.raise_for_status()
+    next_after_id = response.headers.get("X-Next-After-Id")
+    return response.json(), int(next_after_id) if next_after_id else None
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def fetch_ticket(ticket_id):
+    """Full ticket including its ai_response, loaded only when it is selected."""
+    response = requests.get(f"{API_URL}/tickets/{ticket_id}")
+    response.raise_for_status()
+    return response.json()
+
+def reset_pagination():
+    st.session_state['page_cursors'] = [None]
+
 # Force refresh on page load
 if 'last_refresh' not in st.session_state:
     st.session_state['last_refresh'] = time.time()
+if 'page_cursors' not in st.session_state:
+    reset_pagination()
 
 st.sidebar.title("Admin Navigation")
 page = st.sidebar.radio("Go to", ["Admin Dashboard", "Team Management", "Agent Metrics"])
@@ -20,75 +62,103 @@ if page == "Admin Dashboard":
     
     # Add manual refresh button
     if st.button("Refresh Data"):
+        st.cache_data.clear()
+        reset_pagination()
         st.session_state['last_refresh'] = time.time()
     
     try:
-        response = requests.get(f"{API_URL}/get_tickets/")
-        if response.ok:
-            tickets = response.json()
+        metrics = fetch_metrics()
+        status_counts = metrics.get('status_counts', {})
+        total = sum(status_counts.values())
+        if total:
+            # Show statistics
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric("Total Tickets", total)
+            with col2:
+                st.metric("Pending Tickets", status_counts.get('Pending', 0))
+            with col3:
+                st.metric("Resolution Rate", f"{metrics.get('resolution_rate', 0)}%")
+
+            with st.expander("Priority breakdown"):
+                priority_counts = fetch_breakdown().get('priority_counts', {})
+                if priority_counts:
+                    st.plotly_chart(px.bar(x=list(priority_counts), y=list(priority_counts.values()),
+                                           labels={"x": "Priority", "y": "Tickets"}))
+
+            # Display tickets
+            st.subheader("Recent Tickets")
+            filter_col, size_col = st.columns(2)
+            with filter_col:
+                status_filter = st.selectbox("Status", ["All"] + sorted(status_counts), on_change=reset_pagination)
+            with size_col:
+                page_size = st.selectbox("Rows per page", [25, 50, 100], index=1, on_change=reset_pagination)
+
+            cursors = st.session_state['page_cursors']
+            tickets, next_after_id = fetch_ticket_page(cursors[-1], page_size, status_filter)
             if tickets:
-                # Convert to DataFrame
-                df = pd.DataFrame(tickets)
-                
-                # Show statistics
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Total Tickets", len(df))
-                with col2:
-                    pending = len(df[df['status'] == 'Pending']) if 'status' in df.columns else 0
-                    st.metric("Pending Tickets", pending)
-                
-                # Display tickets
-                st.subheader("Recent Tickets")
-                if not df.empty:
-                    # Ensure proper column order
-                    columns_to_display = ['id', 'customer_name', 'issue_text', 'status', 'created_at']
-                    display_df = df.sort_values('created_at', ascending=False)
-                    st.dataframe(display_df[columns_to_display], height=400)
+                # Newest first, as returned by the API
+                display_df = pd.DataFrame(tickets)
+                columns_to_display = ['id', 'customer_name', 'issue_text', 'status', 'created_at']
+                st.dataframe(display_df[columns_to_display], height=400)
+
+                prev_col, page_col, next_col = st.columns([1, 2, 1])
+                with prev_col:
+                    if st.button("◀ Previous", disabled=len(cursors) == 1):
+                        cursors.pop()
+                        st.experimental_rerun()
+                with page_col:
+                    st.caption(f"Page {len(cursors)}")
+                with next_col:
+                    if st.button("Next ▶", disabled=next_after_id is None):
+                        cursors.append(next_after_id)
+                        st.experimental_rerun()
+
+                # Ticket details viewer with formatted AI analysis
+                st.subheader("Ticket Details")
+                ticket_id = st.selectbox("Select Ticket ID", display_df['id'].tolist())
+                if ticket_id:
+                    ticket = fetch_ticket(int(ticket_id))
+                    col1, col2 = st.columns(2)
+                    
+                    with col1:
+                        st.write("### Basic Information")
+                        st.write(f"**Customer:** {ticket['customer_name']}")
+                        st.write(f"**Issue:** {ticket['issue_text']}")
+                        st.write(f"**Status:** {ticket.get('status', 'Pending')}")
                     
-                    # Ticket details viewer with formatted AI analysis
-                    st.subheader("Ticket Details")
-                    ticket_id = st.selectbox("Select Ticket ID", display_df['id'].tolist())
-                    if ticket_id:
-                        ticket = display_df[display_df['id'] == ticket_id].iloc[0]
-                        col1, col2 = st.columns(2)
-                        
-                        with col1:
-                            st.write("### Basic Information")
-                            st.write(f"**Customer:** {ticket['customer_name']}")
-                            st.write(f"**Issue:** {ticket['issue_text']}")
-                            st.write(f"**Status:** {ticket.get('status', 'Pending')}")
-                        
-                        if 'ai_response' in ticket and ticket['ai_response']:
-                            with col2:
-                                st.write("### AI Analysis")
-                                ai_response = ticket['ai_response']
-                                
-                                # Display Summary
-                                if 'summary' in ai_response:
-                                    with st.expander("📝 Summary", expanded=True):
-                                        st.write(ai_response['summary'].get('text', ''))
-                                
-                                # Display Actions
-                                if 'actions' in ai_response:
-                                    with st.expander("🔧 Recommended Actions", expanded=True):
-                                        for action in ai_response['actions']:
-                                            st.write(f"**{action.get('type', 'Action')}:** {action.get('description', '')}")
-                                
-                                # Display Recommendation
-                                if 'recommendation' in ai_response:
-                                    with st.expander("✅ Solution & Steps", expanded=True):
-                                        st.write(f"**Solution:** {ai_response['recommendation'].get('solution', '')}")
-                                        steps = ai_response['recommendation'].get('steps', [])
-                                        if steps:
-                                            st.write("**Steps:**")
-                                            for i, step in enumerate(steps, 1):
-                                                st.write(f"{i}. {step}")
-                                        st.write(f"**Confidence:** {ai_response['recommendation'].get('confidence', 0)}%")
+                    if ticket.get('ai_response'):
+                        with col2:
+                            st.write("### AI Analysis")
+                            ai_response = ticket['ai_response']
+                            
+                            # Display Summary
+                            if 'summary' in ai_response:
+                                with st.expander("📝 Summary", expanded=True):
+                                    st.write(ai_response['summary'].get('text', ''))
+                            
+                            # Display Actions
+                            if 'actions' in ai_response:
+                                with st.expander("🔧 Recommended Actions", expanded=True):
+                                    for action in ai_response['actions']:
+                                        st.write(f"**{action.get('type', 'Action')}:** {action.get('description', '')}")
+                            
+                            # Display Recommendation
+                            if 'recommendation' in ai_response:
+                                with st.expander("✅ Solution & Steps", expanded=True):
+                                    st.write(f"**Solution:** {ai_response['recommendation'].get('solution', '')}")
+                                    steps = ai_response['recommendation'].get('steps', [])
+                                    if steps:
+                                        st.write("**Steps:**")
+                                        for i, step in enumerate(steps, 1):
+                                            st.write(f"{i}. {step}")
+                                    st.write(f"**Confidence:** {ai_response['recommendation'].get('confidence', 0)}%")
             else:
-                st.info("No tickets available")
+                st.info("No tickets match this filter")
         else:
-            st.error(f"Failed to fetch tickets: {response.status_code}")
+            st.info("No tickets available")
+    except requests.exceptions.HTTPError as e:
+        st.error(f"Failed to fetch tickets: {e.response.status_code}")
     except Exception as e:
         st.error(f"Error: {str(e)}")
     
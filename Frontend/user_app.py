@@ -1,6 +1,8 @@
 # user_app.py
 import streamlit as st
 import requests
+import json
+import time
 from streamlit_webrtc import webrtc_streamer, AudioProcessorBase, WebRtcMode, WebRtcStreamerContext
 import av
 import sounddevice as sd
@@ -22,6 +24,157 @@ def list_audio_devices():
         st.error("No audio input devices detected. Please check your microphone settings.")
     return input_devices
 
+def iter_sse_events(response):
+    """Yield (event, data) pairs from a streaming text/event-stream response."""
+    event, data_lines = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+
+def render_actions(actions):
+    if actions:
+        for action in actions:
+            if not isinstance(action, dict):
+                continue
+            st.write(f"**Type:** {action.get('type', 'Unknown')}")
+            st.write(f"**Description:** {action.get('description', 'No description available')}")
+            st.write("---")
+    else:
+        st.write("No actions available.")
+
+def render_recommendation(recommendation):
+    solution = recommendation.get('solution', 'No solution available')
+    steps = recommendation.get('steps', [])
+
+    st.write(f"**Solution:** {solution}")
+    if steps:
+        st.write("**Steps:**")
+        for i, step in enumerate(steps, start=1):
+            st.write(f"{i}. {step}")
+    else:
+        st.write("No steps available.")
+
+def wait_for_ticket(ticket_id, timeout=120, interval=1.0):
+    """Poll the ticket's status until its background job finishes; returns the status body."""
+    deadline = time.time() + timeout
+    status = {}
+    while time.time() < deadline:
+        response = requests.get(f"{API_URL}/tickets/{ticket_id}/status")
+        if response.ok:
+            status = response.json()
+            if (status.get("job") or {}).get("status") in ("done", "failed"):
+                break
+        time.sleep(interval)
+    return status
+
+def show_submitted_ticket(response, error_message):
+    """Render a queued /submit_ticket/ result once its processing completes."""
+    if not response.ok:
+        st.error(error_message)
+        return
+    ticket_id = response.json().get("ticket_id")
+    with st.spinner(f"Processing ticket #{ticket_id}..."):
+        status = wait_for_ticket(ticket_id)
+    ai_response = status.get("ai_response")
+    if not ai_response:
+        job = status.get("job") or {}
+        if job.get("status") == "failed":
+            st.error(f"Ticket #{ticket_id} could not be processed: {job.get('last_error') or 'unknown error'}")
+            return
+        st.warning(f"Ticket #{ticket_id} is still being processed ({job.get('status', 'queued')}). Check back shortly.")
+        return
+
+    st.subheader("Actions")
+    render_actions(ai_response.get('actions', []))
+    st.subheader("Recommendation")
+    render_recommendation(ai_response.get('recommendation', {}))
+
+def chat_payload(user_input):
+    """Build the /chat/ body, continuing the current conversation if there is one."""
+    payload = {"message": user_input, "customer_name": "User"}
+    if st.session_state.get("conversation_id"):
+        payload["conversation_id"] = st.session_state["conversation_id"]
+    return payload
+
+def stream_chat(user_input):
+    """Render the /chat/ SSE stream progressively as each agent's output fills in."""
+    st.subheader("Summary")
+    summary_slot = st.empty()
+    st.subheader("Actions to be taken")
+    actions_slot = st.empty()
+    st.subheader("Recommendation")
+    recommendation_slot = st.empty()
+
+    with requests.post(
+        f"{API_URL}/chat/",
+        params={"stream": "true"},
+        json=chat_payload(user_input),
+        stream=True
+    ) as response:
+        if not response.ok:
+            st.error(f"Error: {response.status_code} - {response.text}")
+            return
+        for event, data in iter_sse_events(response):
+            if event == "conversation":
+                st.session_state["conversation_id"] = data.get("conversation_id")
+            elif event == "summary":
+                summary = data.get("summary", "")
+                summary_slot.write(summary.get("text", "") if isinstance(summary, dict) else summary)
+            elif event == "actions":
+                with actions_slot.container():
+                    render_actions(data.get("actions", []))
+            elif event == "recommendation":
+                recommendation = data.get("recommendation", {})
+                if isinstance(recommendation, dict):
+                    with recommendation_slot.container():
+                        render_recommendation(recommendation)
+            elif event == "done":
+                summary_slot.write(data.get("summary", {}).get("text", ""))
+                with actions_slot.container():
+                    render_actions(data.get("actions", []))
+                with recommendation_slot.container():
+                    render_recommendation(data.get("recommendation", {}))
+            elif event == "error":
+                st.error(data.get("response", "Error processing your message"))
+
+def upload_voice_frames(frames) -> bool:
+    """
+    Send this rerun's audio frames to the backend as one chunk of the
+    current voice session (started on the first frames, which carry the
+    sample rate), instead of growing a local buffer.
+    """
+    if not frames:
+        return False
+    if not st.session_state.get("voice_session"):
+        response = requests.post(f"{API_URL}/voice/sessions", data={
+            "customer_name": "User",
+            "sample_rate": frames[0].sample_rate,
+            "channels": len(frames[0].layout.channels)
+        })
+        if not response.ok:
+            st.error(f"Unable to start voice upload: {response.text}")
+            return False
+        st.session_state["voice_session"] = response.json()["session_id"]
+    chunk = b"".join(frame.to_ndarray().tobytes() for frame in frames)
+    response = requests.post(
+        f"{API_URL}/voice/sessions/{st.session_state['voice_session']}/chunks",
+        data=chunk,
+        headers={"Content-Type": "application/octet-stream"}
+    )
+    if not response.ok:
+        st.error(f"Error uploading audio: {response.text}")
+        return False
+    st.session_state["voice_stats"] = response.json()
+    return True
+
 class AudioProcessor(AudioProcessorBase):
     def recv_audio(self, frame: av.AudioFrame) -> av.AudioFrame:
         # Process the audio frame here if needed
@@ -37,48 +190,34 @@ if page == "User Chatbot":
 
     if input_type == "Text":
         user_input = st.text_input("Enter your message:")
+        stream_response = st.checkbox("Stream response", value=True)
         if st.button("Send"):
             try:
-                response = requests.post(
-                    f"{API_URL}/chat/",
-                    json={"message": user_input, "customer_name": "User"}  # Send data as JSON
-                )
-                if response.ok:
-                    res_json = response.json()
-                    actions = res_json.get('actions', [])
-                    recommendation = res_json.get('recommendation', {})
-
-                    st.subheader("Actions to be taken")
-                    if actions:
-                        for action in actions:
-                            st.write(f"**Type:** {action.get('type', 'Unknown')}")
-                            st.write(f"**Description:** {action.get('description', 'No description available')}")
-                            st.write("---")
-                    else:
-                        st.write("No actions available.")
-
-                    st.subheader("Recommendation")
-                    solution = recommendation.get('solution', 'No solution available')
-                    steps = recommendation.get('steps', [])
-
-                    st.write(f"**Solution:** {solution}")
-                    if steps:
-                        st.write("**Steps:**")
-                        for i, step in enumerate(steps, start=1):
-                            st.write(f"{i}. {step}")
-                    else:
-                        st.write("No steps available.")
+                if stream_response:
+                    stream_chat(user_input)
                 else:
-                    st.error(f"Error: {response.status_code} - {response.text}")
+                    response = requests.post(
+                        f"{API_URL}/chat/",
+                        json=chat_payload(user_input)  # Send data as JSON
+                    )
+                    if response.ok:
+                        res_json = response.json()
+                        st.session_state["conversation_id"] = res_json.get("conversation_id")
+                        st.subheader("Actions to be taken")
+                        render_actions(res_json.get('actions', []))
+                        st.subheader("Recommendation")
+                        render_recommendation(res_json.get('recommendation', {}))
+                    else:
+                        st.error(f"Error: {response.status_code} - {response.text}")
             except requests.exceptions.ConnectionError:
                 st.error("Unable to connect to the backend server. Please ensure the server is running.")
                 
     elif input_type == "Voice":
-        # Initialize webrtc_ctx and combined_audio in session state
+        # Initialize webrtc_ctx and the voice upload session in session state
         if "webrtc_ctx" not in st.session_state:
             st.session_state["webrtc_ctx"] = None
-        if "combined_audio" not in st.session_state:
-            st.session_state["combined_audio"] = b""
+        if "voice_session" not in st.session_state:
+            st.session_state["voice_session"] = None
         if "audio_device" not in st.session_state:
             st.session_state["audio_device"] = None
 
@@ -108,6 +247,7 @@ if page == "User Chatbot":
                         audio_receiver_size=20  # Increased receiver size to handle larger queues
                     )
                     st.session_state["listening"] = True
+                    st.session_state["voice_session"] = None
                     logging.debug("WebRTC started successfully.")
                 except Exception as e:
                     error_details = traceback.format_exc()
@@ -126,13 +266,10 @@ if page == "User Chatbot":
                 try:
                     logging.debug("Attempting to retrieve audio frames.")
                     audio_frames = st.session_state["webrtc_ctx"].audio_receiver.get_frames(timeout=1)
-                    for frame in audio_frames:
-                        st.session_state["combined_audio"] += frame.to_ndarray().tobytes()
-
-                    if st.session_state["combined_audio"]:
-                        st.write("Audio detected. Processing...")
-                        st.text("[Voice-to-text translation placeholder]")
-                        logging.debug("Audio successfully processed.")
+                    if upload_voice_frames(audio_frames) or st.session_state.get("voice_session"):
+                        stats = st.session_state.get("voice_stats", {})
+                        st.write(f"Recording: {stats.get('seconds', 0)}s uploaded, {stats.get('segments', 0)} phrases transcribing.")
+                        logging.debug("Audio chunk uploaded.")
                     else:
                         st.warning("No voice detected. Please ensure your microphone is working and selected correctly.")
                         logging.debug("No audio detected in frames.")
@@ -147,37 +284,15 @@ if page == "User Chatbot":
         # Send button
         if st.button("Send"):
             if not st.session_state.get("listening", False):
-                st.write("Processing your voice input...")
-                response = requests.post(
-                    f"{API_URL}/submit_ticket/",
-                    data={"customer_name": "User"},
-                    files={"voice": ("recording.wav", st.session_state["combined_audio"], "audio/wav")}
-                )
-                if response.ok:
-                    res_json = response.json()
-                    actions = res_json.get('AI Response', {}).get('actions', [])
-                    recommendation = res_json.get('AI Response', {}).get('recommendation', {})
-
-                    st.subheader("Actions")
-                    if actions:
-                        for action in actions:
-                            st.write(f"**Type:** {action.get('type', 'Unknown')}\n**Description:** {action.get('description', 'No description available')}\n")
-                    else:
-                        st.write("No actions available.")
-
-                    st.subheader("Recommendation")
-                    solution = recommendation.get('solution', 'No solution available')
-                    steps = recommendation.get('steps', [])
-
-                    st.write(f"**Solution:** {solution}")
-                    if steps:
-                        st.write("**Steps:**")
-                        for i, step in enumerate(steps, start=1):
-                            st.write(f"{i}. {step}")
-                    else:
-                        st.write("No steps available.")
+                if not st.session_state.get("voice_session"):
+                    st.warning("No audio recorded yet. Start listening and speak first.")
                 else:
-                    st.error("Error submitting voice file")
+                    st.write("Processing your voice input...")
+                    response = requests.post(f"{API_URL}/voice/sessions/{st.session_state['voice_session']}/finish")
+                    st.session_state["voice_session"] = None
+                    if response.ok:
+                        st.write(f"You said: {response.json().get('transcript', '')}")
+                    show_submitted_ticket(response, f"Error submitting voice input: {response.text}")
             else:
                 st.warning("Please stop listening before sending.")
                 
@@ -190,32 +305,6 @@ if page == "User Chatbot":
                     data={"customer_name": "User"},
                     files={"image": image_file}
                 )
-                if response.ok:
-                    res_json = response.json()
-                    actions = res_json.get('AI Response', {}).get('actions', [])
-                    recommendation = res_json.get('AI Response', {}).get('recommendation', {})
-
-                    st.subheader("Actions")
-                    if actions:
-                        for action in actions:
-                            st.write(f"**Type:** {action.get('type', 'Unknown')}")
-                            st.write(f"**Description:** {action.get('description', 'No description available')}")
-                            st.write("---")
-                    else:
-                        st.write("No actions available.")
-
-                    st.subheader("Recommendation")
-                    solution = recommendation.get('solution', 'No solution available')
-                    steps = recommendation.get('steps', [])
-
-                    st.write(f"**Solution:** {solution}")
-                    if steps:
-                        st.write("**Steps:**")
-                        for i, step in enumerate(steps, start=1):
-                            st.write(f"{i}. {step}")
-                    else:
-                        st.write("No steps available.")
-                else:
-                    st.error("Error submitting image")
+                show_submitted_ticket(response, "Error submitting image")
             else:
                 st.warning("Please upload an image.")